@@ -27,6 +27,20 @@ Usage:
     # Compare multiple machine types:
     python main.py --cloud gcp --machine-type n2-standard-4 --cleanup
     python main.py --cloud gcp --machine-type n2d-standard-4 --cleanup
+    
+    # Rebuild artifacts from stored raw series with new analysis settings:
+    python main.py reanalyze gcp-intel-20260201-143022 --warmup-seconds 60
+    python main.py reanalyze --all --percentile-method median_unbiased
+    
+    # Index existing artifacts in the SQLite results catalog (benchmarks/results.db):
+    python main.py catalog
+    
+    # Rank machine types by the cataloged runs, with significance tests:
+    python main.py compare --machine-type n2-standard-4 --machine-type n2d-standard-4
+    
+    # Fail CI (exit code 3) when services use more resources than recent comparable runs:
+    python main.py --cloud gcp --machine-type n2-standard-4 --rolling-baseline 5 --cleanup
+    python main.py gate gcp-intel-20260201-143022 --baseline-run gcp-intel-20260115-091500
 """
 
 import argparse
@@ -42,7 +56,12 @@ from modules.helm_deployer import HelmDeployer
 from modules.prometheus_client import PrometheusClient
 from modules.benchmark_runner import BenchmarkRunner
 from modules.artifact_generator import ArtifactGenerator
+from modules.artifact_stream import find_artifact
 from modules.machine_specs import enrich_cluster_info
+from modules.reanalyzer import Reanalyzer
+from modules.regression_gate import DEFAULT_ROLLING_RUNS, GATED_METRICS, REGRESSION_EXIT_CODE, RegressionGate
+from modules.run_comparison import COMPARISON_METRICS, RunComparator
+from modules.series_stats import PERCENTILE_METHODS
 
 # Configure logging
 logging.basicConfig(
@@ -59,9 +78,11 @@ class BenchmarkOrchestrator:
         self.config = config
         self.terraform = TerraformExecutor(config)
         self.helm = HelmDeployer(config)
-        self.prometheus = PrometheusClient(config)
+        # Created once the Prometheus port-forward is up
+        self.prometheus = None
         self.benchmark_runner = BenchmarkRunner(config)
         self.artifact_generator = ArtifactGenerator(config)
+        self.regression_gate = RegressionGate(config) if config.get('regression_gate') else None
 
     def _setup_authentication(self):
         """Setup GCP authentication for Terraform and gcloud"""
@@ -133,8 +154,9 @@ class BenchmarkOrchestrator:
             # Setup port-forward for metrics collection
             prometheus_forward = self.helm.setup_prometheus_access()
 
-            # Update Prometheus URL to use localhost with proper namespace configuration
+            # Query Prometheus through the port-forward with proper namespace configuration
             self.prometheus = PrometheusClient({
+                **self.config,
                 'prometheus_url': 'http://localhost:9090',
                 'namespace': 'default'
             })
@@ -145,23 +167,44 @@ class BenchmarkOrchestrator:
             self.helm.wait_for_services()
             logger.info("All services ready")
             
-            # Step 5: Run benchmark
+            # Step 5: Run benchmark, fetching completed metric windows as it runs
             logger.info(f"Step 5: Running benchmark for {self.config['duration']}s...")
+            collector = None
+            if self.config.get('incremental_window', 30) > 0:
+                collector = self.prometheus.start_incremental_collection(
+                    self.config['duration'], self.config.get('incremental_window', 30)
+                )
             benchmark_results = self.benchmark_runner.run_benchmark(
-                duration=self.config['duration']
+                duration=self.config['duration'],
+                collector=collector
             )
             logger.info("Benchmark completed")
             
             # Step 6: Collect metrics from Prometheus
             logger.info("Step 6: Collecting comprehensive metrics from Prometheus...")
+            prefetched = None
+            if collector:
+                try:
+                    prefetched = collector.finish(benchmark_results['end_time'])
+                except Exception as e:
+                    logger.warning(f"Incremental collection could not be completed: {e}")
             metrics = self.prometheus.collect_metrics(
                 start_time=benchmark_results['start_time'],
-                end_time=benchmark_results['end_time']
+                end_time=benchmark_results['end_time'],
+                prefetched=prefetched
             )
             logger.info(f"Collected metrics: {metrics['summary'].get('total_pods', 0)} pods, "
                        f"{metrics['summary'].get('total_nodes', 0)} nodes, "
                        f"{metrics['summary'].get('total_services', 0)} services")
             
+            # Step 6.1: Keep the raw data, which is lost once the cluster is destroyed
+            snapshot_path = None
+            if self.config.get('tsdb_snapshot', True):
+                logger.info("Step 6.1: Exporting Prometheus TSDB snapshot...")
+                snapshot_path = self._export_tsdb_snapshot()
+                if snapshot_path:
+                    metrics['collection_metadata']['tsdb_snapshot'] = Path(snapshot_path).name
+            
             # Step 7: Generate benchmark artifact
             logger.info("Step 7: Generating benchmark artifact...")
             artifact = self.artifact_generator.generate(
@@ -170,9 +213,15 @@ class BenchmarkOrchestrator:
                 benchmark_results=benchmark_results
             )
             
-            artifact_path = self.artifact_generator.save_artifact(artifact)
+            artifact_path = self.artifact_generator.save_artifact(artifact, metrics.get('raw_series'))
             logger.info(f"Artifact saved to: {artifact_path}")
             
+            # Step 8: Compare the services with the baseline
+            regression_report = None
+            if self.regression_gate:
+                logger.info("Step 8: Checking for performance regressions...")
+                regression_report = self.regression_gate.check(artifact_path)
+            
             # Summary
             logger.info("=" * 60)
             logger.info("Benchmark Pipeline Completed Successfully!")
@@ -197,6 +246,13 @@ class BenchmarkOrchestrator:
             logger.info(f"  - Cluster summary: benchmarks/cluster_summary.csv")
             logger.info(f"  - Per-pod metrics: benchmarks/{self.config['run_id']}_pods.csv")
             logger.info(f"  - Per-node metrics: benchmarks/{self.config['run_id']}_nodes.csv")
+            if metrics.get('raw_series'):
+                logger.info(f"  - Raw series: benchmarks/{self.config['run_id']}_series/")
+            if snapshot_path:
+                logger.info(f"  - TSDB snapshot: {snapshot_path}")
+            if regression_report:
+                logger.info(f"  - Regression report ({regression_report['status']}): "
+                           f"benchmarks/{self.config['run_id']}_regression.json")
             logger.info("")
             logger.info(f"Grafana Dashboard: {monitoring_info.get('grafana_url')}")
             logger.info("=" * 60)
@@ -204,6 +260,8 @@ class BenchmarkOrchestrator:
             return {
                 'success': True,
                 'artifact_path': artifact_path,
+                'tsdb_snapshot_path': snapshot_path,
+                'regression_report': regression_report,
                 'cluster_info': cluster_info,
                 'monitoring_info': monitoring_info
             }
@@ -223,6 +281,29 @@ class BenchmarkOrchestrator:
                 'success': False,
                 'error': str(e)
             }
+        
+        finally:
+            self._close_prometheus()
+    
+    def _close_prometheus(self):
+        """Shut down the Prometheus client's query threads and connections"""
+        if self.prometheus:
+            self.prometheus.close()
+            self.prometheus = None
+    
+    def _export_tsdb_snapshot(self):
+        """
+        Snapshot the Prometheus TSDB and copy it next to the run's artifacts.
+        
+        Returns:
+            Path to benchmarks/<run_id>_tsdb.tar.gz, or None if the export failed
+        """
+        snapshot_name = self.prometheus.create_snapshot()
+        if not snapshot_name:
+            return None
+        
+        output_path = self.artifact_generator.output_dir / f"{self.config['run_id']}_tsdb.tar.gz"
+        return self.helm.export_prometheus_snapshot(snapshot_name, output_path)
     
     def cleanup(self):
         """Clean up resources"""
@@ -232,6 +313,9 @@ class BenchmarkOrchestrator:
         
         cleanup_errors = []
         
+        # The port-forward goes away with the cluster
+        self._close_prometheus()
+        
         # Step 1: Uninstall Helm releases
         try:
             logger.info("Step 1: Uninstalling Helm releases...")
@@ -356,12 +440,430 @@ def parse_args():
         default=50,
         help='Target requests per second for load testing (default: 50)'
     )
+
+    parser.add_argument(
+        '--per-pod-queries',
+        action='store_true',
+        help='Query Prometheus once per pod instead of using grouped queries'
+    )
+
+    parser.add_argument(
+        '--no-recording-rules',
+        action='store_true',
+        help='Query raw series even if the benchmark recording rules are loaded'
+    )
+
+    parser.add_argument(
+        '--top-k-containers',
+        type=int,
+        default=0,
+        help='Collect full statistics only for pods holding the K busiest containers '
+             'by CPU or memory and aggregate the rest; 0 collects every pod (default: 0)'
+    )
+
+    parser.add_argument(
+        '--no-query-cache',
+        action='store_true',
+        help='Always query Prometheus instead of serving closed windows from .cache/prometheus'
+    )
+
+    parser.add_argument(
+        '--query-concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of concurrent Prometheus queries (default: 8)'
+    )
+
+    parser.add_argument(
+        '--incremental-window',
+        type=int,
+        default=30,
+        help='Fetch metrics in windows of this many seconds while the benchmark '
+             'runs; 0 collects everything at the end (default: 30)'
+    )
+
+    parser.add_argument(
+        '--no-series-store',
+        action='store_true',
+        help='Do not save the raw series to the columnar store benchmarks/<run_id>_series/'
+    )
+
+    parser.add_argument(
+        '--series-value-dtype',
+        choices=['float64', 'float32'],
+        default='float64',
+        help='Value precision of the columnar series store (default: float64)'
+    )
+
+    parser.add_argument(
+        '--artifact-compression',
+        choices=['none', 'gzip', 'zstd', 'auto'],
+        default='none',
+        help='Stream the artifact to a compressed benchmarks/<run_id>.jsonl.gz or '
+             '.jsonl.zst instead of <run_id>.json; auto picks zstd when the '
+             'zstandard package is installed (default: none)'
+    )
+
+    parser.add_argument(
+        '--skip-tsdb-snapshot',
+        action='store_true',
+        help='Do not export a Prometheus TSDB snapshot to benchmarks/<run_id>_tsdb.tar.gz'
+    )
+    
+    add_regression_gate_args(parser)
     
     return parser.parse_args()
 
 
+def add_regression_gate_args(parser):
+    """Add the baseline and tolerance arguments of the regression gate"""
+    parser.add_argument(
+        '--baseline-run',
+        type=str,
+        default=None,
+        help='Compare the run with this artifact in benchmarks/, e.g. a run_id or <run_id>.v2'
+    )
+    
+    parser.add_argument(
+        '--rolling-baseline',
+        type=run_count_arg,
+        nargs='?',
+        const=DEFAULT_ROLLING_RUNS,
+        default=None,
+        metavar='RUNS',
+        help='Compare the run with the median of the latest comparable cataloged runs '
+             f'(default: {DEFAULT_ROLLING_RUNS} runs)'
+    )
+    
+    parser.add_argument(
+        '--tolerance',
+        type=tolerance_arg,
+        action='append',
+        default=[],
+        metavar='METRIC=PCT',
+        help='Allowed increase of a per-service metric in percent; repeat for several '
+             f"(defaults: {', '.join(f'{metric}={pct:g}' for metric, (pct, _) in GATED_METRICS.items())})"
+    )
+
+
+def run_count_arg(value):
+    """Parse the number of runs of a rolling baseline, at least one"""
+    try:
+        runs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"number of runs must be an integer, got {value!r}")
+    if runs < 1:
+        raise argparse.ArgumentTypeError(f"a rolling baseline needs at least 1 run, got {runs}")
+    return runs
+
+
+def tolerance_arg(value):
+    """Parse a METRIC=PCT regression tolerance"""
+    metric, _, percent = value.partition('=')
+    if metric not in GATED_METRICS:
+        raise argparse.ArgumentTypeError(f"unknown metric {metric!r}; choose from {', '.join(GATED_METRICS)}")
+    try:
+        return metric, float(percent)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tolerance of {metric} must be a number of percent, got {percent!r}")
+
+
+def parse_reanalyze_args(argv):
+    """Parse command line arguments of the reanalyze subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='main.py reanalyze',
+        description='Rebuild benchmark artifacts from the raw series stored with finished runs'
+    )
+    
+    parser.add_argument(
+        'run_ids',
+        nargs='*',
+        metavar='run_id',
+        help='Runs to reanalyze; each needs its artifact in benchmarks/ and <run_id>_series/'
+    )
+    
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Reanalyze every run in benchmarks/ that has a series store'
+    )
+    
+    parser.add_argument(
+        '--warmup-seconds',
+        type=float,
+        default=0,
+        help='Leave the first seconds of each run out of all statistics (default: 0)'
+    )
+    
+    parser.add_argument(
+        '--percentile-method',
+        choices=PERCENTILE_METHODS,
+        default='linear',
+        help='np.percentile estimation method for per-pod percentiles (default: linear)'
+    )
+    
+    parser.add_argument(
+        '--sketch-accuracy',
+        type=float,
+        default=0.01,
+        help='Relative accuracy of the cluster and service quantile sketches (default: 0.01)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of runs reanalyzed in parallel processes (default: CPU count)'
+    )
+    
+    args = parser.parse_args(argv)
+    if not args.run_ids and not args.all:
+        parser.error('give at least one run_id or --all')
+    
+    return args
+
+
+def reanalyze_main(argv):
+    """Entry point of the reanalyze subcommand"""
+    args = parse_reanalyze_args(argv)
+    
+    reanalyzer = Reanalyzer({
+        'warmup_seconds': args.warmup_seconds,
+        'percentile_method': args.percentile_method,
+        'sketch_relative_accuracy': args.sketch_accuracy,
+    })
+    
+    run_ids = list(args.run_ids)
+    if args.all:
+        run_ids = list(dict.fromkeys(run_ids + reanalyzer.stored_runs()))
+    if not run_ids:
+        logger.error("No runs with a series store found in benchmarks/")
+        return 1
+    
+    results = reanalyzer.reanalyze_runs(run_ids, workers=args.workers)
+    
+    failed = [run_id for run_id, path in results.items() if not path]
+    logger.info(f"Reanalyzed {len(results) - len(failed)} of {len(results)} runs")
+    for run_id in failed:
+        logger.warning(f"  - {run_id} failed")
+    
+    return 1 if failed else 0
+
+
+def catalog_main(argv):
+    """Entry point of the catalog subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='main.py catalog',
+        description='Index every artifact in benchmarks/ in the SQLite results catalog'
+    )
+    
+    parser.add_argument(
+        '--catalog-path',
+        type=str,
+        default=None,
+        help='Catalog database file (default: benchmarks/results.db)'
+    )
+    
+    args = parser.parse_args(argv)
+    
+    generator = ArtifactGenerator({'catalog_path': args.catalog_path})
+    generator.rebuild_catalog()
+    
+    return 0
+
+
+def compare_main(argv):
+    """Entry point of the compare subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='main.py compare',
+        description='Rank machine types and CPU vendors by the runs in the results catalog'
+    )
+    
+    parser.add_argument(
+        '--machine-type',
+        action='append',
+        dest='machine_types',
+        help='Machine type to include; repeat for several (default: all)'
+    )
+    
+    parser.add_argument(
+        '--cpu-vendor',
+        action='append',
+        dest='cpu_vendors',
+        choices=['intel', 'amd', 'arm'],
+        help='CPU vendor to include; repeat for several (default: all)'
+    )
+    
+    parser.add_argument(
+        '--users-count',
+        type=int,
+        default=None,
+        help='Only runs with this number of simulated users'
+    )
+    
+    parser.add_argument(
+        '--rps',
+        type=int,
+        default=None,
+        help='Only runs with this target requests per second'
+    )
+    
+    parser.add_argument(
+        '--node-count',
+        type=int,
+        default=None,
+        help='Only runs with this number of nodes'
+    )
+    
+    parser.add_argument(
+        '--since',
+        type=str,
+        default=None,
+        help='Only runs at or after this ISO timestamp'
+    )
+    
+    parser.add_argument(
+        '--until',
+        type=str,
+        default=None,
+        help='Only runs at or before this ISO timestamp'
+    )
+    
+    parser.add_argument(
+        '--metric',
+        action='append',
+        dest='metrics',
+        choices=list(COMPARISON_METRICS),
+        help='Metric to compare; repeat for several (default: all)'
+    )
+    
+    parser.add_argument(
+        '--bootstrap-samples',
+        type=int,
+        default=10000,
+        help='Bootstrap resamples for the confidence intervals (default: 10000)'
+    )
+    
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='Confidence level of the intervals (default: 0.95)'
+    )
+    
+    parser.add_argument(
+        '--alpha',
+        type=float,
+        default=0.05,
+        help='Significance level of the Mann-Whitney U tests (default: 0.05)'
+    )
+    
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Random seed of the bootstrap, for reproducible intervals (default: 0)'
+    )
+    
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Also write the ranked table to this CSV file'
+    )
+    
+    parser.add_argument(
+        '--catalog-path',
+        type=str,
+        default=None,
+        help='Catalog database file (default: benchmarks/results.db)'
+    )
+    
+    args = parser.parse_args(argv)
+    
+    comparator = RunComparator({
+        'catalog_path': args.catalog_path,
+        'metrics': args.metrics,
+        'bootstrap_samples': args.bootstrap_samples,
+        'confidence': args.confidence,
+        'alpha': args.alpha,
+        'seed': args.seed,
+    })
+    
+    filters = {
+        column: value
+        for column, value in (('users_count', args.users_count), ('rps', args.rps), ('node_count', args.node_count))
+        if value is not None
+    }
+    rows = comparator.compare(
+        machine_types=args.machine_types,
+        cpu_vendors=args.cpu_vendors,
+        since=args.since,
+        until=args.until,
+        **filters
+    )
+    if not rows:
+        logger.error("No cataloged runs match; run 'python main.py catalog' to index existing artifacts")
+        return 1
+    
+    print(comparator.format_table(rows))
+    if args.output:
+        comparator.save_csv(rows, args.output)
+    
+    return 0
+
+
+def gate_main(argv):
+    """Entry point of the gate subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='main.py gate',
+        description='Check a stored run for per-service regressions against a baseline '
+                    f'(exit code {REGRESSION_EXIT_CODE} on a regression)'
+    )
+    
+    parser.add_argument(
+        'artifact',
+        help='Run to check, e.g. a run_id or <run_id>.v2 in benchmarks/'
+    )
+    
+    add_regression_gate_args(parser)
+    
+    args = parser.parse_args(argv)
+    
+    gate = RegressionGate({
+        'baseline_run': args.baseline_run,
+        'rolling_baseline_runs': args.rolling_baseline,
+        'regression_tolerances': dict(args.tolerance),
+    })
+    
+    artifact_path = find_artifact(gate.output_dir, args.artifact)
+    if artifact_path is None:
+        logger.error(f"Artifact {args.artifact} not found in {gate.output_dir}")
+        return 1
+    
+    try:
+        report = gate.check(artifact_path)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return 1
+    
+    return REGRESSION_EXIT_CODE if report['status'] == 'fail' else 0
+
+
+# Offline subcommands; they never touch the cloud, so they skip the pipeline setup
+SUBCOMMANDS = {
+    'reanalyze': reanalyze_main,
+    'catalog': catalog_main,
+    'compare': compare_main,
+    'gate': gate_main,
+}
+
+
 def main():
     """Main entry point"""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+    
     args = parse_args()
     
     # Build configuration
@@ -378,7 +880,21 @@ def main():
         'run_id': f"{args.cloud}-{args.cpu_vendor}-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
         'gcp_project_id': os.environ.get('GCP_PROJECT_ID'),  # ADD THIS LINE
         'users_count': args.users_count,
-        'rps': args.rps
+        'rps': args.rps,
+        'batch_pod_queries': not args.per_pod_queries,
+        'use_recording_rules': not args.no_recording_rules,
+        'top_k_containers': args.top_k_containers,
+        'query_concurrency': args.query_concurrency,
+        'query_cache': not args.no_query_cache,
+        'incremental_window': args.incremental_window,
+        'tsdb_snapshot': not args.skip_tsdb_snapshot,
+        'store_series': not args.no_series_store,
+        'series_value_dtype': args.series_value_dtype,
+        'artifact_compression': None if args.artifact_compression == 'none' else args.artifact_compression,
+        'regression_gate': args.baseline_run is not None or args.rolling_baseline is not None,
+        'baseline_run': args.baseline_run,
+        'rolling_baseline_runs': args.rolling_baseline,
+        'regression_tolerances': dict(args.tolerance)
     }
     
     orchestrator = BenchmarkOrchestrator(config)
@@ -389,6 +905,14 @@ def main():
             orchestrator.cleanup()
             return 0
         
+        # Fail before provisioning if the pinned baseline does not exist
+        if args.baseline_run:
+            try:
+                orchestrator.regression_gate.pinned_baseline()
+            except FileNotFoundError as e:
+                logger.error(str(e))
+                return 1
+        
         # Run the pipeline
         result = orchestrator.run_full_pipeline()
         
@@ -396,7 +920,11 @@ def main():
         if args.cleanup:
             orchestrator.cleanup()
         
-        return 0 if result['success'] else 1
+        if not result['success']:
+            return 1
+        if (result.get('regression_report') or {}).get('status') == 'fail':
+            return REGRESSION_EXIT_CODE
+        return 0
     
     except KeyboardInterrupt:
         logger.warning("\n" + "=" * 60)
@@ -0,0 +1,838 @@
+"""
+Artifact Model Module
+
+Typed, versioned schema of a benchmark artifact.
+
+The run, its node pool and load profile, and the cluster, pod, node and
+service metrics are slotted dataclasses. Numeric fields are coerced and
+rounded in one vectorized pass per section when the model is built. Unknown
+keys and missing required values raise SchemaError; statistics a run may not
+produce, such as CPU accounting or per-request costs, are None and written as
+null rather than as a false 0.0.
+
+The model serializes to the JSON artifact layout, to the rows of the CSV
+files and results catalog, and to a compact binary form.
+"""
+
+import io
+import json
+import struct
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from operator import attrgetter
+from typing import ClassVar
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Binary form: magic, then schema version and header length, then the JSON
+# header and the pod and node matrices as .npy blobs
+BINARY_MAGIC = b'BMKART'
+BINARY_PREAMBLE = struct.Struct('<HI')
+
+
+class SchemaError(ValueError):
+    """Artifact data that does not match the schema"""
+
+
+@dataclass(slots=True)
+class PodCpu:
+    """CPU utilization statistics of one container"""
+    avg_utilization_pct: float = 0.0
+    max_utilization_pct: float = 0.0
+    min_utilization_pct: float = 0.0
+    p95_utilization_pct: float = 0.0
+    p99_utilization_pct: float = 0.0
+    std_dev: float = 0.0
+
+
+@dataclass(slots=True)
+class PodCpuThrottling:
+    """CPU throttling statistics of one container; the total comes from CPU accounting"""
+    avg_throttled_seconds: float = 0.0
+    max_throttled_seconds: float = 0.0
+    total_throttled_seconds: float | None = None
+
+
+@dataclass(slots=True)
+class PodCpuAccounting:
+    """CPU-seconds and throttling totals of one container; the ratio is None without a CPU limit"""
+    cpu_seconds: float | None = None
+    throttled_seconds: float | None = None
+    throttled_periods_ratio: float | None = None
+    source: str = 'unknown'
+
+
+@dataclass(slots=True)
+class PodMemory:
+    """Memory usage statistics of one container"""
+    avg_usage_mb: float = 0.0
+    max_usage_mb: float = 0.0
+    min_usage_mb: float = 0.0
+    p95_usage_mb: float = 0.0
+
+
+@dataclass(slots=True)
+class PodMetrics:
+    """Metrics of one container; sections without data are None"""
+    pod_name: str
+    container_name: str
+    cpu: PodCpu | None = None
+    cpu_throttling: PodCpuThrottling | None = None
+    cpu_accounting: PodCpuAccounting | None = None
+    memory: PodMemory | None = None
+    resource_limits: dict | None = None
+
+    def to_dict(self):
+        """Pod entry of the JSON artifact"""
+        pod = {
+            'pod_name': self.pod_name,
+            'container_name': self.container_name,
+            'metrics': _sections_dict(self, POD_SECTIONS),
+        }
+        if self.resource_limits is not None:
+            pod['resource_limits'] = self.resource_limits
+        return pod
+
+
+@dataclass(slots=True)
+class NodeUtilization:
+    """CPU or memory utilization statistics of one node"""
+    avg_utilization_pct: float = 0.0
+    max_utilization_pct: float = 0.0
+    min_utilization_pct: float = 0.0
+
+
+@dataclass(slots=True)
+class NodeMetrics:
+    """Metrics of one node; sections without data are None"""
+    node_name: str
+    cpu: NodeUtilization | None = None
+    memory: NodeUtilization | None = None
+
+    def to_dict(self):
+        """Node entry of the JSON artifact"""
+        return {'node_name': self.node_name, 'metrics': _sections_dict(self, NODE_SECTIONS)}
+
+
+@dataclass(slots=True)
+class ServiceMetrics:
+    """Metrics of one service; statistics that were not collected are None"""
+    cpu_avg_pct: float | None = None
+    cpu_max_pct: float | None = None
+    cpu_p95_pct: float | None = None
+    cpu_p99_pct: float | None = None
+    memory_avg_mb: float | None = None
+    memory_max_mb: float | None = None
+    memory_p95_mb: float | None = None
+    cpu_seconds: float | None = None
+    cpu_throttled_seconds: float | None = None
+    cpu_throttled_periods_ratio: float | None = None
+
+
+@dataclass(slots=True)
+class ClusterCpu:
+    """Cluster-wide CPU metrics; percentiles and accounting totals are None when not collected"""
+    avg_utilization_pct: float = 0.0
+    max_utilization_pct: float = 0.0
+    p95_utilization_pct: float | None = None
+    p99_utilization_pct: float | None = None
+    throttled_seconds: float = 0.0
+    throttled_percentage: float = 0.0
+    cpu_seconds: float | None = None
+    throttled_seconds_total: float | None = None
+    throttled_periods_ratio: float | None = None
+
+
+@dataclass(slots=True)
+class ClusterMemory:
+    """Cluster-wide memory metrics"""
+    avg_usage_mb: float = 0.0
+    max_usage_mb: float = 0.0
+    avg_utilization_pct: float = 0.0
+
+
+@dataclass(slots=True)
+class ClusterNetwork:
+    """Cluster-wide network throughput"""
+    received_mb_per_sec: float = 0.0
+    transmitted_mb_per_sec: float = 0.0
+
+
+@dataclass(slots=True)
+class ClusterMetrics:
+    """Cluster-wide aggregate metrics"""
+    cpu: ClusterCpu = field(default_factory=ClusterCpu)
+    memory: ClusterMemory = field(default_factory=ClusterMemory)
+    network: ClusterNetwork = field(default_factory=ClusterNetwork)
+    request_rate_rps: float = 0.0
+
+    def to_dict(self):
+        """'metrics' section of the JSON artifact"""
+        return {**_sections_dict(self, CLUSTER_SECTIONS), 'request_rate_rps': self.request_rate_rps}
+
+
+@dataclass(slots=True)
+class NormalizedMetrics:
+    """Resource cost per request; None when the run measured no requests"""
+    DECIMALS: ClassVar[int] = 6
+
+    cpu_seconds_per_request: float | None = None
+    memory_mb_per_request: float | None = None
+
+
+@dataclass(slots=True)
+class NodePool:
+    """Machine configuration of the benchmarked node pool"""
+    machine_type: str
+    cpu_vendor: str = 'unknown'
+    cpu_generation: str = 'unknown'
+    node_count: int | str = 1
+    source: str = 'configuration'
+    machine_specs: dict = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class LoadProfile:
+    """Duration and load generator settings of the run"""
+    duration_seconds: int | float
+    start_time: str
+    end_time: str
+    users_count: int | str = 'unknown'
+    rps: int | str = 'unknown'
+
+
+POD_SECTIONS = {
+    'cpu': PodCpu,
+    'cpu_throttling': PodCpuThrottling,
+    'cpu_accounting': PodCpuAccounting,
+    'memory': PodMemory,
+}
+NODE_SECTIONS = {'cpu': NodeUtilization, 'memory': NodeUtilization}
+CLUSTER_SECTIONS = {'cpu': ClusterCpu, 'memory': ClusterMemory, 'network': ClusterNetwork}
+
+# PrometheusClient cluster metric feeding each field of the cluster sections
+CLUSTER_SOURCES = {
+    'cpu': {
+        'avg_utilization_pct': 'avg_cpu_utilization',
+        'max_utilization_pct': 'max_cpu_utilization',
+        'p95_utilization_pct': 'p95_cpu_utilization',
+        'p99_utilization_pct': 'p99_cpu_utilization',
+        'throttled_seconds': 'cpu_throttled_seconds',
+        'throttled_percentage': 'cpu_throttled_percentage',
+        'cpu_seconds': 'cpu_seconds_total',
+        'throttled_seconds_total': 'cpu_throttled_seconds_total',
+        'throttled_periods_ratio': 'cpu_throttled_periods_ratio',
+    },
+    'memory': {
+        'avg_usage_mb': 'avg_memory_mb',
+        'max_usage_mb': 'max_memory_mb',
+        'avg_utilization_pct': 'avg_memory_utilization_pct',
+    },
+    'network': {
+        'received_mb_per_sec': 'total_network_received_mb',
+        'transmitted_mb_per_sec': 'total_network_transmitted_mb',
+    },
+}
+# Cluster metrics that feed the request rate and normalization
+CLUSTER_INPUTS = ('request_rate_rps', 'total_requests')
+
+# Top-level keys of PrometheusClient.collect_metrics() results
+COLLECTED_KEYS = (
+    'cluster', 'pods', 'nodes', 'services', 'other_containers',
+    'summary', 'sketches', 'collection_metadata', 'raw_series',
+)
+
+
+@dataclass(slots=True)
+class BenchmarkArtifact:
+    """One benchmark run with its configuration and all collected metrics"""
+    run_id: str
+    timestamp: str
+    cloud: str
+    region: str
+    zone: str
+    node_pool: NodePool
+    load_profile: LoadProfile
+    metrics: ClusterMetrics
+    normalized_metrics: NormalizedMetrics
+    pods: list = field(default_factory=list)
+    other_containers: dict = field(default_factory=dict)
+    nodes: list = field(default_factory=list)
+    services: dict = field(default_factory=dict)
+    summary: dict = field(default_factory=dict)
+    sketches: dict = field(default_factory=dict)
+    collection_metadata: dict = field(default_factory=dict)
+    artifact_version: int = 1
+    schema_version: int = SCHEMA_VERSION
+
+    @classmethod
+    def from_collected(cls, metrics, **run):
+        """
+        Build an artifact from PrometheusClient.collect_metrics() results.
+
+        The per-request costs are derived from the cluster metrics and the
+        duration of the load profile.
+
+        Args:
+            metrics: Collected metrics (cluster, pods, nodes, services, ...)
+            run: run_id, timestamp, cloud, region, zone, node_pool and load_profile
+
+        Raises:
+            SchemaError: If the metrics hold keys the schema does not know
+        """
+        _check_keys(metrics, COLLECTED_KEYS, 'collected metrics')
+        cluster = metrics.get('cluster', {})
+        _check_keys(
+            cluster,
+            (*CLUSTER_INPUTS, *(source for sources in CLUSTER_SOURCES.values() for source in sources.values())),
+            'cluster metrics'
+        )
+
+        cluster_metrics = ClusterMetrics(
+            **{
+                name: build_section(
+                    section, {key: cluster.get(source) for key, source in CLUSTER_SOURCES[name].items()},
+                    f"cluster {name}"
+                )
+                for name, section in CLUSTER_SECTIONS.items()
+            },
+            request_rate_rps=_round_number(cluster.get('request_rate_rps'), 'request rate'),
+        )
+
+        return cls(
+            **run,
+            metrics=cluster_metrics,
+            normalized_metrics=build_section(
+                NormalizedMetrics,
+                _per_request_costs(cluster, cluster_metrics, run['load_profile'].duration_seconds),
+                'normalized metrics'
+            ),
+            pods=_build_pods(metrics.get('pods', [])),
+            other_containers=metrics.get('other_containers', {}),
+            nodes=_build_nodes(metrics.get('nodes', [])),
+            services=_build_services(metrics.get('services', {})),
+            summary=metrics.get('summary', {}),
+            sketches=metrics.get('sketches', {}),
+            collection_metadata=metrics.get('collection_metadata', {}),
+        )
+
+    @classmethod
+    def from_dict(cls, document):
+        """
+        Build an artifact from its JSON layout, e.g. a loaded <run_id>.json.
+
+        Artifacts written before the schema was versioned load as version 1;
+        optional fields they predate load as None. Per-request costs load as
+        None when the run has no request rate, as such artifacts stored 0.0.
+
+        Raises:
+            SchemaError: If the document has unknown keys, misses a required
+                one or comes from a newer schema version
+        """
+        _check_keys(document, _spec(cls).names, 'artifact')
+        version = document.get('schema_version', SCHEMA_VERSION)
+        if version > SCHEMA_VERSION:
+            raise SchemaError(f"Artifact schema {version} is newer than supported {SCHEMA_VERSION}")
+
+        metrics = document.get('metrics', {})
+        _check_keys(metrics, (*CLUSTER_SECTIONS, 'request_rate_rps'), 'cluster metrics')
+        normalized = document.get('normalized_metrics', {})
+        if not metrics.get('request_rate_rps'):
+            normalized = dict.fromkeys(normalized)
+
+        try:
+            return cls(
+                run_id=document['run_id'],
+                timestamp=document['timestamp'],
+                cloud=document['cloud'],
+                region=document['region'],
+                zone=document['zone'],
+                node_pool=_build_record(NodePool, document['node_pool'], 'node pool'),
+                load_profile=_build_record(LoadProfile, document['load_profile'], 'load profile'),
+                metrics=ClusterMetrics(
+                    **{
+                        name: build_section(section, metrics.get(name, {}), f"cluster {name}")
+                        for name, section in CLUSTER_SECTIONS.items()
+                    },
+                    request_rate_rps=_round_number(metrics.get('request_rate_rps'), 'request rate'),
+                ),
+                normalized_metrics=build_section(NormalizedMetrics, normalized, 'normalized metrics'),
+                pods=_build_pods(document.get('pods', [])),
+                other_containers=document.get('other_containers', {}),
+                nodes=_build_nodes(document.get('nodes', [])),
+                services=_build_services(document.get('services', {})),
+                summary=document.get('summary', {}),
+                sketches=document.get('sketches', {}),
+                collection_metadata=document.get('collection_metadata', {}),
+                artifact_version=document.get('artifact_version', 1),
+            )
+        except KeyError as e:
+            raise SchemaError(f"Artifact is missing {e}") from e
+
+    def to_dict(self):
+        """Artifact in its JSON layout"""
+        return {
+            'schema_version': self.schema_version,
+            'run_id': self.run_id,
+            'artifact_version': self.artifact_version,
+            'timestamp': self.timestamp,
+            'cloud': self.cloud,
+            'region': self.region,
+            'zone': self.zone,
+            'node_pool': _record_dict(self.node_pool),
+            'load_profile': _record_dict(self.load_profile),
+            'metrics': self.metrics.to_dict(),
+            'normalized_metrics': _record_dict(self.normalized_metrics),
+            'pods': [pod.to_dict() for pod in self.pods],
+            'other_containers': self.other_containers,
+            'nodes': [node.to_dict() for node in self.nodes],
+            'services': {name: _record_dict(service) for name, service in self.services.items()},
+            'summary': self.summary,
+            'sketches': self.sketches,
+            'collection_metadata': self.collection_metadata,
+        }
+
+    def to_json(self):
+        """
+        JSON artifact text.
+
+        Sections are indented, but each pod, node and nested section is one
+        line written by the C JSON encoder; json.dump(indent=2) falls back
+        to the much slower pure-Python encoder.
+        """
+        entries = [f"  {json.dumps(key)}: {_json_block(value, 2)}" for key, value in self.to_dict().items()]
+        return '{\n' + ',\n'.join(entries) + '\n}\n'
+
+    def to_bytes(self):
+        """
+        Compact binary form: the header sections as JSON, and the pod and
+        node metrics as float64 matrices with NaN for missing values.
+        """
+        header = {
+            key: value for key, value in self.to_dict().items() if key not in ('pods', 'nodes')
+        }
+        header['pod_names'] = [[pod.pod_name, pod.container_name] for pod in self.pods]
+        header['pod_accounting_sources'] = [
+            pod.cpu_accounting.source if pod.cpu_accounting is not None else None for pod in self.pods
+        ]
+        header['pod_resource_limits'] = [pod.resource_limits for pod in self.pods]
+        header['node_names'] = [node.node_name for node in self.nodes]
+        encoded_header = json.dumps(header, separators=(',', ':')).encode()
+
+        buffer = io.BytesIO()
+        buffer.write(BINARY_MAGIC)
+        buffer.write(BINARY_PREAMBLE.pack(self.schema_version, len(encoded_header)))
+        buffer.write(encoded_header)
+        np.save(buffer, _sections_matrix(self.pods, POD_SECTIONS), allow_pickle=False)
+        np.save(buffer, _sections_matrix(self.nodes, NODE_SECTIONS), allow_pickle=False)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild an artifact from to_bytes() output"""
+        if not data.startswith(BINARY_MAGIC):
+            raise SchemaError("Not a binary benchmark artifact")
+        offset = len(BINARY_MAGIC)
+        version, header_length = BINARY_PREAMBLE.unpack_from(data, offset)
+        if version > SCHEMA_VERSION:
+            raise SchemaError(f"Artifact schema {version} is newer than supported {SCHEMA_VERSION}")
+        offset += BINARY_PREAMBLE.size
+
+        header = json.loads(data[offset:offset + header_length])
+        buffer = io.BytesIO(data[offset + header_length:])
+        pod_matrix = np.load(buffer, allow_pickle=False)
+        node_matrix = np.load(buffer, allow_pickle=False)
+
+        pod_names = header.pop('pod_names')
+        sources = header.pop('pod_accounting_sources')
+        limits = header.pop('pod_resource_limits')
+        node_names = header.pop('node_names')
+
+        artifact = cls.from_dict(header)
+        pod_sections = _matrix_sections(pod_matrix, POD_SECTIONS)
+        for position, (pod_name, container_name) in enumerate(pod_names):
+            sections = pod_sections[position]
+            # An accounting section may hold no numbers, but it always has a source
+            if sources[position] is not None:
+                sections['cpu_accounting'] = sections['cpu_accounting'] or PodCpuAccounting()
+                sections['cpu_accounting'].source = sources[position]
+            artifact.pods.append(PodMetrics(pod_name, container_name, **sections,
+                                            resource_limits=limits[position]))
+        for node_name, sections in zip(node_names, _matrix_sections(node_matrix, NODE_SECTIONS)):
+            artifact.nodes.append(NodeMetrics(node_name, **sections))
+        return artifact
+
+    def summary_row(self):
+        """Cluster-level metrics flattened into one cluster_summary.csv row"""
+        specs = self.node_pool.machine_specs
+        cpu = self.metrics.cpu
+        memory = self.metrics.memory
+        return {
+            'run_id': self.run_id,
+            'timestamp': self.timestamp,
+            'cloud': self.cloud,
+            'region': self.region,
+            'zone': self.zone,
+            'machine_type': self.node_pool.machine_type,
+            'cpu_vendor': self.node_pool.cpu_vendor,
+            'cpu_generation': self.node_pool.cpu_generation,
+            'node_count': self.node_pool.node_count,
+            'vcpus': specs.get('vcpus', 'unknown'),
+            'memory_gb': specs.get('memory_gb', 'unknown'),
+            'duration_seconds': self.load_profile.duration_seconds,
+            'users_count': self.load_profile.users_count,
+            'rps': self.load_profile.rps,
+
+            # CPU metrics
+            'cpu_avg_util_pct': cpu.avg_utilization_pct,
+            'cpu_max_util_pct': cpu.max_utilization_pct,
+            'cpu_p95_util_pct': cpu.p95_utilization_pct,
+            'cpu_p99_util_pct': cpu.p99_utilization_pct,
+            'cpu_throttled_seconds': cpu.throttled_seconds,
+            'cpu_throttled_pct': cpu.throttled_percentage,
+
+            # Memory metrics
+            'memory_avg_mb': memory.avg_usage_mb,
+            'memory_max_mb': memory.max_usage_mb,
+            'memory_avg_util_pct': memory.avg_utilization_pct,
+
+            # Network metrics
+            'network_rx_mb_per_sec': self.metrics.network.received_mb_per_sec,
+            'network_tx_mb_per_sec': self.metrics.network.transmitted_mb_per_sec,
+
+            # Request rate
+            'request_rate_rps': self.metrics.request_rate_rps,
+
+            # Normalized metrics
+            'cpu_seconds_per_request': self.normalized_metrics.cpu_seconds_per_request,
+            'memory_mb_per_request': self.normalized_metrics.memory_mb_per_request,
+
+            # Summary stats
+            'total_pods': self.summary.get('total_pods', 0),
+            'total_nodes': self.summary.get('total_nodes', 0),
+            'total_services': self.summary.get('total_services', 0),
+        }
+
+    def catalog_row(self):
+        """
+        Run row of the results catalog: the summary row plus cluster CPU-seconds
+        totals, which are None for runs collected without CPU accounting
+        """
+        return {
+            **self.summary_row(),
+            'artifact_version': self.artifact_version,
+            'cpu_seconds': self.metrics.cpu.cpu_seconds,
+            'cpu_throttled_seconds_total': self.metrics.cpu.throttled_seconds_total,
+        }
+
+    def pod_rows(self):
+        """Per-pod metrics flattened into one row per container"""
+        rows = []
+        for pod in self.pods:
+            row = {'run_id': self.run_id, 'pod_name': pod.pod_name, 'container_name': pod.container_name}
+            if pod.cpu is not None:
+                row.update({
+                    'cpu_avg_pct': pod.cpu.avg_utilization_pct,
+                    'cpu_max_pct': pod.cpu.max_utilization_pct,
+                    'cpu_min_pct': pod.cpu.min_utilization_pct,
+                    'cpu_p95_pct': pod.cpu.p95_utilization_pct,
+                    'cpu_p99_pct': pod.cpu.p99_utilization_pct,
+                    'cpu_std_dev': pod.cpu.std_dev,
+                })
+            if pod.cpu_throttling is not None:
+                row.update({
+                    'cpu_throttled_avg_sec': pod.cpu_throttling.avg_throttled_seconds,
+                    'cpu_throttled_max_sec': pod.cpu_throttling.max_throttled_seconds,
+                    'cpu_throttled_total_sec': pod.cpu_throttling.total_throttled_seconds,
+                })
+            if pod.cpu_accounting is not None:
+                row.update({
+                    'cpu_seconds': pod.cpu_accounting.cpu_seconds,
+                    'cpu_throttled_periods_ratio': pod.cpu_accounting.throttled_periods_ratio,
+                })
+            if pod.memory is not None:
+                row.update({
+                    'memory_avg_mb': pod.memory.avg_usage_mb,
+                    'memory_max_mb': pod.memory.max_usage_mb,
+                    'memory_min_mb': pod.memory.min_usage_mb,
+                    'memory_p95_mb': pod.memory.p95_usage_mb,
+                })
+            if pod.resource_limits is not None:
+                row['cpu_limit_cores'] = pod.resource_limits.get('cpu_limit_cores', 'N/A')
+            rows.append(row)
+        return rows
+
+    def node_rows(self):
+        """Per-node metrics flattened into one row per node"""
+        rows = []
+        for node in self.nodes:
+            row = {'run_id': self.run_id, 'node_name': node.node_name}
+            if node.cpu is not None:
+                row.update({
+                    'cpu_avg_pct': node.cpu.avg_utilization_pct,
+                    'cpu_max_pct': node.cpu.max_utilization_pct,
+                    'cpu_min_pct': node.cpu.min_utilization_pct,
+                })
+            if node.memory is not None:
+                row.update({
+                    'memory_avg_util_pct': node.memory.avg_utilization_pct,
+                    'memory_max_util_pct': node.memory.max_utilization_pct,
+                    'memory_min_util_pct': node.memory.min_utilization_pct,
+                })
+            rows.append(row)
+        return rows
+
+
+def build_section(cls, values, where=None):
+    """
+    Build one section dataclass from a dictionary, coercing and rounding its
+    numeric fields.
+
+    Example:
+        build_section(NormalizedMetrics, {'cpu_seconds_per_request': 0.0123456789})
+
+    Raises:
+        SchemaError: If values has keys that are not fields of cls, or lacks
+            a required one
+    """
+    return _build_sections(cls, [values], where or cls.__name__)[0]
+
+
+@dataclass(frozen=True, slots=True)
+class _Spec:
+    """Field layout of a schema dataclass"""
+    names: tuple
+    allowed: frozenset
+    numeric: tuple
+    optional: frozenset
+    others: tuple
+    positional: bool
+    decimals: int
+    getter: attrgetter
+
+
+@lru_cache(maxsize=None)
+def _spec(cls):
+    """Field layout of a dataclass: numeric, optional numeric and other fields"""
+    names = tuple(f.name for f in fields(cls))
+    numeric = tuple(f.name for f in fields(cls) if f.type in (float, float | None))
+    return _Spec(
+        names=names,
+        allowed=frozenset(names),
+        numeric=numeric,
+        optional=frozenset(f.name for f in fields(cls) if f.type == float | None),
+        others=tuple(name for name in names if name not in numeric),
+        # Numeric fields leading the class can be passed positionally
+        positional=names[:len(numeric)] == numeric,
+        decimals=getattr(cls, 'DECIMALS', 4),
+        getter=attrgetter(*names),
+    )
+
+
+@lru_cache(maxsize=None)
+def _key_set(allowed):
+    """Cached set of a tuple of allowed keys"""
+    return frozenset(allowed)
+
+
+def _check_keys(values, allowed, where):
+    """Fail fast on keys the schema does not know; allowed is a tuple or mapping of names"""
+    if not isinstance(values, dict):
+        raise SchemaError(f"Expected a mapping for {where}, got {type(values).__name__}")
+    known = allowed.keys() if isinstance(allowed, dict) else _key_set(allowed)
+    if not values.keys() <= known:
+        unknown = values.keys() - known
+        raise SchemaError(f"Unknown {where} keys {sorted(unknown)}; expected a subset of {list(allowed)}")
+
+
+def _round_values(rows, decimals, where):
+    """Coerce rows of values to a float64 matrix and round it in one pass; None becomes NaN"""
+    try:
+        matrix = np.array(rows, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise SchemaError(f"Non-numeric {where} value: {e}") from e
+    return np.round(matrix, decimals)
+
+
+def _round_number(value, where, decimals=4):
+    """Coerce and round a single required value"""
+    number = float(_round_values(value, decimals, where))
+    if number != number:
+        raise SchemaError(f"Missing {where} value")
+    return number
+
+
+def _build_sections(cls, dicts, where):
+    """Build section dataclasses from dictionaries with one vectorized coercion pass"""
+    spec = _spec(cls)
+    for values in dicts:
+        if not isinstance(values, dict) or not values.keys() <= spec.allowed:
+            _check_keys(values, spec.names, where)
+    if not dicts:
+        return []
+
+    matrix = _round_values([[*map(values.get, spec.numeric)] for values in dicts], spec.decimals, where)
+    required = [position for position, name in enumerate(spec.numeric) if name not in spec.optional]
+    missing = np.isnan(matrix[:, required])
+    if missing.any():
+        row, column = np.argwhere(missing)[0]
+        raise SchemaError(f"Missing {where} value {spec.numeric[required[column]]} "
+                          f"in {int(missing.any(axis=1).sum())} of {len(dicts)} entries (first: #{row})")
+    rows = matrix.tolist()
+    if spec.optional:
+        rows = [[None if number != number else number for number in row] for row in rows]
+
+    if not spec.positional:
+        return [cls(**dict(zip(spec.numeric, row)), **_present(values, spec.others)) for values, row in zip(dicts, rows)]
+    if not spec.others:
+        return [cls(*row) for row in rows]
+    return [cls(*row, **_present(values, spec.others)) for values, row in zip(dicts, rows)]
+
+
+def _per_request_costs(cluster, cluster_metrics, duration):
+    """
+    NormalizedMetrics values of a run; None when it measured no requests.
+
+    Uses the coerced and rounded cluster sections. CPU-seconds are divided
+    by the counted requests, falling back to the average rate times the
+    duration, which only estimates the count.
+    """
+    costs = dict.fromkeys(_spec(NormalizedMetrics).names)
+    request_rate = cluster_metrics.request_rate_rps
+    if request_rate <= 0:
+        return costs
+
+    counted = float(_round_values(cluster.get('total_requests'), 4, 'total requests'))
+    total_requests = counted if counted > 0 else request_rate * duration
+    if total_requests > 0:
+        if cluster_metrics.cpu.cpu_seconds is not None:
+            costs['cpu_seconds_per_request'] = cluster_metrics.cpu.cpu_seconds / total_requests
+        costs['memory_mb_per_request'] = cluster_metrics.memory.avg_usage_mb / request_rate
+    return costs
+
+
+def _present(values, names):
+    """The entries of values for the given names that are present"""
+    return {name: values[name] for name in names if name in values}
+
+
+def _build_record(cls, values, where):
+    """Build a dataclass of non-numeric fields, failing fast on unknown or missing keys"""
+    _check_keys(values, _spec(cls).names, where)
+    try:
+        return cls(**values)
+    except TypeError as e:
+        raise SchemaError(f"Invalid {where}: {e}") from e
+
+
+def _build_pods(pods):
+    """Build PodMetrics with one coercion pass per metrics section over all pods"""
+    pods = list(pods)
+    for pod in pods:
+        _check_keys(pod, ('pod_name', 'container_name', 'metrics', 'resource_limits'), 'pod')
+        _check_keys(pod.get('metrics', {}), POD_SECTIONS, 'pod metrics')
+    sections = _build_nested(pods, POD_SECTIONS, 'pod')
+
+    return [
+        PodMetrics(
+            pod_name=pod.get('pod_name', 'unknown'),
+            container_name=pod.get('container_name', 'unknown'),
+            **sections[position],
+            resource_limits=pod.get('resource_limits'),
+        )
+        for position, pod in enumerate(pods)
+    ]
+
+
+def _build_nodes(nodes):
+    """Build NodeMetrics with one coercion pass per metrics section over all nodes"""
+    nodes = list(nodes)
+    for node in nodes:
+        _check_keys(node, ('node_name', 'metrics'), 'node')
+        _check_keys(node.get('metrics', {}), NODE_SECTIONS, 'node metrics')
+    sections = _build_nested(nodes, NODE_SECTIONS, 'node')
+
+    return [
+        NodeMetrics(node_name=node.get('node_name', 'unknown'), **sections[position])
+        for position, node in enumerate(nodes)
+    ]
+
+
+def _build_services(services):
+    """Build ServiceMetrics for every service in one coercion pass"""
+    return dict(zip(services, _build_sections(ServiceMetrics, list(services.values()), 'service metrics')))
+
+
+def _build_nested(entries, section_types, where):
+    """Build the metrics sections of pods or nodes, section by section"""
+    sections = [dict.fromkeys(section_types) for _ in entries]
+    for name, cls in section_types.items():
+        present = [position for position, entry in enumerate(entries) if name in entry.get('metrics', {})]
+        built = _build_sections(cls, [entries[position]['metrics'][name] for position in present],
+                                f"{where} {name}")
+        for position, section in zip(present, built):
+            sections[position][name] = section
+    return sections
+
+
+def _record_dict(record):
+    """Fields of a dataclass as a dictionary; optional fields that are None stay as null"""
+    spec = _spec(type(record))
+    values = spec.getter(record) if len(spec.names) > 1 else (spec.getter(record),)
+    return dict(zip(spec.names, values))
+
+
+def _sections_dict(record, section_types):
+    """Dictionary of the sections of a pod, node or cluster that have data"""
+    return {
+        name: _record_dict(getattr(record, name))
+        for name in section_types
+        if getattr(record, name) is not None
+    }
+
+
+@lru_cache(maxsize=None)
+def _matrix_columns(section_items):
+    """(section, field) of each column of a binary metrics matrix"""
+    return tuple((name, field_name) for name, cls in section_items for field_name in _spec(cls).numeric)
+
+
+def _sections_matrix(records, section_types):
+    """Numeric section fields of pods or nodes as a float64 matrix, NaN where a section is missing"""
+    columns = _matrix_columns(tuple(section_types.items()))
+    matrix = np.full((len(records), len(columns)), np.nan)
+    for row, record in enumerate(records):
+        for column, (name, field_name) in enumerate(columns):
+            section = getattr(record, name)
+            if section is not None:
+                matrix[row, column] = getattr(section, field_name)
+    return matrix
+
+
+def _matrix_sections(matrix, section_types):
+    """Rebuild the sections of each row of a binary metrics matrix; NaN becomes None"""
+    columns = _matrix_columns(tuple(section_types.items()))
+    rows = []
+    for values in matrix.tolist():
+        numbers = {}
+        for (name, field_name), value in zip(columns, values):
+            numbers.setdefault(name, {})[field_name] = None if value != value else value
+        rows.append({
+            name: None if all(value is None for value in numbers[name].values()) else cls(**numbers[name])
+            for name, cls in section_types.items()
+        })
+    return rows
+
+
+def _json_block(value, indent):
+    """Encode a dict or list with one compact entry per line"""
+    pad = ' ' * (indent + 2)
+    if isinstance(value, dict) and value:
+        entries = [f"{pad}{json.dumps(key)}: {json.dumps(item)}" for key, item in value.items()]
+        return '{\n' + ',\n'.join(entries) + f"\n{' ' * indent}}}"
+    if isinstance(value, list) and value:
+        entries = [f"{pad}{json.dumps(item)}" for item in value]
+        return '[\n' + ',\n'.join(entries) + f"\n{' ' * indent}]"
+    return json.dumps(value)
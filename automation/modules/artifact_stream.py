@@ -0,0 +1,240 @@
+"""
+Artifact Stream Module
+
+Compressed, line-delimited artifact format that is written and read one
+record at a time:
+
+    <run_id>.jsonl.gz (or .jsonl.zst)
+    {"format": "benchmark-artifact-stream", "version": 1, "header": {...}}
+    {"node": {...}}        # one line per node
+    {"pod": {...}}         # one line per container
+
+The header holds every artifact section except pods and nodes, so it can be
+read without decompressing the rest of the file. zstd is used when the
+optional zstandard package is installed, gzip otherwise.
+"""
+
+import gzip
+import io
+import json
+import logging
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMAT = 'benchmark-artifact-stream'
+STREAM_VERSION = 1
+
+# File suffix of each compression; plain JSON artifacts use '.json'
+COMPRESSION_SUFFIXES = {
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst',
+}
+ARTIFACT_SUFFIXES = ('.json',) + tuple(COMPRESSION_SUFFIXES.values())
+
+# Sections written as one record per item instead of into the header
+STREAMED_SECTIONS = {'nodes': 'node', 'pods': 'pod'}
+
+
+def available_compressions():
+    """Compressions usable with the installed packages"""
+    return tuple(name for name in COMPRESSION_SUFFIXES if name != 'zstd' or zstandard is not None)
+
+
+def default_compression():
+    """zstd if the zstandard package is installed, otherwise gzip"""
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def artifact_stem(path):
+    """File name of an artifact without its format suffix"""
+    name = Path(path).name
+    for suffix in ARTIFACT_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def find_artifact(directory, name):
+    """
+    Locate an artifact by its name in any supported format.
+
+    Args:
+        directory: Directory holding the artifacts
+        name: Artifact name, e.g. a run id or '<run_id>.v2'
+
+    Returns:
+        Path to the artifact, or None if there is none
+    """
+    for suffix in ARTIFACT_SUFFIXES:
+        path = Path(directory) / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+class ArtifactStreamWriter:
+    """Writes an artifact record by record into a compressed binary file"""
+
+    def __init__(self, fileobj, compression='gzip', level=None):
+        """
+        Args:
+            fileobj: Binary file opened for writing; left open on close()
+            compression: 'gzip' or 'zstd'
+            level: Compression level (default: 6 for gzip, 3 for zstd)
+        """
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"compression must be one of {tuple(COMPRESSION_SUFFIXES)}, got {compression}")
+
+        if compression == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd compression needs the zstandard package")
+            compressor = zstandard.ZstdCompressor(level=level or 3)
+            self._stream = compressor.stream_writer(fileobj, closefd=False)
+        else:
+            # mtime=0 keeps the bytes reproducible for the same artifact
+            self._stream = gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=level or 6, mtime=0)
+
+        self._header_written = False
+        self.counts = {record: 0 for record in STREAMED_SECTIONS.values()}
+
+    def write_header(self, header):
+        """Write the artifact sections other than pods and nodes; must come first"""
+        if self._header_written:
+            raise ValueError("Artifact header was already written")
+        header = {key: value for key, value in header.items() if key not in STREAMED_SECTIONS}
+        self._write({'format': STREAM_FORMAT, 'version': STREAM_VERSION, 'header': header})
+        self._header_written = True
+
+    def write_node(self, node):
+        """Append one node record"""
+        self._write_item('node', node)
+
+    def write_pod(self, pod):
+        """Append one pod record"""
+        self._write_item('pod', pod)
+
+    def write_artifact(self, artifact):
+        """Write a whole artifact dictionary: header, then nodes, then pods"""
+        self.write_header(artifact)
+        for node in artifact.get('nodes', []):
+            self.write_node(node)
+        for pod in artifact.get('pods', []):
+            self.write_pod(pod)
+
+    def close(self):
+        """Flush the compressed stream; the underlying file stays open"""
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_item(self, record, item):
+        """Append one pod or node record after the header"""
+        if not self._header_written:
+            raise ValueError("Artifact header must be written before pods and nodes")
+        self._write({record: item})
+        self.counts[record] += 1
+
+    def _write(self, record):
+        """Encode one record as a JSON line"""
+        self._stream.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+
+
+class ArtifactReader:
+    """Reads artifacts lazily, in the streamed or the plain JSON format"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.name.endswith('.json'):
+            self.compression = None
+        elif self.path.name.endswith(COMPRESSION_SUFFIXES['zstd']):
+            self.compression = 'zstd'
+        elif self.path.name.endswith(COMPRESSION_SUFFIXES['gzip']):
+            self.compression = 'gzip'
+        else:
+            raise ValueError(f"Unknown artifact format: {self.path.name}")
+        self._header = None
+        self._document = None
+
+    def header(self):
+        """
+        Artifact sections other than pods and nodes.
+
+        For streamed artifacts only the first record is decompressed.
+        """
+        if self._header is None:
+            if self.compression is None:
+                document = self._load_document()
+                self._header = {key: value for key, value in document.items() if key not in STREAMED_SECTIONS}
+            else:
+                with self._open() as f:
+                    self._header = self._parse_header(f.readline())
+        return self._header
+
+    def iter_pods(self):
+        """Yield the pod records one at a time"""
+        return self._iter_section('pods')
+
+    def iter_nodes(self):
+        """Yield the node records one at a time"""
+        return self._iter_section('nodes')
+
+    def load(self):
+        """Read the whole artifact into a dictionary shaped like the JSON format"""
+        if self.compression is None:
+            return self._load_document()
+
+        sections = {section: [] for section in STREAMED_SECTIONS}
+        records = {record: sections[section] for section, record in STREAMED_SECTIONS.items()}
+        with self._open() as f:
+            self._header = self._parse_header(f.readline())
+            for line in f:
+                [(record, item)] = json.loads(line).items()
+                if record in records:
+                    records[record].append(item)
+        return {**self._header, **sections}
+
+    def _iter_section(self, section):
+        """Yield the items of one streamed section, skipping other records unparsed"""
+        if self.compression is None:
+            yield from self._load_document().get(section, [])
+            return
+
+        prefix = f'{{"{STREAMED_SECTIONS[section]}":'.encode()
+        with self._open() as f:
+            self._header = self._parse_header(f.readline())
+            for line in f:
+                if line.startswith(prefix):
+                    yield json.loads(line)[STREAMED_SECTIONS[section]]
+
+    def _parse_header(self, line):
+        """Decode and check the first record of a streamed artifact"""
+        record = json.loads(line) if line else {}
+        if record.get('format') != STREAM_FORMAT or record.get('version') != STREAM_VERSION:
+            raise ValueError(f"Unsupported artifact stream in {self.path}: "
+                             f"{record.get('format')} v{record.get('version')}")
+        return record['header']
+
+    def _load_document(self):
+        """Parse a plain JSON artifact once"""
+        if self._document is None:
+            with open(self.path) as f:
+                self._document = json.load(f)
+        return self._document
+
+    def _open(self):
+        """Open a streamed artifact as a decompressed, line-iterable binary file"""
+        if self.compression == 'gzip':
+            return gzip.open(self.path, 'rb')
+        if zstandard is None:
+            raise ValueError(f"Reading {self.path.name} needs the zstandard package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(self.path, 'rb')))
@@ -0,0 +1,132 @@
+"""
+Artifact Writer Module
+
+Crash- and concurrency-safe writes into the shared benchmarks directory.
+
+Per-run files are written to a temporary file next to their destination and
+renamed into place, so readers see either the previous file or the complete
+new one, never a truncated file. Files shared by all runs, such as
+cluster_summary.csv, are appended to under an exclusive lock with a single
+write per batch of rows, so concurrent orchestrator processes can neither
+interleave rows nor both write the header.
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; appends fall back to unlocked writes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FILE_MODE = 0o644
+
+
+@contextmanager
+def atomic_write(path, mode='w', newline=None, exclusive=False):
+    """
+    Open a temporary file that replaces path once the block completes.
+
+    If the block raises, the temporary file is removed and path is left
+    untouched.
+
+    Example:
+        with atomic_write(output_dir / 'run.json') as f:
+            json.dump(artifact, f)
+
+    Args:
+        path: Destination file
+        mode: 'w' for text or 'wb' for binary content
+        newline: Passed to open() in text mode; use '' for csv writers
+        exclusive: Raise FileExistsError instead of replacing an existing file
+
+    Yields:
+        File object to write the content to
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    tmp_path = Path(tmp_name)
+
+    try:
+        with os.fdopen(fd, mode, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp creates the file private to the current user
+        tmp_path.chmod(FILE_MODE)
+        if exclusive:
+            # Unlike rename, link refuses to overwrite an existing file
+            os.link(tmp_path, path)
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    _fsync_directory(path.parent)
+
+
+def append_csv_rows(path, fieldnames, rows):
+    """
+    Append rows to a CSV file shared between processes.
+
+    The header is written only if the file is empty, checked while holding
+    the lock, and all rows go out in one batch.
+
+    Args:
+        path: CSV file, created if missing
+        fieldnames: Column names, in order
+        rows: Dictionaries keyed by fieldnames
+    """
+    body = io.StringIO()
+    csv.DictWriter(body, fieldnames=fieldnames).writerows(rows)
+
+    with open(path, 'a', newline='') as f:
+        with _exclusive_lock(f):
+            content = body.getvalue()
+            if os.fstat(f.fileno()).st_size == 0:
+                header = io.StringIO()
+                csv.DictWriter(header, fieldnames=fieldnames).writeheader()
+                content = header.getvalue() + content
+
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def _exclusive_lock(f):
+    """Hold an exclusive advisory lock on an open file"""
+    if fcntl is None:
+        yield
+        return
+
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_directory(path):
+    """Persist a rename by syncing its directory, where the platform allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -17,7 +17,7 @@ class BenchmarkRunner:
     def __init__(self, config):
         self.config = config
         
-    def run_benchmark(self, duration):
+    def run_benchmark(self, duration, collector=None):
         """
         Run benchmark for specified duration.
         
@@ -27,6 +27,8 @@ class BenchmarkRunner:
         
         Args:
             duration: Duration in seconds
+            collector: Optional IncrementalCollector that fetches completed
+                metric windows while the benchmark is running
             
         Returns:
             Dictionary with start_time and end_time
@@ -34,18 +36,32 @@ class BenchmarkRunner:
         logger.info(f"Running benchmark for {duration} seconds...")
         
         start_time = datetime.now()
+        if collector:
+            collector.start(start_time)
         
         # Log progress periodically
-        elapsed = 0
+        deadline = time.monotonic() + duration
         log_interval = 60  # Log every minute
+        next_log = log_interval
+        wait_interval = collector.window_seconds if collector else log_interval
         
-        while elapsed < duration:
-            time.sleep(min(log_interval, duration - elapsed))
-            elapsed += log_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
             
-            if elapsed < duration:
-                remaining = duration - elapsed
-                logger.info(f"Benchmark in progress... {remaining}s remaining")
+            time.sleep(min(wait_interval, remaining))
+            
+            if collector:
+                try:
+                    collector.poll()
+                except Exception as e:
+                    logger.warning(f"Incremental metric collection failed: {e}")
+            
+            elapsed = duration - max(0, deadline - time.monotonic())
+            if elapsed >= next_log and elapsed < duration:
+                logger.info(f"Benchmark in progress... {duration - elapsed:.0f}s remaining")
+                next_log += log_interval
         
         end_time = datetime.now()
         
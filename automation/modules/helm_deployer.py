@@ -12,6 +12,9 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Data directory of the Prometheus container managed by prometheus-operator
+PROMETHEUS_DATA_DIR = '/prometheus'
+
 
 class HelmDeployer:
     """Manages Helm deployments"""
@@ -187,6 +190,15 @@ class HelmDeployer:
             
             raise RuntimeError("Prometheus deployment failed or timed out") from e
        
+        # Recording rules need the PrometheusRule CRD installed by the chart
+        rules_file = self.kubernetes_dir / 'monitoring' / 'recording-rules.yaml'
+        logger.info("Applying benchmark recording rules...")
+        try:
+            self._run_kubectl_command(['apply', '-f', str(rules_file)])
+            logger.info("Recording rules applied")
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Failed to apply recording rules, raw series will be queried: {e}")
+        
         # Get Grafana URL
         logger.info("Retrieving Grafana service URL...")
         grafana_url = self._get_service_url('monitoring', 'prometheus-grafana')
@@ -226,6 +238,63 @@ class HelmDeployer:
         
         raise TimeoutError("Services did not become ready in time")
     
+    def export_prometheus_snapshot(self, snapshot_name, output_path):
+        """
+        Copy a Prometheus TSDB snapshot out of the cluster as a tar.gz archive.
+        
+        The snapshot directory is streamed through `kubectl exec tar` straight
+        into the local file and removed from the Prometheus volume afterwards.
+        
+        Args:
+            snapshot_name: Name returned by the admin snapshot API
+            output_path: Local path of the archive to write
+            
+        Returns:
+            Path to the archive, or None if the export failed
+        """
+        output_path = Path(output_path)
+        tmp_path = output_path.with_name(output_path.name + '.partial')
+        
+        try:
+            result = self._run_kubectl_command([
+                'get', 'pods', '-n', 'monitoring',
+                '-l', 'app.kubernetes.io/name=prometheus',
+                '-o', 'jsonpath={.items[0].metadata.name}'
+            ])
+            pod = result.stdout.strip()
+            if not pod:
+                raise RuntimeError("No Prometheus pod found in namespace monitoring")
+            
+            logger.info(f"Copying TSDB snapshot {snapshot_name} from {pod}...")
+            cmd = [
+                'kubectl', 'exec', '-n', 'monitoring', pod, '-c', 'prometheus', '--',
+                'tar', 'czf', '-', '-C', f"{PROMETHEUS_DATA_DIR}/snapshots", snapshot_name
+            ]
+            with open(tmp_path, 'wb') as f:
+                result = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, check=False)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd, stderr=result.stderr)
+            
+            tmp_path.replace(output_path)
+            size_mb = output_path.stat().st_size / 1024 / 1024
+            logger.info(f"TSDB snapshot saved to {output_path} ({size_mb:.1f} MB)")
+        except (subprocess.CalledProcessError, RuntimeError, OSError) as e:
+            logger.warning(f"Failed to export TSDB snapshot: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+        
+        # Snapshots are hard links into the TSDB blocks, but still pin blocks
+        # that retention would otherwise delete
+        try:
+            self._run_kubectl_command([
+                'exec', '-n', 'monitoring', pod, '-c', 'prometheus', '--',
+                'rm', '-rf', f"{PROMETHEUS_DATA_DIR}/snapshots/{snapshot_name}"
+            ])
+        except subprocess.CalledProcessError:
+            logger.warning(f"Could not remove snapshot {snapshot_name} from the Prometheus volume")
+        
+        return str(output_path)
+    
     def uninstall_all(self):
         """Uninstall all releases"""
         logger.info("Uninstalling releases...")
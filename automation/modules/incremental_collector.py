@@ -0,0 +1,126 @@
+"""
+Incremental Collector Module
+
+Fetches benchmark metrics window by window while the load test is running, so
+only the last partial window remains to be queried when the run ends.
+"""
+
+import logging
+from datetime import timedelta
+
+from modules.time_series import TimeSeries
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalCollector:
+    """Pulls completed query windows during a benchmark run"""
+
+    def __init__(self, client, duration, window_seconds=30):
+        self.client = client
+        self.duration = duration
+        self.window_seconds = window_seconds
+        self.start_time = None
+
+        self._queries = []
+        self._step_seconds = None
+        self._rate_window = None
+        self._recording_rules = None
+        self._steps_per_window = 1
+        self._next_index = 0
+        self._series = {}
+        self._incomplete = set()
+
+    def start(self, start_time):
+        """Fix the query resolution for the planned run and start tracking windows"""
+        self.start_time = start_time
+        self.client._configure_resolution(start_time, start_time + timedelta(seconds=self.duration))
+
+        self._queries = list(self.client._windowed_queries().values())
+        self._step_seconds = self.client.step_seconds
+        self._rate_window = self.client.rate_window
+        self._recording_rules = self.client.recording_rules
+        self._steps_per_window = max(1, int(self.window_seconds // self._step_seconds))
+        self._series = {query: {} for query in self._queries}
+
+        logger.info(f"Incremental collection: {len(self._queries)} queries every "
+                    f"{self._steps_per_window * self._step_seconds:.0f}s")
+
+    def poll(self, now=None):
+        """Fetch every window whose samples have been scraped by now"""
+        # Samples only become queryable once Prometheus has scraped and
+        # recorded them; the same margin decides which responses are cached
+        available = self.client._settled_until(now)
+        last_index = self._step_index(available)
+
+        while self._next_index + self._steps_per_window - 1 <= last_index:
+            self._fetch_window(self._next_index, self._next_index + self._steps_per_window - 1)
+
+    def finish(self, end_time):
+        """
+        Fetch the data remaining up to end_time.
+
+        Returns:
+            Prefetched results for PrometheusClient.collect_metrics(), or None
+            if the final window resolution no longer matches the fetched data
+        """
+        self.client._configure_resolution(self.start_time, end_time)
+        if (self.client.step_seconds != self._step_seconds
+                or self.client.rate_window != self._rate_window
+                or self.client.recording_rules != self._recording_rules):
+            logger.warning("Query resolution changed since the run started, "
+                           "discarding incrementally collected data")
+            return None
+
+        last_index = self._step_index(end_time)
+        if self._next_index <= last_index:
+            self._fetch_window(self._next_index, last_index)
+
+        results = {
+            query: [TimeSeries.concat(parts) for parts in series.values()]
+            for query, series in self._series.items()
+            if query not in self._incomplete
+        }
+        logger.info(f"Incremental collection finished: {len(results)} of "
+                    f"{len(self._queries)} queries complete")
+
+        return {
+            'start_time': self.start_time,
+            'end_time': end_time,
+            'results': results,
+        }
+
+    def _step_index(self, moment):
+        """Index of the last query step at or before the given time"""
+        return int((moment - self.start_time).total_seconds() // self._step_seconds)
+
+    def _fetch_window(self, first_index, last_index):
+        """Fetch steps first_index..last_index for all queries and fold them in"""
+        window_start = self.start_time + timedelta(seconds=first_index * self._step_seconds)
+        window_end = self.start_time + timedelta(seconds=last_index * self._step_seconds)
+        failed_before = len(self.client.failed_queries)
+
+        futures = {
+            query: self.client.executor.submit(self.client._query_range, query, window_start, window_end)
+            for query in self._queries
+            if query not in self._incomplete
+        }
+        results = self.client.executor.gather(futures)
+
+        # Queries with a gap are fetched again in full at the end of the run
+        failed = set(self.client.failed_queries[failed_before:])
+        for query, result in results.items():
+            if result is None or query in failed:
+                self._incomplete.add(query)
+                continue
+            self._fold(query, result)
+
+        self._next_index = last_index + 1
+        logger.debug(f"Fetched window {window_start.isoformat()} - {window_end.isoformat()}")
+
+    def _fold(self, query, result):
+        """Append a window's samples to the series collected so far"""
+        collected = self._series[query]
+
+        for series in result:
+            collected.setdefault(series.key, []).append(series)
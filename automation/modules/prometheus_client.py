@@ -4,13 +4,79 @@ Prometheus Client Module
 Handles querying metrics from Prometheus with enhanced per-pod and per-node collection.
 """
 
+import functools
+import json
 import logging
+import math
+import re
+import threading
 import requests
+import yaml
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from statistics import mean, median, stdev
+from pathlib import Path
+
+from modules.prometheus_transport import PrometheusTransport
+from modules.quantile_sketch import DDSketch
+from modules.query_cache import QueryCache
+from modules.query_executor import QueryExecutor
+from modules.response_parser import CHUNK_SIZE, parse_response, read_chunks
+from modules.series_stats import (
+    align_series, cross_series_mean, summarize, summarize_groups, values_array
+)
+from modules.time_series import TimeSeries
 
 logger = logging.getLogger(__name__)
 
+# Prometheus rejects range queries returning more than 11,000 points per
+# series; shards stay safely below that
+MAX_POINTS_PER_QUERY = 10000
+
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Cluster metrics that can be derived from the per-container families
+DERIVED_CLUSTER_METRICS = (
+    'avg_cpu_utilization', 'max_cpu_utilization', 'cpu_throttled_seconds',
+    'avg_memory_mb', 'max_memory_mb',
+)
+
+# Scrape intervals until the samples of a moment are scraped and recorded;
+# the second interval covers recording rule evaluation lag
+SETTLE_SCRAPE_INTERVALS = 2
+
+# Recorded series from kubernetes/monitoring/recording-rules.yaml, keyed by
+# the raw counter they replace; every recorded rate uses the same window
+RECORDING_RULE_WINDOW_SECONDS = 120
+RECORDED_RATES = {
+    'container_cpu_usage_seconds_total': 'benchmark:container_cpu_usage_seconds:rate2m',
+    'container_cpu_cfs_throttled_seconds_total': 'benchmark:container_cpu_cfs_throttled_seconds:rate2m',
+    'container_cpu_cfs_periods_total': 'benchmark:container_cpu_cfs_periods:rate2m',
+    'container_cpu_cfs_throttled_periods_total': 'benchmark:container_cpu_cfs_throttled_periods:rate2m',
+    'container_network_receive_bytes_total': 'benchmark:container_network_receive_bytes:rate2m',
+    'container_network_transmit_bytes_total': 'benchmark:container_network_transmit_bytes:rate2m',
+}
+RECORDED_NODE_CPU = 'benchmark:node_cpu_utilization:pct_irate2m'
+RECORDED_NODE_MEMORY = 'benchmark:node_memory_utilization:pct'
+
+# Owning workload derived from a pod name when kube-state-metrics owner data
+# is unavailable: <deployment>-<pod-template-hash>-<id>, <daemonset>-<id> or
+# <statefulset>-<ordinal>. Generated suffixes use Kubernetes' vowel-free
+# alphabet, which keeps names like node-exporter intact
+WORKLOAD_POD_NAME_PATTERN = (
+    r'(.+?)(-[bcdfghjklmnpqrstvwxz2456789]{8,10})?-([bcdfghjklmnpqrstvwxz2456789]{5}|[0-9]+)'
+)
+
+# kube-prometheus-stack recording rule mapping pods to their owning workload
+WORKLOAD_OWNER_SERIES = 'namespace_workload_pod:kube_pod_owner:relabel'
+
+# Counters whose increase over the run is accounted per container
+ACCOUNTED_COUNTERS = {
+    'cpu_seconds': 'container_cpu_usage_seconds_total',
+    'throttled_seconds': 'container_cpu_cfs_throttled_seconds_total',
+    'periods': 'container_cpu_cfs_periods_total',
+    'throttled_periods': 'container_cpu_cfs_throttled_periods_total',
+}
+
 
 class PrometheusClient:
     """Client for querying Prometheus metrics with enhanced granularity"""
@@ -19,8 +85,120 @@ class PrometheusClient:
         self.config = config
         self.base_url = config.get('prometheus_url', 'http://prometheus-operated.monitoring.svc:9090')
         self.namespace = config.get('namespace', 'default')
+        # Batched mode fetches each pod metric family with one grouped query
+        # instead of issuing separate queries for every pod
+        self.batch_pod_queries = config.get('batch_pod_queries', True)
+        # With batched pod queries, cluster averages and maxima are derived
+        # from the same per-container series instead of separate PromQL
+        self.derive_cluster_aggregates = config.get('derive_cluster_aggregates', True)
+        # With a positive top_k_containers, only pods holding one of the K
+        # busiest containers (by CPU or memory) get full per-container
+        # statistics; the rest are reported as one aggregate
+        self.top_k_containers = config.get('top_k_containers', 0)
+        # Query the series precomputed by the benchmark recording rules when
+        # Prometheus has them (detected on first use) and the collection
+        # window is long enough for their rate window
+        self.use_recording_rules = config.get('use_recording_rules', True)
+        self.recording_rules_loaded = None
+        self.recording_rules = False
+        # Whether pods can be mapped to workloads through kube-state-metrics
+        # owner references; detected on first use
+        self.workload_mapping = None
+        # All collectors submit their queries to one bounded executor so that
+        # collection time follows the slowest query rather than their sum
+        self.executor = QueryExecutor(config.get('query_concurrency', 8))
+        # Persistent keep-alive session with retries, shared by all queries
+        self.transport = PrometheusTransport(
+            self.base_url,
+            pool_size=self.executor.max_concurrency,
+            timeout=config.get('query_timeout', 30),
+            max_retries=config.get('query_retries', 3)
+        )
+        self.failed_queries = []
+        
+        # Responses for time windows that have closed never change, so they
+        # are cached on disk and repeated collections are served locally
+        self.cache = None
+        if config.get('query_cache', True):
+            cache_dir = config.get('query_cache_dir') or (
+                Path(__file__).parent.parent.parent / '.cache' / 'prometheus'
+            )
+            self.cache = QueryCache(cache_dir, config.get('query_cache_max_mb', 1024) * 1024 * 1024)
+        
+        # Query resolution is derived from the scrape interval and refined
+        # for each collection window in _configure_resolution()
+        self.scrape_interval = self._load_scrape_interval()
+        self.max_points_per_query = config.get('max_points_per_query', MAX_POINTS_PER_QUERY)
+        self.max_samples_per_series = config.get('max_samples_per_series', 50000)
+        self.step_seconds = max(1.0, self.scrape_interval / 2)
+        self.rate_window = self._format_duration(4 * self.scrape_interval)
+        
+        # Relative accuracy of the quantile sketches behind cluster and
+        # service percentiles
+        self.sketch_accuracy = config.get('sketch_relative_accuracy', 0.01)
+        # np.percentile method behind per-pod percentiles and summary medians
+        self.percentile_method = config.get('percentile_method', 'linear')
+        
+        # Range query results already fetched during the run, keyed by query
+        self._prefetched = {}
+        
+        # Raw query results kept for the run's columnar series store, keyed
+        # by family (see ArtifactGenerator.save_artifact)
+        self.store_series = config.get('store_series', True)
+        self._raw_series = {}
+        self._raw_series_lock = threading.Lock()
+        # Stored series by family that replace Prometheus while reanalyze() runs
+        self._replay = None
         
-    def collect_metrics(self, start_time, end_time):
+    def start_incremental_collection(self, duration, window_seconds=30):
+        """
+        Create a collector that fetches completed windows while a benchmark runs.
+        
+        Args:
+            duration: Planned benchmark duration in seconds
+            window_seconds: How much data to fetch per window
+            
+        Returns:
+            IncrementalCollector to hand to BenchmarkRunner.run_benchmark()
+        """
+        from modules.incremental_collector import IncrementalCollector
+        return IncrementalCollector(self, duration, window_seconds)
+    
+    def create_snapshot(self):
+        """
+        Create a TSDB snapshot through the Prometheus admin API.
+        
+        Requires Prometheus to run with the admin API enabled (enableAdminAPI
+        in kubernetes/monitoring/prometheus-values.yaml). The snapshot includes
+        the in-memory head block, so the most recent samples are not lost.
+        
+        Returns:
+            Snapshot directory name under <data dir>/snapshots, or None on failure
+        """
+        try:
+            data = self.transport.request(
+                '/api/v1/admin/tsdb/snapshot', {'skip_head': 'false'}, timeout=120, method='POST'
+            )
+            if data.get('status') != 'success':
+                raise ValueError(data.get('error', 'Unknown error'))
+        
+            name = data['data']['name']
+            logger.info(f"Created Prometheus TSDB snapshot {name}")
+            return name
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Failed to create Prometheus TSDB snapshot: {e}")
+            return None
+    
+    def close(self):
+        """
+        Stop the query threads once pending queries finish and close the
+        pooled connections. Cache entries are files opened per query, so the
+        cache holds nothing open.
+        """
+        self.executor.shutdown()
+        self.transport.close()
+    
+    def collect_metrics(self, start_time, end_time, prefetched=None):
         """
         Collect comprehensive benchmark metrics from Prometheus.
         
@@ -30,6 +208,12 @@ class PrometheusClient:
         - Per-node metrics for infrastructure insights
         - Service-level metrics
         
+        Args:
+            start_time: Benchmark start time
+            end_time: Benchmark end time
+            prefetched: Optional results from IncrementalCollector.finish();
+                range queries found there are not sent again
+        
         Returns:
             Dictionary with structured metrics including cluster, pod, node, and service levels
         """
@@ -47,37 +231,312 @@ class PrometheusClient:
                 'namespace': self.namespace
             }
         }
+        self.failed_queries = []
+        self._raw_series = {}
+        cache_hits = self.cache.hits if self.cache else 0
+        
+        self._configure_resolution(start_time, end_time)
+        self._prefetched = self._validate_prefetched(prefetched, start_time, end_time)
+        metrics['collection_metadata'].update({
+            'scrape_interval_seconds': self.scrape_interval,
+            'step_seconds': self.step_seconds,
+            'rate_window': self.rate_window,
+            'recording_rules': self.recording_rules,
+            'prefetched_queries': len(self._prefetched),
+            'top_k_containers': self.top_k_containers or None,
+        })
+        
+        selected_pods = None
+        if self.top_k_containers:
+            selected_pods = self._select_top_containers(start_time, end_time)
         
-        # Collect cluster-wide aggregate metrics
-        logger.info("Collecting cluster-wide metrics...")
-        metrics['cluster'] = self._collect_cluster_metrics(start_time, end_time)
+        # The per-container series are fetched once and shared by the pod and
+        # cluster collectors
+        families = None
+        if self.batch_pod_queries:
+            families = self._submit_container_families(start_time, end_time, selected_pods)
+        pod_workloads = self._submit_pod_workloads(start_time, end_time)
+        accounting = self._submit_accounting(start_time, end_time)
         
-        # Collect per-pod metrics
-        logger.info("Collecting per-pod metrics...")
-        metrics['pods'] = self._collect_pod_metrics(start_time, end_time)
+        collectors = {
+            # Cluster aggregates need every container, so a top-K selection
+            # falls back to PromQL aggregation
+            'cluster': functools.partial(
+                self._collect_cluster_metrics,
+                families=families if selected_pods is None else None
+            ),
+            'pods': functools.partial(self._collect_pod_metrics, families=families, pods=selected_pods),
+            'nodes': self._collect_node_metrics,
+            'services': self._collect_service_metrics,
+        }
+        if selected_pods is not None:
+            collectors['other_containers'] = functools.partial(
+                self._collect_other_containers, pods=selected_pods
+            )
+        
+        # Collectors run side by side; each one submits its queries to the
+        # shared executor, which bounds how many hit Prometheus at once
+        logger.info(f"Running {len(collectors)} collectors "
+                    f"(query concurrency: {self.executor.max_concurrency})...")
+        with ThreadPoolExecutor(max_workers=len(collectors),
+                                thread_name_prefix='metrics-collector') as pool:
+            futures = {
+                level: pool.submit(collector, start_time, end_time)
+                for level, collector in collectors.items()
+            }
+            for level, future in futures.items():
+                metrics[level] = future.result()
         
-        # Collect per-node metrics
-        logger.info("Collecting per-node metrics...")
-        metrics['nodes'] = self._collect_node_metrics(start_time, end_time)
+        workloads = self._pod_workloads(pod_workloads.result())
+        self._apply_accounting(metrics, accounting, workloads)
         
-        # Collect service-level metrics
-        logger.info("Collecting service-level metrics...")
-        metrics['services'] = self._collect_service_metrics(start_time, end_time)
+        # Merge per-pod sketches into service and cluster distributions
+        metrics['sketches'] = self._merge_pod_sketches(metrics['pods'], workloads)
+        if selected_pods is not None:
+            # Sketches of the selected pods alone would understate cluster and
+            # service distributions, so only the per-pod sketches are kept
+            metrics['sketches']['cluster'] = {}
+            metrics['sketches']['services'] = {}
+        self._apply_cluster_percentiles(metrics['cluster'], metrics['sketches'], start_time, end_time)
+        self._apply_service_percentiles(metrics['services'], metrics['sketches'])
         
         # Add summary statistics
         metrics['summary'] = self._generate_summary_stats(metrics)
         
+        # Queries that still failed after retries report 0.0 values, so make
+        # them visible in the artifact instead of silently trusting zeros
+        metrics['collection_metadata']['failed_queries'] = len(self.failed_queries)
+        if self.cache:
+            metrics['collection_metadata']['cached_queries'] = self.cache.hits - cache_hits
+        if self.failed_queries:
+            logger.warning(f"{len(self.failed_queries)} queries failed after retries; "
+                           f"affected metrics are reported as missing or 0.0")
+        
+        self._prefetched = {}
+        
+        # Handed to ArtifactGenerator.save_artifact(), never serialized to JSON
+        if self.store_series:
+            metrics['raw_series'] = self._raw_series
+        self._raw_series = {}
+        
         logger.info(f"Collected metrics for {len(metrics['pods'])} pods and {len(metrics['nodes'])} nodes")
         
         return metrics
     
-    def _collect_cluster_metrics(self, start_time, end_time):
-        """Collect cluster-wide aggregate metrics"""
-        cluster_queries = {
+    def reanalyze(self, raw_series, start_time, end_time, collection_metadata=None, warmup_seconds=0):
+        """
+        Recompute the metrics of a finished run from its stored raw series.
+        
+        Runs collect_metrics() with every query answered from the families
+        kept in the run's series store, so results only change through this
+        client's analysis settings (percentile_method, sketch accuracy) and
+        the warmup trimmed here. Prometheus is never contacted.
+        
+        Args:
+            raw_series: Series by family, e.g. SeriesStore.read_all()
+            start_time: Start of the original collection window
+            end_time: End of the original collection window
+            collection_metadata: Collection metadata of the original artifact
+            warmup_seconds: Leave the first seconds of the run out of every
+                statistic
+            
+        Returns:
+            Metrics dictionary as returned by collect_metrics()
+        """
+        original = collection_metadata or {}
+        analysis_start = start_time + timedelta(seconds=warmup_seconds)
+        if analysis_start >= end_time:
+            raise ValueError(f"A warmup of {warmup_seconds}s leaves no data to analyze")
+        
+        # Stored timestamps are absolute, so the cutoff is taken from the data
+        # rather than from the artifact's local times
+        first_sample = min(
+            (series.timestamps[0] for result in raw_series.values() for series in result if len(series)),
+            default=0.0
+        )
+        cutoff = first_sample + warmup_seconds
+        
+        replay = {}
+        for family, result in raw_series.items():
+            # Counter increases span the whole run and cannot be trimmed, so
+            # a warmup falls back to integrating the trimmed rates
+            if warmup_seconds and family.startswith('accounting_'):
+                continue
+            replay[family] = [series.between(cutoff, math.inf) for series in result]
+        
+        settings = (self.batch_pod_queries, self.derive_cluster_aggregates, self.top_k_containers,
+                    self.recording_rules_loaded, self.workload_mapping, self.store_series)
+        # Stored container families carry pod and container labels in both
+        # collection modes, so they are always split locally; cluster
+        # aggregates are derived only if the original run derived them
+        self.batch_pod_queries = True
+        self.derive_cluster_aggregates = 'cluster_avg_cpu_utilization' not in raw_series
+        self.top_k_containers = original.get('top_k_containers') or 0
+        self.recording_rules_loaded = bool(original.get('recording_rules'))
+        self.workload_mapping = True
+        self.store_series = False
+        self._replay = replay
+        
+        try:
+            metrics = self.collect_metrics(analysis_start, end_time)
+        finally:
+            self._replay = None
+            (self.batch_pod_queries, self.derive_cluster_aggregates, self.top_k_containers,
+             self.recording_rules_loaded, self.workload_mapping, self.store_series) = settings
+        
+        # The stored series keep the resolution they were queried with
+        metadata = metrics['collection_metadata']
+        for key in ('scrape_interval_seconds', 'step_seconds', 'rate_window', 'recording_rules', 'tsdb_snapshot'):
+            if key in original:
+                metadata[key] = original[key]
+        metadata.pop('prefetched_queries', None)
+        metadata['reanalysis'] = {
+            'warmup_seconds': warmup_seconds,
+            'percentile_method': self.percentile_method,
+            'sketch_relative_accuracy': self.sketch_accuracy,
+            'original_start_time': start_time.isoformat(),
+        }
+        
+        return metrics
+    
+    def _validate_prefetched(self, prefetched, start_time, end_time):
+        """Accept prefetched results only if they cover exactly this collection window"""
+        if not prefetched:
+            return {}
+        
+        if prefetched['start_time'] != start_time or prefetched['end_time'] != end_time:
+            logger.warning("Prefetched results cover a different window, querying everything again")
+            return {}
+        
+        logger.info(f"Using {len(prefetched['results'])} range queries fetched during the run")
+        return prefetched['results']
+    
+    def _load_scrape_interval(self):
+        """Read the Prometheus scrape interval from config or the monitoring values file"""
+        if self.config.get('scrape_interval'):
+            return self._parse_duration(self.config['scrape_interval'])
+        
+        values_file = Path(__file__).parent.parent.parent / 'kubernetes' / 'monitoring' / 'prometheus-values.yaml'
+        try:
+            with open(values_file) as f:
+                values = yaml.safe_load(f) or {}
+            interval = values['prometheus']['prometheusSpec']['scrapeInterval']
+            return self._parse_duration(interval)
+        except (OSError, KeyError, TypeError, ValueError, yaml.YAMLError) as e:
+            logger.debug(f"Could not read scrape interval from {values_file}: {e}")
+            return 30.0
+    
+    def _parse_duration(self, value):
+        """Parse a Prometheus duration such as '30s' or '1m30s' into seconds"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        
+        parts = re.findall(r'(\d+(?:\.\d+)?)(ms|s|m|h|d|w)', str(value).strip())
+        if not parts:
+            raise ValueError(f"Invalid duration: {value}")
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+    
+    def _format_duration(self, seconds):
+        """Format seconds as a PromQL duration"""
+        return f"{int(math.ceil(seconds))}s"
+    
+    def _configure_resolution(self, start_time, end_time):
+        """
+        Pick the query step and rate window for a collection window.
+        
+        The step defaults to half the scrape interval, so every scrape is
+        represented, and only grows when a very long run would exceed
+        max_samples_per_series. The rate window follows Grafana's
+        $__rate_interval rule (at least four scrapes and one step plus one
+        scrape), but is shortened for runs shorter than that window so short
+        benchmarks are not smoothed by data from before the run. It never
+        drops below two scrapes, the minimum rate() needs. When the recording
+        rules are loaded and the run is at least as long as their window, the
+        recorded series are queried and the window is the one they were
+        recorded with; shorter runs query raw series with their own window.
+        """
+        duration = max((end_time - start_time).total_seconds(), 1.0)
+        scrape = self.scrape_interval
+        
+        if self.config.get('query_step'):
+            step = self._parse_duration(self.config['query_step'])
+        else:
+            step = max(1.0, scrape / 2, math.ceil(duration / self.max_samples_per_series))
+        
+        # Whole seconds keep the window stable when the measured duration
+        # overshoots the planned one by a few milliseconds
+        window = max(step + scrape, 4 * scrape)
+        if window > duration:
+            window = max(2 * scrape, math.floor(duration))
+        
+        # Recorded rates are smoothed over the rules' fixed window, which would
+        # reach back before the start of shorter runs
+        self.recording_rules = self._detect_recording_rules() and duration >= RECORDING_RULE_WINDOW_SECONDS
+        if self.recording_rules:
+            if window != RECORDING_RULE_WINDOW_SECONDS:
+                logger.info(f"Using the recording rules' {RECORDING_RULE_WINDOW_SECONDS}s rate window "
+                            f"instead of {window:g}s")
+            window = RECORDING_RULE_WINDOW_SECONDS
+        elif self.recording_rules_loaded:
+            logger.info(f"Run shorter than the recording rules' {RECORDING_RULE_WINDOW_SECONDS}s rate window, "
+                        f"querying raw series with a {window:g}s window")
+        
+        self.step_seconds = step
+        self.rate_window = self._format_duration(window)
+        
+        logger.info(f"Query resolution: step={step}s, rate window={self.rate_window} "
+                    f"(scrape interval {scrape}s, duration {duration:.0f}s)")
+    
+    def _detect_recording_rules(self):
+        """Check once whether Prometheus has the benchmark recording rules loaded"""
+        if self.recording_rules_loaded is None:
+            if not self.use_recording_rules:
+                self.recording_rules_loaded = False
+            else:
+                recorded = RECORDED_RATES['container_cpu_usage_seconds_total']
+                result = self._query_instant(f'count({recorded}{{namespace="{self.namespace}"}})')
+                self.recording_rules_loaded = bool(result)
+                if self.recording_rules_loaded:
+                    logger.info("Benchmark recording rules found")
+                else:
+                    logger.info("Benchmark recording rules not found, querying raw series")
+        
+        return self.recording_rules_loaded
+    
+    def _rate(self, counter, matchers='', containers_only=True):
+        """
+        Per-series rate expression for a cAdvisor counter in the benchmark namespace.
+        
+        Reads the recorded series when the recording rules are loaded and
+        falls back to rate() over the raw counter otherwise. Both forms yield
+        one series per container (or per pod for network counters).
+        
+        Args:
+            counter: Raw counter name, e.g. 'container_cpu_usage_seconds_total'
+            matchers: Additional label matchers, e.g. 'pod="frontend-abc"'
+            containers_only: Exclude pause containers and cgroup-level series
+            
+        Returns:
+            PromQL expression string
+        """
+        selectors = [f'namespace="{self.namespace}"']
+        if self.recording_rules:
+            # Recorded container series already exclude pause and cgroup series
+            if matchers:
+                selectors.append(matchers)
+            return f"{RECORDED_RATES[counter]}{{{', '.join(selectors)}}}"
+        
+        if containers_only:
+            selectors.extend(['container!=""', 'container!="POD"'])
+        if matchers:
+            selectors.append(matchers)
+        return f"rate({counter}{{{', '.join(selectors)}}}[{self.rate_window}])"
+    
+    def _cluster_queries(self):
+        """PromQL range queries for the cluster-wide aggregate metrics"""
+        return {
             'avg_cpu_utilization': self._get_avg_cpu_query(),
             'max_cpu_utilization': self._get_max_cpu_query(),
-            'p95_cpu_utilization': self._get_p95_cpu_query(),
-            'p99_cpu_utilization': self._get_p99_cpu_query(),
             'cpu_throttled_seconds': self._get_cpu_throttled_query(),
             'cpu_throttled_percentage': self._get_cpu_throttled_percentage_query(),
             'avg_memory_mb': self._get_avg_memory_query(),
@@ -87,11 +546,30 @@ class PrometheusClient:
             'total_network_received_mb': self._get_network_received_query(),
             'total_network_transmitted_mb': self._get_network_transmitted_query(),
         }
+    
+    def _collect_cluster_metrics(self, start_time, end_time, families=None):
+        """Collect cluster-wide aggregate metrics"""
+        cluster_queries = self._cluster_queries()
+        
+        derived = {}
+        if families is not None and self.derive_cluster_aggregates:
+            derived = self._derive_cluster_aggregates(families)
+            for metric_name in DERIVED_CLUSTER_METRICS:
+                cluster_queries.pop(metric_name)
+        
+        futures = {
+            metric_name: self._submit_range(query, start_time, end_time, family=f'cluster_{metric_name}')
+            for metric_name, query in cluster_queries.items()
+        }
         
         cluster_metrics = {}
-        for metric_name, query in cluster_queries.items():
+        for metric_name, value in derived.items():
+            cluster_metrics[metric_name] = round(value, 4) if value is not None else 0.0
+            logger.debug(f"Cluster {metric_name} (derived): {cluster_metrics[metric_name]}")
+        
+        for metric_name, future in futures.items():
             try:
-                result = self._query_range(query, start_time, end_time)
+                result = future.result()
                 value = self._aggregate_result(result)
                 cluster_metrics[metric_name] = round(value, 4) if value is not None else 0.0
                 logger.debug(f"Cluster {metric_name}: {cluster_metrics[metric_name]}")
@@ -101,8 +579,98 @@ class PrometheusClient:
         
         return cluster_metrics
     
-    def _collect_pod_metrics(self, start_time, end_time):
-        """Collect detailed metrics for each pod"""
+    def _windowed_queries(self):
+        """
+        Range queries that can be fetched window by window while a benchmark
+        is still running (see IncrementalCollector).
+        """
+        queries = self._cluster_queries()
+        # The top-K selection is only known once the run has ended, so the
+        # container families are fetched in full afterwards
+        batched = self.batch_pod_queries and not self.top_k_containers
+        if batched and self.derive_cluster_aggregates:
+            for metric_name in DERIVED_CLUSTER_METRICS:
+                queries.pop(metric_name)
+        
+        if batched:
+            for family, query in self._container_family_queries().items():
+                queries[f"container_{family}"] = query
+        
+        for name, query in self._node_queries().items():
+            queries[f"node_{name}"] = query
+        
+        for name, query in self._service_queries().items():
+            queries[f"service_{name}"] = query
+        
+        return queries
+    
+    def _derive_cluster_aggregates(self, families):
+        """
+        Derive cluster aggregates from the shared per-container series.
+        
+        Each value reproduces the corresponding PromQL aggregation (avg, max
+        or sum across containers at every step, averaged over the run), so
+        the expensive inner rate() is evaluated once per family instead of
+        once per aggregate.
+        """
+        results = self.executor.gather(
+            {name: families[name] for name in ('cpu', 'throttle', 'memory')}, default=[]
+        )
+        
+        _, cpu = align_series(results['cpu'])
+        _, throttle = align_series(results['throttle'])
+        _, memory = align_series(results['memory'])
+        
+        return {
+            'avg_cpu_utilization': cross_series_mean(cpu, 'mean'),
+            'max_cpu_utilization': cross_series_mean(cpu, 'max'),
+            'cpu_throttled_seconds': cross_series_mean(throttle, 'sum'),
+            'avg_memory_mb': cross_series_mean(memory, 'mean'),
+            'max_memory_mb': cross_series_mean(memory, 'max'),
+        }
+    
+    def _apply_cluster_percentiles(self, cluster_metrics, sketches, start_time, end_time):
+        """
+        Set cluster CPU percentiles from the merged cluster sketch.
+        
+        The sketch holds every container sample of the run, so these are true
+        percentiles of the distribution. PromQL quantile() per timestamp is
+        only used as a fallback when no pod samples were collected or only a
+        top-K selection was detailed.
+        """
+        cpu_sketch = sketches.get('cluster', {}).get('cpu_utilization_pct')
+        
+        if cpu_sketch and cpu_sketch['count']:
+            sketch = DDSketch.from_dict(cpu_sketch)
+            cluster_metrics['p95_cpu_utilization'] = round(sketch.quantile(0.95), 4)
+            cluster_metrics['p99_cpu_utilization'] = round(sketch.quantile(0.99), 4)
+            return
+        
+        logger.info("No cluster sketch available, falling back to PromQL quantiles")
+        results = self.executor.gather({
+            'p95_cpu_utilization': self._submit_range(
+                self._get_p95_cpu_query(), start_time, end_time, family='cluster_p95_cpu_utilization'
+            ),
+            'p99_cpu_utilization': self._submit_range(
+                self._get_p99_cpu_query(), start_time, end_time, family='cluster_p99_cpu_utilization'
+            ),
+        }, default=[])
+        for metric_name, result in results.items():
+            value = self._aggregate_result(result)
+            cluster_metrics[metric_name] = round(value, 4) if value is not None else 0.0
+    
+    def _collect_pod_metrics(self, start_time, end_time, families=None, pods=None):
+        """
+        Collect detailed metrics for each pod.
+        
+        Args:
+            families: Futures of the grouped container family queries; without
+                them every pod is queried separately
+            pods: Optional set of pod names to restrict collection to
+        """
+        if families is not None:
+            return self._collect_pod_metrics_batched(families)
+        
         pods_data = []
         
         try:
@@ -116,15 +684,24 @@ class PrometheusClient:
                     }}
                 )
             '''
-            pod_list_result = self._query_instant(pod_list_query)
+            pod_list_result = self._submit_instant(pod_list_query, end_time).result()
             
+            # Submit the queries for every pod up front, then assemble results
+            pending = []
             for pod_info in pod_list_result:
-                pod_name = pod_info['metric'].get('pod', 'unknown')
-                container_name = pod_info['metric'].get('container', 'unknown')
-                
+                pod_name = pod_info.labels.get('pod', 'unknown')
+                container_name = pod_info.labels.get('container', 'unknown')
+                if pods is not None and pod_name not in pods:
+                    continue
+                futures = self._submit_single_pod_queries(
+                    pod_name, container_name, start_time, end_time
+                )
+                pending.append((pod_name, container_name, futures))
+            
+            for pod_name, container_name, futures in pending:
                 # Collect comprehensive metrics for this pod
                 pod_metrics = self._collect_single_pod_metrics(
-                    pod_name, container_name, start_time, end_time
+                    pod_name, container_name, futures
                 )
                 
                 if pod_metrics:
@@ -135,87 +712,316 @@ class PrometheusClient:
         
         return pods_data
     
-    def _collect_single_pod_metrics(self, pod_name, container_name, start_time, end_time):
-        """Collect metrics for a single pod"""
-        try:
-            pod_data = {
-                'pod_name': pod_name,
-                'container_name': container_name,
-                'metrics': {}
+    def _container_family_queries(self, matchers=''):
+        """
+        Grouped range queries for the per-container metric families.
+        
+        Each family is queried once with `by (pod, container)`, so the number
+        of queries stays constant regardless of how many pods run in the
+        namespace.
+        
+        Args:
+            matchers: Additional label matchers, e.g. a pod selection
+        """
+        extra = f", {matchers}" if matchers else ''
+        return {
+            'cpu': f'''
+                sum by (pod, container) (
+                    {self._rate("container_cpu_usage_seconds_total", matchers)}
+                ) * 100
+            ''',
+            'throttle': f'''
+                sum by (pod, container) (
+                    {self._rate("container_cpu_cfs_throttled_seconds_total", matchers)}
+                )
+            ''',
+            'memory': f'''
+                sum by (pod, container) (container_memory_working_set_bytes{{
+                    namespace="{self.namespace}",
+                    container!="",
+                    container!="POD"{extra}
+                }}) / 1024 / 1024
+            ''',
+        }
+    
+    def _container_limits_query(self, matchers=''):
+        """Grouped instant query for container CPU limits"""
+        extra = f", {matchers}" if matchers else ''
+        return f'''
+            max by (pod, container) (container_spec_cpu_quota{{
+                namespace="{self.namespace}",
+                container!="",
+                container!="POD"{extra}
+            }}) / 100000
+        '''
+    
+    def _submit_container_families(self, start_time, end_time, pods=None):
+        """
+        Submit the container family queries and return their futures by family name.
+        
+        Args:
+            pods: Optional set of pod names to restrict the families to
+        """
+        matchers = self._pod_matcher(pods) if pods is not None else ''
+        futures = {
+            family: self._submit_range(query, start_time, end_time, family=f'container_{family}')
+            for family, query in self._container_family_queries(matchers).items()
+        }
+        futures['limits'] = self._submit_instant(
+            self._container_limits_query(matchers), end_time, family='container_limits'
+        )
+        return futures
+    
+    def _pod_matcher(self, pods, exclude=False):
+        """Build a pod label matcher selecting (or excluding) the given pod names"""
+        # Pod names are DNS subdomains, so dots are the only regex metacharacter
+        pattern = '|'.join(sorted(pod.replace('.', '\\\\.') for pod in pods))
+        return f'pod{"!~" if exclude else "=~"}"{pattern}"'
+    
+    def _select_top_containers(self, start_time, end_time):
+        """
+        Rank containers by average CPU and memory over the run.
+        
+        Both rankings are single instant queries evaluated at the end of the
+        run; rate() and avg_over_time() over the whole duration give each
+        container's exact run average.
+        
+        Returns:
+            Set of pod names holding one of the top-K containers by CPU or
+            memory, or None if the ranking returned nothing
+        """
+        k = int(self.top_k_containers)
+        window = self._format_duration((end_time - start_time).total_seconds())
+        selector = f'namespace="{self.namespace}", container!="", container!="POD"'
+        
+        results = self.executor.gather({
+            'cpu': self._submit_instant(f'''
+                topk({k}, sum by (pod, container) (
+                    rate(container_cpu_usage_seconds_total{{{selector}}}[{window}])
+                ))
+            ''', end_time, family='top_k_cpu'),
+            'memory': self._submit_instant(f'''
+                topk({k}, max by (pod, container) (
+                    avg_over_time(container_memory_working_set_bytes{{{selector}}}[{window}])
+                ))
+            ''', end_time, family='top_k_memory'),
+        }, default=[])
+        
+        pods = {
+            series.labels['pod']
+            for result in results.values()
+            for series in result
+            if 'pod' in series.labels
+        }
+        if not pods:
+            logger.warning("Top-K ranking returned no containers, collecting all pods")
+            return None
+        
+        logger.info(f"Top-{k} ranking selected {len(pods)} pods for detailed collection")
+        return pods
+    
+    def _collect_other_containers(self, start_time, end_time, pods):
+        """
+        Collect one aggregate entry for the containers outside the top-K pods.
+        
+        Returns:
+            Dictionary with the container count and the run statistics of the
+            per-step average and maximum across those containers
+        """
+        matcher = self._pod_matcher(pods, exclude=True)
+        window = self._format_duration((end_time - start_time).total_seconds())
+        cpu_rate = self._rate("container_cpu_usage_seconds_total", matcher)
+        memory = f'''container_memory_working_set_bytes{{
+                namespace="{self.namespace}",
+                container!="",
+                container!="POD",
+                {matcher}
+            }}'''
+        
+        results = self.executor.gather({
+            'count': self._submit_instant(
+                f'count(count by (pod, container) (count_over_time({memory}[{window}])))', end_time,
+                family='other_count'
+            ),
+            'cpu_avg': self._submit_range(
+                f'avg({cpu_rate}) * 100', start_time, end_time, family='other_cpu_avg'
+            ),
+            'cpu_max': self._submit_range(
+                f'max({cpu_rate}) * 100', start_time, end_time, family='other_cpu_max'
+            ),
+            'memory_avg': self._submit_range(
+                f'avg({memory}) / 1024 / 1024', start_time, end_time, family='other_memory_avg'
+            ),
+            'memory_max': self._submit_range(
+                f'max({memory}) / 1024 / 1024', start_time, end_time, family='other_memory_max'
+            ),
+        }, default=[])
+        
+        stats = {
+            name: summarize(self._extract_all_values(result), percentiles=())
+            for name, result in results.items()
+        }
+        
+        aggregate = {
+            'containers': int(stats['count']['max']) if stats['count'] else 0,
+            'metrics': {},
+        }
+        if stats['cpu_avg'] and stats['cpu_max']:
+            aggregate['metrics']['cpu'] = {
+                'avg_utilization_pct': round(stats['cpu_avg']['mean'], 4),
+                'max_utilization_pct': round(stats['cpu_max']['max'], 4),
+            }
+        if stats['memory_avg'] and stats['memory_max']:
+            aggregate['metrics']['memory'] = {
+                'avg_usage_mb': round(stats['memory_avg']['mean'], 4),
+                'max_usage_mb': round(stats['memory_max']['max'], 4),
             }
+        
+        return aggregate
+    
+    def _collect_pod_metrics_batched(self, families):
+        """
+        Collect metrics for all pods from the grouped container families.
+        
+        The grouped results are split locally into per-container series.
+        """
+        pods_data = []
+        
+        try:
+            results = self.executor.gather(families, default=[])
             
-            # CPU metrics
-            cpu_query = f'''
-                rate(container_cpu_usage_seconds_total{{
-                    namespace="{self.namespace}",
-                    pod="{pod_name}",
-                    container="{container_name}"
-                }}[5m]) * 100
-            '''
-            cpu_result = self._query_range(cpu_query, start_time, end_time)
-            cpu_values = self._extract_all_values(cpu_result)
-            
-            if cpu_values:
-                pod_data['metrics']['cpu'] = {
-                    'avg_utilization_pct': round(mean(cpu_values), 4),
-                    'max_utilization_pct': round(max(cpu_values), 4),
-                    'min_utilization_pct': round(min(cpu_values), 4),
-                    'p95_utilization_pct': round(self._percentile(cpu_values, 95), 4),
-                    'p99_utilization_pct': round(self._percentile(cpu_values, 99), 4),
-                    'std_dev': round(stdev(cpu_values), 4) if len(cpu_values) > 1 else 0.0,
-                }
+            cpu_values = self._values_by_container(results['cpu'])
+            throttle_values = self._values_by_container(results['throttle'])
+            memory_values = self._values_by_container(results['memory'])
+            limits_series = self._group_by_container(results['limits'])
+            cpu_series = self._group_by_container(results['cpu'])
+            throttle_series = self._group_by_container(results['throttle'])
             
-            # CPU Throttling
-            throttle_query = f'''
-                rate(container_cpu_cfs_throttled_seconds_total{{
-                    namespace="{self.namespace}",
-                    pod="{pod_name}",
-                    container="{container_name}"
-                }}[5m])
-            '''
-            throttle_result = self._query_range(throttle_query, start_time, end_time)
-            throttle_values = self._extract_all_values(throttle_result)
-            
-            if throttle_values:
-                pod_data['metrics']['cpu_throttling'] = {
-                    'avg_throttled_seconds': round(mean(throttle_values), 4),
-                    'max_throttled_seconds': round(max(throttle_values), 4),
-                    'total_throttled_seconds': round(sum(throttle_values), 4),
-                }
+            # Statistics for every container of a family in one batched pass
+            cpu_stats = summarize_groups(cpu_values, percentiles=(95, 99), method=self.percentile_method)
+            throttle_stats = summarize_groups(throttle_values, percentiles=())
+            memory_stats = summarize_groups(memory_values, percentiles=(95,), method=self.percentile_method)
             
-            # Memory metrics
-            memory_query = f'''
-                container_memory_working_set_bytes{{
-                    namespace="{self.namespace}",
-                    pod="{pod_name}",
-                    container="{container_name}"
-                }} / 1024 / 1024
-            '''
-            memory_result = self._query_range(memory_query, start_time, end_time)
-            memory_values = self._extract_all_values(memory_result)
-            
-            if memory_values:
-                pod_data['metrics']['memory'] = {
-                    'avg_usage_mb': round(mean(memory_values), 4),
-                    'max_usage_mb': round(max(memory_values), 4),
-                    'min_usage_mb': round(min(memory_values), 4),
-                    'p95_usage_mb': round(self._percentile(memory_values, 95), 4),
-                }
+            # Preserve the order Prometheus returned, CPU series first
+            containers = list(dict.fromkeys(
+                list(cpu_values) + list(throttle_values) + list(memory_values)
+            ))
             
-            # CPU and Memory limits/requests
-            limits_query = f'''
-                container_spec_cpu_quota{{
-                    namespace="{self.namespace}",
-                    pod="{pod_name}",
-                    container="{container_name}"
-                }} / 100000
-            '''
-            limits_result = self._query_instant(limits_query)
-            if limits_result and limits_result[0].get('value'):
-                cpu_limit = float(limits_result[0]['value'][1])
-                pod_data['resource_limits'] = {
-                    'cpu_limit_cores': round(cpu_limit, 2)
-                }
+            for key in containers:
+                pod_name, container_name = key
+                cpu_limit = None
+                limits = limits_series.get(key)
+                if limits:
+                    cpu_limit = limits[0].last_value()
+                
+                pod_data = self._build_pod_metrics(
+                    pod_name,
+                    container_name,
+                    cpu_stats.get(key),
+                    throttle_stats.get(key),
+                    memory_stats.get(key),
+                    cpu_limit
+                )
+                pod_data['sketches'] = self._build_pod_sketches(
+                    cpu_values.get(key), memory_values.get(key)
+                )
+                pod_data['integrated'] = self._integrate_usage(
+                    cpu_series.get(key), throttle_series.get(key)
+                )
+                pods_data.append(pod_data)
+                
+        except Exception as e:
+            logger.error(f"Failed to collect batched pod metrics: {e}")
+        
+        return pods_data
+    
+    def _group_by_container(self, result):
+        """Split a grouped query result into series keyed by (pod, container)"""
+        grouped = {}
+        
+        for series in result or []:
+            key = (series.labels.get('pod', 'unknown'), series.labels.get('container', 'unknown'))
+            grouped.setdefault(key, []).append(series)
+        
+        return grouped
+    
+    def _values_by_container(self, result):
+        """Parse a grouped query result into sample arrays keyed by (pod, container)"""
+        return {
+            key: self._extract_all_values(series)
+            for key, series in self._group_by_container(result).items()
+        }
+    
+    def _submit_single_pod_queries(self, pod_name, container_name, start_time, end_time):
+        """Submit all queries needed for a single pod and return their futures"""
+        container_matchers = f'pod="{pod_name}", container="{container_name}"'
+        
+        # CPU metrics
+        cpu_query = f'''
+            {self._rate("container_cpu_usage_seconds_total", container_matchers)} * 100
+        '''
+        
+        # CPU Throttling
+        throttle_query = f'''
+            {self._rate("container_cpu_cfs_throttled_seconds_total", container_matchers)}
+        '''
+        
+        # Memory metrics
+        memory_query = f'''
+            container_memory_working_set_bytes{{
+                namespace="{self.namespace}",
+                pod="{pod_name}",
+                container="{container_name}"
+            }} / 1024 / 1024
+        '''
+        
+        # CPU and Memory limits/requests
+        limits_query = f'''
+            container_spec_cpu_quota{{
+                namespace="{self.namespace}",
+                pod="{pod_name}",
+                container="{container_name}"
+            }} / 100000
+        '''
+        
+        return {
+            'cpu': self._submit_range(cpu_query, start_time, end_time),
+            'throttle': self._submit_range(throttle_query, start_time, end_time),
+            'memory': self._submit_range(memory_query, start_time, end_time),
+            'limits': self._submit_instant(limits_query, end_time),
+        }
+    
+    def _collect_single_pod_metrics(self, pod_name, container_name, futures):
+        """Collect metrics for a single pod from its submitted queries"""
+        try:
+            # Aggregated rates may drop the pod labels; keep them in the store
+            # so both collection modes record the same families
+            identity = {'pod': pod_name, 'container': container_name}
+            for family, future in futures.items():
+                self._record(f'container_{family}', [
+                    TimeSeries({**identity, **series.labels}, series.timestamps, series.values)
+                    for series in future.result() or []
+                ])
+            
+            cpu_series = futures['cpu'].result()
+            throttle_series = futures['throttle'].result()
+            cpu_values = self._extract_all_values(cpu_series)
+            memory_values = self._extract_all_values(futures['memory'].result())
+            
+            cpu_stats = summarize(cpu_values, percentiles=(95, 99), method=self.percentile_method)
+            throttle_stats = summarize(self._extract_all_values(throttle_series), percentiles=())
+            memory_stats = summarize(memory_values, percentiles=(95,), method=self.percentile_method)
+            
+            limits_result = futures['limits'].result()
+            cpu_limit = None
+            if limits_result:
+                cpu_limit = limits_result[0].last_value()
+            
+            pod_data = self._build_pod_metrics(
+                pod_name, container_name, cpu_stats, throttle_stats, memory_stats, cpu_limit
+            )
+            pod_data['sketches'] = self._build_pod_sketches(cpu_values, memory_values)
+            pod_data['integrated'] = self._integrate_usage(cpu_series, throttle_series)
             
             return pod_data
             
@@ -223,138 +1029,481 @@ class PrometheusClient:
             logger.warning(f"Failed to collect metrics for pod {pod_name}: {e}")
             return None
     
+    def _build_pod_metrics(self, pod_name, container_name, cpu_stats, throttle_stats,
+                           memory_stats, cpu_limit=None):
+        """Build the per-pod metrics structure from summary statistics"""
+        pod_data = {
+            'pod_name': pod_name,
+            'container_name': container_name,
+            'metrics': {}
+        }
+        
+        if cpu_stats:
+            pod_data['metrics']['cpu'] = {
+                'avg_utilization_pct': round(cpu_stats['mean'], 4),
+                'max_utilization_pct': round(cpu_stats['max'], 4),
+                'min_utilization_pct': round(cpu_stats['min'], 4),
+                'p95_utilization_pct': round(cpu_stats['p95'], 4),
+                'p99_utilization_pct': round(cpu_stats['p99'], 4),
+                'std_dev': round(cpu_stats['std'], 4),
+            }
+        
+        if throttle_stats:
+            pod_data['metrics']['cpu_throttling'] = {
+                'avg_throttled_seconds': round(throttle_stats['mean'], 4),
+                'max_throttled_seconds': round(throttle_stats['max'], 4),
+            }
+        
+        if memory_stats:
+            pod_data['metrics']['memory'] = {
+                'avg_usage_mb': round(memory_stats['mean'], 4),
+                'max_usage_mb': round(memory_stats['max'], 4),
+                'min_usage_mb': round(memory_stats['min'], 4),
+                'p95_usage_mb': round(memory_stats['p95'], 4),
+            }
+        
+        if cpu_limit is not None:
+            pod_data['resource_limits'] = {
+                'cpu_limit_cores': round(cpu_limit, 2)
+            }
+        
+        return pod_data
+    
+    def _apply_service_percentiles(self, services_data, sketches):
+        """Add percentiles from the merged per-service sketches"""
+        for service, service_sketches in sketches.get('services', {}).items():
+            if service not in services_data:
+                continue
+            
+            if 'cpu_utilization_pct' in service_sketches:
+                sketch = DDSketch.from_dict(service_sketches['cpu_utilization_pct'])
+                services_data[service]['cpu_p95_pct'] = round(sketch.quantile(0.95), 4)
+                services_data[service]['cpu_p99_pct'] = round(sketch.quantile(0.99), 4)
+            if 'memory_mb' in service_sketches:
+                sketch = DDSketch.from_dict(service_sketches['memory_mb'])
+                services_data[service]['memory_p95_mb'] = round(sketch.quantile(0.95), 4)
+    
+    def _build_pod_sketches(self, cpu_values, memory_values):
+        """Build quantile sketches for a pod's CPU and memory samples"""
+        sketches = {}
+        
+        if cpu_values is not None and len(cpu_values):
+            sketches['cpu_utilization_pct'] = DDSketch(self.sketch_accuracy).add(cpu_values)
+        if memory_values is not None and len(memory_values):
+            sketches['memory_mb'] = DDSketch(self.sketch_accuracy).add(memory_values)
+        
+        return sketches
+    
+    def _integrate_usage(self, cpu_series, throttle_series):
+        """Integrate a container's CPU and throttling rate series over the run"""
+        return {
+            # CPU series are in percent of a core
+            'cpu_seconds': sum(series.integrate() for series in cpu_series or []) / 100,
+            'throttled_seconds': sum(series.integrate() for series in throttle_series or []),
+        }
+    
+    def _submit_accounting(self, start_time, end_time):
+        """
+        Submit instant queries for counter increases over the whole run.
+        
+        Returns:
+            Dictionary of futures: one query grouped by (pod, container) per
+            ACCOUNTED_COUNTERS entry, plus the namespace's total requests
+        """
+        window = self._format_duration((end_time - start_time).total_seconds())
+        futures = {
+            name: self._submit_instant(f'''
+                sum by (pod, container) (increase({counter}{{
+                    namespace="{self.namespace}",
+                    container!="",
+                    container!="POD"
+                }}[{window}]))
+            ''', end_time, family=f'accounting_{name}')
+            for name, counter in ACCOUNTED_COUNTERS.items()
+        }
+        futures['requests'] = self._submit_instant(f'''
+            sum(increase(http_requests_total{{namespace="{self.namespace}"}}[{window}]))
+        ''', end_time, family='accounting_requests')
+        return futures
+    
+    def _apply_accounting(self, metrics, futures, pod_workloads):
+        """
+        Add CPU-seconds and throttling totals over the run per container,
+        service and cluster.
+        
+        Totals come from increase() of the raw counters over the run window,
+        which does not depend on the query step. Containers without counter
+        data fall back to trapezoidal integration of their rate samples,
+        which the pod collectors leave in each pod entry under 'integrated'.
+        
+        Args:
+            metrics: Collected metrics, updated in place
+            futures: Futures from _submit_accounting
+            pod_workloads: Mapping of pod name to owning workload
+        """
+        results = self.executor.gather(futures, default=[])
+        
+        containers = {}
+        for name in ACCOUNTED_COUNTERS:
+            for key, series in self._group_by_container(results[name]).items():
+                increase = sum(s.last_value() or 0.0 for s in series)
+                containers.setdefault(key, {})[name] = increase
+        counted = bool(containers)
+        
+        for pod in metrics['pods']:
+            key = (pod['pod_name'], pod['container_name'])
+            integrated = pod.pop('integrated', None)
+            
+            source = 'increase'
+            if 'cpu_seconds' not in containers.get(key, {}):
+                if not integrated:
+                    continue
+                source = 'integrated'
+                containers[key] = integrated
+            
+            accounting = self._build_accounting(containers[key])
+            pod['metrics']['cpu_accounting'] = {**accounting, 'source': source}
+            if 'cpu_throttling' in pod['metrics']:
+                pod['metrics']['cpu_throttling']['total_throttled_seconds'] = accounting['throttled_seconds']
+        
+        services = {}
+        for (pod_name, _), totals in containers.items():
+            service = self._service_for_pod(pod_name, pod_workloads)
+            if service:
+                services.setdefault(service, []).append(totals)
+        
+        for service, totals in services.items():
+            if service in metrics['services']:
+                accounting = self._build_accounting(self._sum_totals(totals))
+                metrics['services'][service].update({
+                    'cpu_seconds': accounting['cpu_seconds'],
+                    'cpu_throttled_seconds': accounting['throttled_seconds'],
+                    'cpu_throttled_periods_ratio': accounting['throttled_periods_ratio'],
+                })
+        
+        # Integrated fallbacks only cover the selected pods of a top-K run,
+        # which would understate cluster totals
+        if containers and (counted or 'other_containers' not in metrics):
+            accounting = self._build_accounting(self._sum_totals(containers.values()))
+            metrics['cluster'].update({
+                'cpu_seconds_total': accounting['cpu_seconds'],
+                'cpu_throttled_seconds_total': accounting['throttled_seconds'],
+                'cpu_throttled_periods_ratio': accounting['throttled_periods_ratio'],
+            })
+        
+        requests_total = self._extract_all_values(results['requests'])
+        if requests_total.size:
+            metrics['cluster']['total_requests'] = round(float(requests_total.sum()), 4)
+        
+        logger.info(f"Accounted CPU time for {len(containers)} containers "
+                    f"({'counter increases' if counted else 'integrated rates'})")
+    
+    def _sum_totals(self, totals):
+        """Add up accounting totals of several containers"""
+        summed = {}
+        for container in totals:
+            for name, value in container.items():
+                summed[name] = summed.get(name, 0.0) + value
+        return summed
+    
+    def _build_accounting(self, totals):
+        """Build the accounting structure from counter totals"""
+        periods = totals.get('periods')
+        ratio = totals.get('throttled_periods', 0.0) / periods if periods else None
+        
+        return {
+            'cpu_seconds': round(totals.get('cpu_seconds', 0.0), 4),
+            'throttled_seconds': round(totals.get('throttled_seconds', 0.0), 4),
+            # Only containers with a CPU limit have CFS periods
+            'throttled_periods_ratio': round(ratio, 4) if ratio is not None else None,
+        }
+    
+    def _merge_pod_sketches(self, pods, pod_workloads=None):
+        """
+        Merge per-pod sketches into per-service and cluster-wide sketches.
+        
+        The sketch objects are removed from the pod entries and returned in
+        serialized form, keyed by level, so runs can be merged later.
+        
+        Args:
+            pods: Pod entries carrying 'sketches'
+            pod_workloads: Optional mapping of pod name to owning workload
+        """
+        sketches = {'cluster': {}, 'services': {}, 'pods': {}}
+        
+        for pod in pods:
+            pod_sketches = pod.pop('sketches', {})
+            if not pod_sketches:
+                continue
+            
+            service = self._service_for_pod(pod['pod_name'], pod_workloads or {})
+            pod_key = f"{pod['pod_name']}/{pod['container_name']}"
+            sketches['pods'][pod_key] = {}
+            
+            for name, sketch in pod_sketches.items():
+                sketches['pods'][pod_key][name] = sketch.to_dict()
+                targets = [sketches['cluster']]
+                if service:
+                    targets.append(sketches['services'].setdefault(service, {}))
+                for target in targets:
+                    if name not in target:
+                        target[name] = DDSketch(self.sketch_accuracy)
+                    target[name].merge(sketch)
+        
+        for level in (sketches['cluster'], *sketches['services'].values()):
+            for name, sketch in level.items():
+                level[name] = sketch.to_dict()
+        
+        return sketches
+    
+    def _service_for_pod(self, pod_name, pod_workloads):
+        """Map a pod name to its owning workload, falling back to the pod name pattern"""
+        if pod_name in pod_workloads:
+            return pod_workloads[pod_name]
+        
+        match = re.fullmatch(WORKLOAD_POD_NAME_PATTERN, pod_name)
+        return match.group(1) if match else None
+    
     def _collect_node_metrics(self, start_time, end_time):
-        """Collect metrics for each node"""
+        """
+        Collect metrics for each node.
+        
+        CPU and memory are fetched with one query each, grouped by node, and
+        split locally, so the number of queries does not grow with the node
+        count.
+        """
         nodes_data = []
         
         try:
+            futures = self._submit_node_queries(start_time, end_time)
             # Get list of nodes
-            node_list_query = 'count by (node) (kube_node_info)'
-            node_list_result = self._query_instant(node_list_query)
+            futures['nodes'] = self._submit_instant(
+                'count by (node) (kube_node_info)', end_time, family='node_nodes'
+            )
+            results = self.executor.gather(futures, default=[])
             
-            for node_info in node_list_result:
-                node_name = node_info['metric'].get('node', 'unknown')
-                
-                node_metrics = self._collect_single_node_metrics(
-                    node_name, start_time, end_time
-                )
-                
-                if node_metrics:
-                    nodes_data.append(node_metrics)
+            cpu_values = self._values_by_label(results['cpu'], 'node')
+            memory_values = self._values_by_label(results['memory'], 'node')
+            cpu_stats = summarize_groups(cpu_values, percentiles=())
+            memory_stats = summarize_groups(memory_values, percentiles=())
+            
+            # Nodes known to kube-state-metrics first, then any node that only
+            # node-exporter reports
+            node_names = [
+                node_info.labels.get('node', 'unknown') for node_info in results['nodes']
+            ]
+            node_names = list(dict.fromkeys(node_names + list(cpu_values) + list(memory_values)))
+            
+            for node_name in node_names:
+                nodes_data.append(self._build_node_metrics(
+                    node_name, cpu_stats.get(node_name), memory_stats.get(node_name)
+                ))
                     
         except Exception as e:
             logger.error(f"Failed to collect node metrics: {e}")
         
         return nodes_data
     
-    def _collect_single_node_metrics(self, node_name, start_time, end_time):
-        """Collect metrics for a single node"""
-        try:
-            node_data = {
-                'node_name': node_name,
-                'metrics': {}
-            }
-            
-            # Node CPU utilization
-            node_cpu_query = f'''
-                100 - (avg by (instance) (
-                    irate(node_cpu_seconds_total{{mode="idle", instance=~".*{node_name}.*"}}[5m]) * 100
+    def _node_queries(self):
+        """
+        Range queries for node CPU and memory utilization grouped by node.
+        
+        node-exporter series are keyed by scrape address, so they are joined
+        to node_uname_info on instance and labelled with its nodename, which
+        is the Kubernetes node name.
+        """
+        if self.recording_rules:
+            return {'cpu': RECORDED_NODE_CPU, 'memory': RECORDED_NODE_MEMORY}
+        
+        return {
+            'cpu': f'''
+                max by (node) (label_replace(
+                    (100 - avg by (instance) (
+                        irate(node_cpu_seconds_total{{mode="idle"}}[{self.rate_window}]) * 100
+                    ))
+                    * on (instance) group_left(nodename) node_uname_info,
+                    "node", "$1", "nodename", "(.+)"
                 ))
-            '''
-            cpu_result = self._query_range(node_cpu_query, start_time, end_time)
-            cpu_values = self._extract_all_values(cpu_result)
-            
-            if cpu_values:
-                node_data['metrics']['cpu'] = {
-                    'avg_utilization_pct': round(mean(cpu_values), 4),
-                    'max_utilization_pct': round(max(cpu_values), 4),
-                    'min_utilization_pct': round(min(cpu_values), 4),
-                }
-            
-            # Node memory
-            node_memory_query = f'''
-                (node_memory_MemTotal_bytes{{instance=~".*{node_name}.*"}} - 
-                 node_memory_MemAvailable_bytes{{instance=~".*{node_name}.*"}}) / 
-                node_memory_MemTotal_bytes{{instance=~".*{node_name}.*"}} * 100
-            '''
-            memory_result = self._query_range(node_memory_query, start_time, end_time)
-            memory_values = self._extract_all_values(memory_result)
-            
-            if memory_values:
-                node_data['metrics']['memory'] = {
-                    'avg_utilization_pct': round(mean(memory_values), 4),
-                    'max_utilization_pct': round(max(memory_values), 4),
-                    'min_utilization_pct': round(min(memory_values), 4),
-                }
-            
-            return node_data
-            
-        except Exception as e:
-            logger.warning(f"Failed to collect metrics for node {node_name}: {e}")
-            return None
+            ''',
+            'memory': '''
+                max by (node) (label_replace(
+                    ((node_memory_MemTotal_bytes - node_memory_MemAvailable_bytes) /
+                     node_memory_MemTotal_bytes * 100)
+                    * on (instance) group_left(nodename) node_uname_info,
+                    "node", "$1", "nodename", "(.+)"
+                ))
+            ''',
+        }
+    
+    def _submit_node_queries(self, start_time, end_time):
+        """Submit the grouped node queries and return their futures by metric name"""
+        return {
+            name: self._submit_range(query, start_time, end_time, family=f'node_{name}')
+            for name, query in self._node_queries().items()
+        }
+    
+    def _values_by_label(self, result, label):
+        """Parse a grouped query result into sample arrays keyed by one label's value"""
+        grouped = {}
+        
+        for series in result or []:
+            key = series.labels.get(label, 'unknown')
+            grouped.setdefault(key, []).append(series)
+        
+        return {
+            key: self._extract_all_values(series)
+            for key, series in grouped.items()
+        }
+    
+    def _build_node_metrics(self, node_name, cpu_stats, memory_stats):
+        """Build the output structure for a single node from its statistics"""
+        node_data = {
+            'node_name': node_name,
+            'metrics': {}
+        }
+        
+        if cpu_stats:
+            node_data['metrics']['cpu'] = {
+                'avg_utilization_pct': round(cpu_stats['mean'], 4),
+                'max_utilization_pct': round(cpu_stats['max'], 4),
+                'min_utilization_pct': round(cpu_stats['min'], 4),
+            }
+        
+        if memory_stats:
+            node_data['metrics']['memory'] = {
+                'avg_utilization_pct': round(memory_stats['mean'], 4),
+                'max_utilization_pct': round(memory_stats['max'], 4),
+                'min_utilization_pct': round(memory_stats['min'], 4),
+            }
+        
+        return node_data
     
     def _collect_service_metrics(self, start_time, end_time):
-        """Collect service-level metrics for Online Boutique microservices"""
-        services = [
-            'frontend', 'cartservice', 'productcatalogservice', 'currencyservice',
-            'paymentservice', 'shippingservice', 'emailservice', 'checkoutservice',
-            'recommendationservice', 'adservice'
-        ]
+        """
+        Collect service-level metrics for every workload in the namespace.
         
+        Services are discovered from the data: one grouped query per metric
+        returns a series for each owning workload (Deployment, StatefulSet,
+        DaemonSet), averaged across that workload's pods.
+        """
         services_data = {}
         
-        for service in services:
-            try:
-                service_data = self._collect_single_service_metrics(
-                    service, start_time, end_time
+        try:
+            futures = {
+                name: self._submit_range(query, start_time, end_time, family=f'service_{name}')
+                for name, query in self._service_queries().items()
+            }
+            results = self.executor.gather(futures, default=[])
+            
+            cpu_values = self._values_by_label(results['cpu'], 'workload')
+            memory_values = self._values_by_label(results['memory'], 'workload')
+            cpu_stats = summarize_groups(cpu_values, percentiles=())
+            memory_stats = summarize_groups(memory_values, percentiles=())
+            
+            for service in dict.fromkeys(list(cpu_values) + list(memory_values)):
+                service_data = self._build_service_metrics(
+                    cpu_stats.get(service), memory_stats.get(service)
                 )
                 if service_data:
                     services_data[service] = service_data
-            except Exception as e:
-                logger.warning(f"Failed to collect metrics for service {service}: {e}")
+                    
+        except Exception as e:
+            logger.error(f"Failed to collect service metrics: {e}")
         
         return services_data
     
-    def _collect_single_service_metrics(self, service, start_time, end_time):
-        """Collect metrics for a single service"""
-        try:
-            service_data = {}
-            
-            # Average CPU across all pods for this service
-            service_cpu_query = f'''
-                avg(rate(container_cpu_usage_seconds_total{{
-                    namespace="{self.namespace}",
-                    pod=~"{service}-.*",
-                    container="{service}"
-                }}[5m])) * 100
+    def _detect_workload_mapping(self):
+        """Check once whether kube-state-metrics pod owner data is available"""
+        if self.workload_mapping is None:
+            result = self._query_instant(
+                f'count({WORKLOAD_OWNER_SERIES}{{namespace="{self.namespace}"}})'
+            )
+            self.workload_mapping = bool(result)
+            if not self.workload_mapping:
+                logger.info("Pod owner data not found, deriving workloads from pod names")
+        
+        return self.workload_mapping
+    
+    def _with_workload(self, pod_expression):
+        """
+        Add a workload label to a vector with namespace and pod labels.
+        
+        Joins on the kube-state-metrics owner mapping when available and
+        otherwise derives the workload from the pod name.
+        """
+        if self._detect_workload_mapping():
+            return f'''
+                {pod_expression}
+                * on (namespace, pod) group_left(workload)
+                max by (namespace, pod, workload) ({WORKLOAD_OWNER_SERIES}{{namespace="{self.namespace}"}})
             '''
-            cpu_result = self._query_range(service_cpu_query, start_time, end_time)
-            cpu_values = self._extract_all_values(cpu_result)
-            
-            if cpu_values:
-                service_data['cpu_avg_pct'] = round(mean(cpu_values), 4)
-                service_data['cpu_max_pct'] = round(max(cpu_values), 4)
-            
-            # Memory
-            service_memory_query = f'''
-                avg(container_memory_working_set_bytes{{
+        
+        return f'''
+            label_replace(
+                {pod_expression},
+                "workload", "$1", "pod", "{WORKLOAD_POD_NAME_PATTERN}"
+            )
+        '''
+    
+    def _service_queries(self):
+        """Range queries for per-pod CPU and memory averaged by owning workload"""
+        pod_cpu = f'sum by (namespace, pod) ({self._rate("container_cpu_usage_seconds_total")})'
+        pod_memory = f'''sum by (namespace, pod) (container_memory_working_set_bytes{{
                     namespace="{self.namespace}",
-                    pod=~"{service}-.*",
-                    container="{service}"
-                }}) / 1024 / 1024
-            '''
-            memory_result = self._query_range(service_memory_query, start_time, end_time)
-            memory_values = self._extract_all_values(memory_result)
-            
-            if memory_values:
-                service_data['memory_avg_mb'] = round(mean(memory_values), 4)
-                service_data['memory_max_mb'] = round(max(memory_values), 4)
-            
-            return service_data if service_data else None
-            
-        except Exception as e:
-            logger.debug(f"Service {service} metrics not available: {e}")
-            return None
+                    container!="",
+                    container!="POD"
+                }})'''
+        
+        return {
+            'cpu': f'''
+                avg by (workload) ({self._with_workload(pod_cpu)}) * 100
+            ''',
+            'memory': f'''
+                avg by (workload) ({self._with_workload(pod_memory)}) / 1024 / 1024
+            ''',
+        }
+    
+    def _submit_pod_workloads(self, start_time, end_time):
+        """
+        Submit an instant query mapping every pod seen during the run to its workload.
+        
+        Returns:
+            Future resolving to the query result, empty without owner data
+        """
+        if not self._detect_workload_mapping():
+            future = Future()
+            future.set_result([])
+            return future
+        
+        window = self._format_duration((end_time - start_time).total_seconds())
+        query = f'''
+            max by (pod, workload) (
+                max_over_time({WORKLOAD_OWNER_SERIES}{{namespace="{self.namespace}"}}[{window}])
+            )
+        '''
+        return self._submit_instant(query, end_time, family='pod_workloads')
+    
+    def _pod_workloads(self, result):
+        """Build a pod name to workload mapping from the pod workloads query result"""
+        return {
+            series.labels['pod']: series.labels['workload']
+            for series in result or []
+            if 'pod' in series.labels and 'workload' in series.labels
+        }
+    
+    def _build_service_metrics(self, cpu_stats, memory_stats):
+        """Build the output structure for a single service from its statistics"""
+        service_data = {}
+        
+        if cpu_stats:
+            service_data['cpu_avg_pct'] = round(cpu_stats['mean'], 4)
+            service_data['cpu_max_pct'] = round(cpu_stats['max'], 4)
+        
+        if memory_stats:
+            service_data['memory_avg_mb'] = round(memory_stats['mean'], 4)
+            service_data['memory_max_mb'] = round(memory_stats['max'], 4)
+        
+        return service_data if service_data else None
     
     def _generate_summary_stats(self, metrics):
         """Generate summary statistics from collected metrics"""
@@ -363,6 +1512,8 @@ class PrometheusClient:
             'total_nodes': len(metrics['nodes']),
             'total_services': len(metrics['services']),
         }
+        if 'other_containers' in metrics:
+            summary['aggregated_containers'] = metrics['other_containers']['containers']
         
         # Calculate pod-level statistics
         if metrics['pods']:
@@ -370,186 +1521,261 @@ class PrometheusClient:
                        for p in metrics['pods'] 
                        if 'cpu' in p.get('metrics', {})]
             
-            if cpu_avgs:
+            cpu_stats = summarize(cpu_avgs, percentiles=(50,), method=self.percentile_method)
+            if cpu_stats:
                 summary['pod_cpu_stats'] = {
-                    'mean': round(mean(cpu_avgs), 4),
-                    'median': round(median(cpu_avgs), 4),
-                    'max': round(max(cpu_avgs), 4),
-                    'min': round(min(cpu_avgs), 4),
+                    'mean': round(cpu_stats['mean'], 4),
+                    'median': round(cpu_stats['p50'], 4),
+                    'max': round(cpu_stats['max'], 4),
+                    'min': round(cpu_stats['min'], 4),
                 }
             
             memory_avgs = [p['metrics']['memory']['avg_usage_mb'] 
                           for p in metrics['pods'] 
                           if 'memory' in p.get('metrics', {})]
             
-            if memory_avgs:
+            memory_stats = summarize(memory_avgs, percentiles=(50,), method=self.percentile_method)
+            if memory_stats:
                 summary['pod_memory_stats'] = {
-                    'mean_mb': round(mean(memory_avgs), 4),
-                    'median_mb': round(median(memory_avgs), 4),
-                    'max_mb': round(max(memory_avgs), 4),
-                    'min_mb': round(min(memory_avgs), 4),
+                    'mean_mb': round(memory_stats['mean'], 4),
+                    'median_mb': round(memory_stats['p50'], 4),
+                    'max_mb': round(memory_stats['max'], 4),
+                    'min_mb': round(memory_stats['min'], 4),
                 }
         
         return summary
     
-    def _query_range(self, query, start_time, end_time, step='15s'):
-        """Execute a Prometheus range query"""
-        url = f"{self.base_url}/api/v1/query_range"
+    def _record(self, family, result):
+        """Keep a query result for the run's series store"""
+        if self.store_series and result:
+            with self._raw_series_lock:
+                self._raw_series.setdefault(family, []).extend(result)
+    
+    def _submit_range(self, query, start_time, end_time, family=None):
+        """
+        Submit a range query to the executor and return its future.
+        
+        Ranges that would exceed max_points_per_query are split into
+        consecutive shards fetched in parallel and stitched back together.
+        
+        Args:
+            family: Name the result is kept under in the run's series store
+                and looked up by when reanalyzing a stored run
+        """
+        if self._replay is not None:
+            return self._replayed(family)
+        
+        if query in self._prefetched:
+            future = Future()
+            future.set_result(self._prefetched[query])
+            return self._recorded(family, future)
+        
+        shards = self._shard_range(start_time, end_time)
+        if len(shards) == 1:
+            future = self.executor.submit(self._query_range, query, start_time, end_time)
+            return self._recorded(family, future)
+        
+        futures = [
+            self.executor.submit(self._query_range, query, shard_start, shard_end)
+            for shard_start, shard_end in shards
+        ]
+        return self._recorded(family, self.executor.combine(futures, self._stitch_results))
+    
+    def _shard_range(self, start_time, end_time):
+        """Split a time range into step-aligned shards within the per-query point limit"""
+        step = self.step_seconds
+        total_points = int((end_time - start_time).total_seconds() // step) + 1
+        
+        shards = []
+        for first in range(0, total_points, self.max_points_per_query):
+            last = min(first + self.max_points_per_query, total_points) - 1
+            shards.append((
+                start_time + timedelta(seconds=first * step),
+                start_time + timedelta(seconds=last * step)
+            ))
+        
+        return shards
+    
+    def _stitch_results(self, shard_results):
+        """Concatenate per-series samples from consecutive range query shards"""
+        stitched = {}
+        
+        for result in shard_results:
+            for series in result or []:
+                stitched.setdefault(series.key, []).append(series)
+        
+        return [TimeSeries.concat(parts) for parts in stitched.values()]
+    
+    def _submit_instant(self, query, time=None, family=None):
+        """Submit an instant query to the executor and return its future (see _submit_range)"""
+        if self._replay is not None:
+            return self._replayed(family)
+        
+        return self._recorded(family, self.executor.submit(self._query_instant, query, time))
+    
+    def _recorded(self, family, future):
+        """Chain a query future so its result is kept for the series store before it resolves"""
+        if not family or not self.store_series:
+            return future
         
+        return self.executor.combine([future], functools.partial(self._record_first, family))
+    
+    def _record_first(self, family, results):
+        """Record the single result of a chained future and pass it on"""
+        self._record(family, results[0])
+        return results[0]
+    
+    def _replayed(self, family):
+        """Future resolved with the stored series of a family while reanalyzing"""
+        future = Future()
+        future.set_result(self._replay.get(family, []))
+        return future
+    
+    def _query_range(self, query, start_time, end_time, step=None):
+        """Execute a Prometheus range query"""
         params = {
             'query': query,
             'start': start_time.timestamp(),
             'end': end_time.timestamp(),
-            'step': step
+            'step': step or self.step_seconds
         }
         
         try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._api_request('/api/v1/query_range', params, end_time)
             
             if data['status'] != 'success':
                 raise ValueError(f"Query failed: {data.get('error', 'Unknown error')}")
             
             return data['data']['result']
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
             logger.error(f"Failed to execute query: {query[:100]}... Error: {e}")
+            self.failed_queries.append(query)
             return []
     
     def _query_instant(self, query, time=None):
         """Execute an instant Prometheus query"""
-        url = f"{self.base_url}/api/v1/query"
-        
         params = {'query': query}
         if time:
             params['time'] = time.timestamp()
         
         try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._api_request('/api/v1/query', params, time)
             
             if data['status'] != 'success':
                 raise ValueError(f"Query failed: {data.get('error', 'Unknown error')}")
             
             return data['data']['result']
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
             logger.error(f"Failed to execute instant query: {query[:100]}... Error: {e}")
+            self.failed_queries.append(query)
             return []
     
+    def _api_request(self, path, params, end_time=None):
+        """
+        Send an API request, serving closed time windows from the query cache.
+        
+        The response body is decoded incrementally as it streams in (see
+        response_parser), so series samples arrive as float64 arrays and the
+        raw JSON is never held in memory as a whole.
+        
+        Args:
+            path: API path
+            params: Query parameters
+            end_time: Latest time the query reads data for; None means now,
+                which is never cached
+            
+        Returns:
+            Decoded response payload
+        """
+        key = None
+        if self.cache and end_time is not None and self._is_closed(end_time):
+            key = self.cache.key(self.transport.url(path), params)
+            cached = self.cache.open(key)
+            if cached is not None:
+                try:
+                    with cached:
+                        return parse_response(read_chunks(cached))
+                except (OSError, EOFError, json.JSONDecodeError) as e:
+                    logger.warning(f"Ignoring corrupt cache entry for {path}: {e}")
+                    self.cache.invalidate(key)
+        
+        writer = self.cache.writer(key) if key else None
+        try:
+            with self.transport.stream(path, params) as response:
+                chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                if writer:
+                    chunks = writer.tee(chunks)
+                data = parse_response(chunks)
+        except BaseException:
+            if writer:
+                writer.discard()
+            raise
+        
+        # Errors and partial results are never cached
+        if writer:
+            if data.get('status') == 'success' and not data.get('warnings'):
+                writer.commit()
+            else:
+                writer.discard()
+        
+        return data
+    
+    def _settled_until(self, now=None):
+        """Latest moment whose samples have all been scraped and recorded by now"""
+        return (now or datetime.now()) - timedelta(seconds=SETTLE_SCRAPE_INTERVALS * self.scrape_interval)
+    
+    def _is_closed(self, end_time):
+        """Check whether all samples up to end_time have been scraped and recorded"""
+        return end_time <= self._settled_until()
+    
     def _aggregate_result(self, result):
         """Aggregate Prometheus query result (backward compatible)"""
         if not result:
             return None
         
         values = self._extract_all_values(result)
-        return mean(values) if values else None
+        return float(values.mean()) if values.size else None
     
     def _extract_all_values(self, result):
-        """Extract all numeric values from a Prometheus query result"""
-        values = []
-        
-        if not result:
-            return values
-        
-        for series in result:
-            # Handle range query results with 'values'
-            if 'values' in series:
-                for timestamp, value in series['values']:
-                    try:
-                        values.append(float(value))
-                    except (ValueError, TypeError):
-                        continue
-            # Handle instant query results with 'value'
-            elif 'value' in series:
-                try:
-                    values.append(float(series['value'][1]))
-                except (ValueError, TypeError, IndexError):
-                    continue
-        
-        return values
-    
-    def _percentile(self, values, percentile):
-        """Calculate percentile of a list of values"""
-        if not values:
-            return 0.0
-        
-        sorted_values = sorted(values)
-        index = (percentile / 100) * (len(sorted_values) - 1)
-        
-        if index.is_integer():
-            return sorted_values[int(index)]
-        else:
-            lower = sorted_values[int(index)]
-            upper = sorted_values[int(index) + 1]
-            return lower + (upper - lower) * (index - int(index))
+        """Extract all numeric values from a Prometheus query result as a float64 array"""
+        return values_array(result)
     
     # Query definitions for cluster-wide metrics
     def _get_avg_cpu_query(self):
         """Get query for average CPU utilization"""
         return f'''
-            avg(rate(container_cpu_usage_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) * 100
+            avg({self._rate("container_cpu_usage_seconds_total")}) * 100
         '''
     
     def _get_max_cpu_query(self):
         """Get query for maximum CPU utilization"""
         return f'''
-            max(rate(container_cpu_usage_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) * 100
+            max({self._rate("container_cpu_usage_seconds_total")}) * 100
         '''
     
     def _get_p95_cpu_query(self):
         """Get query for P95 CPU utilization"""
         return f'''
-            quantile(0.95, rate(container_cpu_usage_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) * 100
+            quantile(0.95, {self._rate("container_cpu_usage_seconds_total")}) * 100
         '''
     
     def _get_p99_cpu_query(self):
         """Get query for P99 CPU utilization"""
         return f'''
-            quantile(0.99, rate(container_cpu_usage_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) * 100
+            quantile(0.99, {self._rate("container_cpu_usage_seconds_total")}) * 100
         '''
     
     def _get_cpu_throttled_query(self):
         """Get query for CPU throttling"""
         return f'''
-            sum(rate(container_cpu_cfs_throttled_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m]))
+            sum({self._rate("container_cpu_cfs_throttled_seconds_total")})
         '''
     
     def _get_cpu_throttled_percentage_query(self):
         """Get query for CPU throttling percentage"""
         return f'''
-            sum(rate(container_cpu_cfs_throttled_seconds_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) / 
-            sum(rate(container_cpu_cfs_periods_total{{
-                namespace="{self.namespace}",
-                container!="",
-                container!="POD"
-            }}[5m])) * 100
+            sum({self._rate("container_cpu_cfs_throttled_seconds_total")}) / 
+            sum({self._rate("container_cpu_cfs_periods_total")}) * 100
         '''
     
     def _get_avg_memory_query(self):
@@ -590,21 +1816,17 @@ class PrometheusClient:
         """Get query for request rate (if available)"""
         # This assumes the application exposes request metrics
         return f'''
-            sum(rate(http_requests_total{{namespace="{self.namespace}"}}[5m]))
+            sum(rate(http_requests_total{{namespace="{self.namespace}"}}[{self.rate_window}]))
         '''
     
     def _get_network_received_query(self):
         """Get query for total network received"""
         return f'''
-            sum(rate(container_network_receive_bytes_total{{
-                namespace="{self.namespace}"
-            }}[5m])) / 1024 / 1024
+            sum({self._rate("container_network_receive_bytes_total", containers_only=False)}) / 1024 / 1024
         '''
     
     def _get_network_transmitted_query(self):
         """Get query for total network transmitted"""
         return f'''
-            sum(rate(container_network_transmit_bytes_total{{
-                namespace="{self.namespace}"
-            }}[5m])) / 1024 / 1024
+            sum({self._rate("container_network_transmit_bytes_total", containers_only=False)}) / 1024 / 1024
         '''
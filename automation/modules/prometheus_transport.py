@@ -0,0 +1,147 @@
+"""
+Prometheus Transport Module
+
+Persistent HTTP transport for the Prometheus query API with connection pooling,
+compression, retries and per-query timeout budgets.
+"""
+
+import logging
+import random
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Status codes that indicate a transient server-side problem worth retrying
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+# Queries whose encoded form exceeds this many bytes are sent as a POST body
+# to stay clear of URL length limits in proxies and the port-forward
+POST_THRESHOLD_BYTES = 2048
+
+
+class PrometheusTransport:
+    """Pooled HTTP session for Prometheus API calls"""
+
+    def __init__(self, base_url, pool_size=8, timeout=30, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # One keep-alive pool sized to the query concurrency, so concurrent
+        # queries reuse connections instead of opening one per request
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip',
+        })
+
+    def request(self, path, params, timeout=None, method=None):
+        """
+        Call a Prometheus API endpoint and return the decoded JSON payload.
+
+        See stream() for retry and timeout behaviour.
+
+        Args:
+            method: 'POST' for endpoints that require it, e.g. the admin API;
+                by default only long queries are POSTed
+
+        Returns:
+            Decoded JSON response body
+        """
+        with self._open(path, params, timeout, stream=False, method=method) as response:
+            return response.json()
+
+    def stream(self, path, params, timeout=None):
+        """
+        Call a Prometheus API endpoint without reading the response body.
+
+        Transient failures (5xx responses and connection resets) are retried
+        with jittered exponential backoff for as long as the timeout budget
+        allows. Once a successful response has been returned, errors while
+        reading its body are left to the caller.
+
+        Args:
+            path: API path, e.g. '/api/v1/query_range'
+            params: Query parameters
+            timeout: Total time budget in seconds across all attempts
+            
+        Returns:
+            requests.Response whose body is read with iter_content(); use it
+            as a context manager so the connection returns to the pool
+            
+        Raises:
+            requests.exceptions.RequestException: If the request ultimately fails
+        """
+        return self._open(path, params, timeout, stream=True)
+
+    def _open(self, path, params, timeout, stream, method=None):
+        """Send a request with retries and return the successful response"""
+        url = self.url(path)
+        budget = timeout if timeout is not None else self.timeout
+        deadline = time.monotonic() + budget
+        attempt = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = self._send(url, params, remaining, stream, method)
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    response.close()
+                    raise
+                return response
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.HTTPError) as e:
+                if not self._is_retryable(e):
+                    raise
+                
+                attempt += 1
+                delay = self._backoff_delay(attempt)
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                    raise
+                
+                logger.debug(f"Retrying {path} in {delay:.2f}s (attempt {attempt}): {e}")
+                time.sleep(delay)
+
+    def url(self, path):
+        """Full URL of an API path"""
+        return f"{self.base_url}{path}"
+
+    def _send(self, url, params, remaining, stream=False, method=None):
+        """Send a single request, switching to POST for long query bodies"""
+        params = dict(params)
+        # Let Prometheus abandon evaluation once the client stops waiting
+        params['timeout'] = f"{max(1, int(remaining))}s"
+
+        if method == 'POST' or len(urlencode(params)) > POST_THRESHOLD_BYTES:
+            return self.session.post(url, data=params, timeout=remaining, stream=stream)
+        return self.session.get(url, params=params, timeout=remaining, stream=stream)
+
+    def _is_retryable(self, error):
+        """Check whether a failed request is worth another attempt"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            response = error.response
+            return response is not None and response.status_code in RETRYABLE_STATUS_CODES
+        # Connection resets and truncated responses
+        return True
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
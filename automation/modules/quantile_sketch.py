@@ -0,0 +1,174 @@
+"""
+Quantile Sketch Module
+
+Mergeable, bounded-memory quantile sketch (DDSketch) for computing true
+percentiles across pods, services and runs.
+
+Reference: Masson, Rim, Lee - "DDSketch: A Fast and Fully-Mergeable Quantile
+Sketch with Relative-Error Guarantees" (VLDB 2019)
+"""
+
+import math
+
+import numpy as np
+
+# Samples at or below this value are counted in the zero bucket; CPU and
+# memory samples are never negative
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """Quantile sketch with relative-error guarantees and exact merging"""
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        """Add an array of samples to the sketch; NaN samples are ignored"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+
+        positive = values[values > MIN_INDEXABLE_VALUE]
+        self.zero_count += int(values.size - positive.size)
+
+        if positive.size:
+            indexes = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            unique, counts = np.unique(indexes, return_counts=True)
+            for index, count in zip(unique.tolist(), counts.tolist()):
+                self.bins[index] = self.bins.get(index, 0) + count
+
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        self._collapse()
+        return self
+
+    def merge(self, other):
+        """Merge another sketch with the same relative accuracy into this one"""
+        if not math.isclose(self.gamma, other.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.count == 0:
+            return self
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        self._collapse()
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile (0 <= q <= 1).
+
+        Returns:
+            Estimated value within relative_accuracy of the true quantile,
+            or None if the sketch is empty
+        """
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile must be in [0, 1], got {q}")
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(0.0, self.min)
+
+        cumulative = self.zero_count
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def _collapse(self):
+        """Fold the lowest bins together once the bin limit is exceeded"""
+        if len(self.bins) <= self.max_bins:
+            return
+
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def to_dict(self):
+        """Serialize the sketch to a JSON-compatible dictionary"""
+        data = {
+            'type': 'ddsketch',
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'zero_count': self.zero_count,
+            'bin_offset': 0,
+            'bin_counts': [],
+        }
+
+        # Bins are stored densely from the lowest to the highest index,
+        # which is compact because samples rarely span many decades
+        if self.bins:
+            low, high = min(self.bins), max(self.bins)
+            data['bin_offset'] = low
+            data['bin_counts'] = [self.bins.get(index, 0) for index in range(low, high + 1)]
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch serialized with to_dict()"""
+        sketch = cls(data['relative_accuracy'], data.get('max_bins', 2048))
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.zero_count = data['zero_count']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+
+        offset = data.get('bin_offset', 0)
+        sketch.bins = {
+            offset + position: count
+            for position, count in enumerate(data.get('bin_counts', []))
+            if count
+        }
+        return sketch
+
+
+def merge_sketches(sketches, relative_accuracy=0.01):
+    """
+    Merge sketches or serialized sketch dictionaries into a new sketch.
+
+    Useful for combining percentiles across pods, services or stored runs.
+    """
+    merged = DDSketch(relative_accuracy)
+    for sketch in sketches:
+        if isinstance(sketch, dict):
+            sketch = DDSketch.from_dict(sketch)
+        merged.merge(sketch)
+    return merged
@@ -0,0 +1,218 @@
+"""
+Query Cache Module
+
+Content-addressed on-disk cache for Prometheus query responses.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# After exceeding the size limit, entries are evicted down to this fraction of
+# it so that a full cache does not rescan the directory on every write
+EVICTION_TARGET_RATIO = 0.9
+
+
+class QueryCache:
+    """Stores compressed Prometheus response bodies keyed by query content"""
+
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._size = None
+
+    def key(self, endpoint, params):
+        """
+        Build the cache key for a request.
+
+        Whitespace in the query is collapsed and timestamps are rounded to
+        milliseconds, so reformatted queries and re-parsed times share entries.
+
+        Args:
+            endpoint: Full API URL, e.g. 'http://localhost:9090/api/v1/query_range'
+            params: Request parameters (query, start, end, step or time)
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        normalized = {'endpoint': endpoint}
+        for name, value in params.items():
+            if name == 'query':
+                normalized[name] = ' '.join(str(value).split())
+            elif isinstance(value, float):
+                normalized[name] = round(value, 3)
+            else:
+                normalized[name] = value
+
+        encoded = json.dumps(normalized, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def open(self, key):
+        """
+        Open a cached response body for reading.
+
+        Returns:
+            Binary file object yielding the decompressed body, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            f = gzip.open(path, 'rb')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except OSError as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # The modification time doubles as the last access time for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return f
+
+    def writer(self, key):
+        """
+        Start writing a response body for key.
+
+        Returns:
+            CacheWriter, or None if the entry cannot be created
+        """
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        except OSError as e:
+            logger.warning(f"Failed to create cache entry {path.name}: {e}")
+            return None
+
+        return CacheWriter(self, path, fd, Path(tmp_path))
+
+    def invalidate(self, key):
+        """Remove an entry, e.g. one that turned out to be corrupt"""
+        self._remove(self._path(key))
+
+    def _added(self, path):
+        """Account for a committed entry, evicting least recently used entries if needed"""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _path(self, key):
+        """Entry path, fanned out over subdirectories by key prefix"""
+        return self.cache_dir / key[:2] / f"{key}.json.gz"
+
+    def _entries(self):
+        """List (mtime, size, path) for every cache entry"""
+        entries = []
+        for path in self.cache_dir.glob('*/*.json.gz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self):
+        """Total size of all cache entries in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove least recently used entries until below the eviction target"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        removed = 0
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+
+        self._size = total
+        logger.debug(f"Evicted {removed} cache entries, {total / 1024 / 1024:.1f} MB remaining")
+
+    def _remove(self, path):
+        """Delete a file, ignoring entries removed concurrently"""
+        try:
+            path.unlink()
+            return True
+        except OSError:
+            return False
+
+
+class CacheWriter:
+    """Compresses a response body into a temporary file while it is being read"""
+
+    def __init__(self, cache, path, fd, tmp_path):
+        self._cache = cache
+        self._path = path
+        self._tmp_path = tmp_path
+        self._raw = os.fdopen(fd, 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._failed = False
+
+    def tee(self, chunks):
+        """Write chunks to the entry while passing them through unchanged"""
+        for chunk in chunks:
+            # A full disk must not fail the query itself, only its caching
+            if not self._failed:
+                try:
+                    self._file.write(chunk)
+                except OSError as e:
+                    logger.warning(f"Failed to write cache entry {self._path.name}: {e}")
+                    self._failed = True
+            yield chunk
+
+    def commit(self):
+        """Publish the entry once the whole body has been written"""
+        if self._failed:
+            self.discard()
+            return
+
+        try:
+            self._close()
+            os.replace(self._tmp_path, self._path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {self._path.name}: {e}")
+            self._cache._remove(self._tmp_path)
+            return
+
+        self._cache._added(self._path)
+
+    def discard(self):
+        """Drop the partially written entry"""
+        try:
+            self._close()
+        except OSError:
+            pass
+        self._cache._remove(self._tmp_path)
+
+    def _close(self):
+        """Flush and close the compressed and underlying files"""
+        try:
+            self._file.close()
+        finally:
+            self._raw.close()
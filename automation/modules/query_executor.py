@@ -0,0 +1,94 @@
+"""
+Query Executor Module
+
+Runs Prometheus queries concurrently with a bounded number of in-flight requests.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class QueryExecutor:
+    """Executes query callables on a bounded thread pool"""
+
+    def __init__(self, max_concurrency=8):
+        self.max_concurrency = max(1, int(max_concurrency))
+        # Worker threads are only started on first submit, so an idle
+        # executor costs nothing
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix='prometheus-query'
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule a query callable for execution.
+
+        Callables submitted here must not wait on other futures from this
+        executor, otherwise a full pool can deadlock.
+
+        Returns:
+            concurrent.futures.Future for the callable's result
+        """
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def combine(self, futures, combiner):
+        """
+        Merge several futures into one without blocking a worker thread.
+
+        Args:
+            futures: List of futures from this executor
+            combiner: Callable receiving the list of results in order
+
+        Returns:
+            Future resolved with combiner(results) once all futures complete
+        """
+        combined = Future()
+        pending = [len(futures)]
+        lock = threading.Lock()
+
+        def _on_done(_):
+            with lock:
+                pending[0] -= 1
+                if pending[0]:
+                    return
+            try:
+                combined.set_result(combiner([future.result() for future in futures]))
+            except Exception as e:
+                combined.set_exception(e)
+
+        if not futures:
+            combined.set_result(combiner([]))
+        for future in futures:
+            future.add_done_callback(_on_done)
+
+        return combined
+
+    def gather(self, futures, default=None):
+        """
+        Wait for a dictionary of futures and collect their results.
+
+        Args:
+            futures: Dictionary mapping a name to a future
+            default: Value used for futures that raised an exception
+
+        Returns:
+            Dictionary mapping the same names to results
+        """
+        results = {}
+
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.warning(f"Query {name} failed: {e}")
+                results[name] = default
+
+        return results
+
+    def shutdown(self):
+        """Stop the worker threads once pending queries finish"""
+        self._pool.shutdown(wait=True)
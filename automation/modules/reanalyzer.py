@@ -0,0 +1,196 @@
+"""
+Reanalyzer Module
+
+Rebuilds benchmark artifacts of finished runs from their stored raw series,
+without touching the cloud or Prometheus.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from modules.artifact_generator import ArtifactGenerator
+from modules.artifact_stream import ArtifactReader, find_artifact
+from modules.prometheus_client import PrometheusClient
+from modules.series_store import SeriesStore
+
+logger = logging.getLogger(__name__)
+
+# Attempts at claiming a version number while other processes reanalyze the same run
+MAX_VERSION_ATTEMPTS = 10
+
+
+class Reanalyzer:
+    """Recomputes run artifacts from series stores with new analysis settings"""
+
+    def __init__(self, config):
+        self.config = config
+        self.output_dir = Path(
+            config.get('output_dir') or Path(__file__).parent.parent.parent / 'benchmarks'
+        )
+        self.warmup_seconds = config.get('warmup_seconds', 0)
+
+    def stored_runs(self):
+        """Run ids in the benchmarks directory that have an artifact and a series store"""
+        return sorted(
+            path.name[:-len('_series')]
+            for path in self.output_dir.glob('*_series')
+            if find_artifact(self.output_dir, path.name[:-len('_series')])
+        )
+
+    def reanalyze_runs(self, run_ids, workers=None):
+        """
+        Reanalyze several runs, one worker process per run.
+
+        Args:
+            run_ids: Run ids to rebuild
+            workers: Number of worker processes (default: CPU count)
+
+        Returns:
+            Dictionary mapping each run id to its new artifact path, or None
+            if the run could not be reanalyzed
+        """
+        workers = max(1, min(workers or os.cpu_count() or 1, len(run_ids) or 1))
+        logger.info(f"Reanalyzing {len(run_ids)} runs with {workers} worker processes...")
+
+        results = {}
+        if workers == 1:
+            for run_id in run_ids:
+                results[run_id] = self._reanalyze_safely(run_id)
+            return results
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                run_id: pool.submit(_reanalyze_in_worker, self.config, run_id)
+                for run_id in run_ids
+            }
+            for run_id, future in futures.items():
+                try:
+                    results[run_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to reanalyze {run_id}: {e}")
+                    results[run_id] = None
+
+        return results
+
+    def reanalyze_run(self, run_id):
+        """
+        Rebuild one run's artifact from its series store as a new version.
+
+        The header of the original artifact (<run_id>.json, or its
+        compressed stream) supplies the run's configuration; statistics are
+        recomputed by PrometheusClient and shaped by ArtifactGenerator like in
+        a live run. The new version is saved in the original's format.
+
+        Returns:
+            Path to the new artifact, <run_id>.v<N>.json or .jsonl.gz/.jsonl.zst
+        """
+        original_path = find_artifact(self.output_dir, run_id)
+        if original_path is None:
+            raise FileNotFoundError(f"No artifact of {run_id} in {self.output_dir}")
+        reader = ArtifactReader(original_path)
+        original = reader.header()
+
+        store = SeriesStore(self.output_dir / f"{run_id}_series")
+        raw_series = store.read_all()
+        if not raw_series:
+            raise ValueError(f"Series store of {run_id} is empty")
+
+        collection = original.get('collection_metadata', {})
+        start_time = datetime.fromisoformat(collection['start_time'])
+        end_time = datetime.fromisoformat(collection['end_time'])
+
+        client = PrometheusClient({
+            'namespace': collection.get('namespace', 'default'),
+            'query_cache': False,
+            'store_series': False,
+            'percentile_method': self.config.get('percentile_method', 'linear'),
+            'sketch_relative_accuracy': self.config.get('sketch_relative_accuracy', 0.01),
+        })
+        try:
+            metrics = client.reanalyze(
+                raw_series, start_time, end_time, collection, warmup_seconds=self.warmup_seconds
+            )
+        finally:
+            client.close()
+
+        # The new version describes the same run, so it keeps the run's
+        # configured duration (less the warmup) and timestamp, which the
+        # catalog and the regression gate match runs on; when and how it was
+        # reanalyzed is only recorded in collection_metadata['reanalysis']
+        metrics['collection_metadata']['reanalysis']['timestamp'] = datetime.now().isoformat()
+        analysis_start = start_time + timedelta(seconds=self.warmup_seconds)
+        duration = original.get('load_profile', {}).get('duration_seconds')
+        if duration is None:
+            duration = (end_time - start_time).total_seconds()
+
+        generator = ArtifactGenerator({
+            **self._run_config(original),
+            'artifact_compression': reader.compression,
+        })
+        artifact = generator.generate(
+            cluster_info=self._cluster_info(original),
+            metrics=metrics,
+            benchmark_results={
+                'start_time': analysis_start,
+                'end_time': end_time,
+                'duration': duration - self.warmup_seconds,
+            }
+        )
+        artifact.timestamp = original.get('timestamp', artifact.timestamp)
+        path = self._save_new_version(generator, artifact)
+        logger.info(f"Reanalyzed {run_id} as version {artifact.artifact_version}: {path}")
+        return path
+
+    def _save_new_version(self, generator, artifact):
+        """Save the artifact under the next free version number of its run"""
+        for _ in range(MAX_VERSION_ATTEMPTS):
+            artifact.artifact_version = generator.next_artifact_version(artifact.run_id)
+            try:
+                return generator.save_artifact(artifact)
+            except FileExistsError:
+                logger.info(f"Version {artifact.artifact_version} of {artifact.run_id} "
+                            f"was taken by another process, retrying...")
+        raise RuntimeError(f"Could not claim a new version of {artifact.run_id}")
+
+    def _reanalyze_safely(self, run_id):
+        """Reanalyze one run, logging instead of raising on failure"""
+        try:
+            return self.reanalyze_run(run_id)
+        except Exception as e:
+            logger.error(f"Failed to reanalyze {run_id}: {e}")
+            return None
+
+    def _run_config(self, artifact):
+        """Rebuild the pipeline configuration ArtifactGenerator needs from an artifact"""
+        node_pool = artifact.get('node_pool', {})
+        load_profile = artifact.get('load_profile', {})
+        return {
+            'run_id': artifact['run_id'],
+            'cloud': artifact.get('cloud', 'unknown'),
+            'machine_type': node_pool.get('machine_type', 'unknown'),
+            'cpu_vendor': node_pool.get('cpu_vendor', 'unknown'),
+            'cpu_generation': node_pool.get('cpu_generation', 'unknown'),
+            'node_count': node_pool.get('node_count', 1),
+            'users_count': load_profile.get('users_count', 'unknown'),
+            'rps': load_profile.get('rps', 'unknown'),
+            'output_dir': self.output_dir,
+        }
+
+    def _cluster_info(self, artifact):
+        """Cluster information as recorded in an artifact"""
+        node_pool = artifact.get('node_pool', {})
+        return {
+            'region': artifact.get('region', 'unknown'),
+            'zone': artifact.get('zone', 'unknown'),
+            'cpu_vendor': node_pool.get('cpu_vendor'),
+            'cpu_generation': node_pool.get('cpu_generation'),
+            'machine_specs': node_pool.get('machine_specs', {}),
+        }
+
+
+def _reanalyze_in_worker(config, run_id):
+    """Process pool entry point: reanalyze one run in a fresh Reanalyzer"""
+    return Reanalyzer(config).reanalyze_run(run_id)
@@ -0,0 +1,278 @@
+"""
+Regression Gate Module
+
+Checks the per-service resource usage of a run against a baseline, so CI
+can fail platform changes that make the application more expensive.
+
+The baseline is either a pinned artifact or a rolling baseline. A rolling
+baseline is the per-service median of the latest cataloged runs with the same
+machine type, CPU vendor, node count and load profile. A metric regresses when
+it exceeds the baseline by more than both its relative tolerance and its
+absolute noise floor.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from modules.artifact_stream import ArtifactReader, artifact_stem, find_artifact
+from modules.artifact_writer import atomic_write
+from modules.results_catalog import ResultsCatalog
+
+logger = logging.getLogger(__name__)
+
+# Exit code of main.py when a run regressed, apart from 1 for a failed pipeline
+REGRESSION_EXIT_CODE = 3
+
+# Gated service metrics: default tolerance in percent and absolute noise floor
+GATED_METRICS = {
+    'cpu_seconds': (10.0, 1.0),
+    'memory_avg_mb': (10.0, 5.0),
+    'cpu_throttled_seconds': (25.0, 0.5),
+}
+
+DEFAULT_ROLLING_RUNS = 5
+
+# Catalog run columns a rolling baseline must match, and where the artifact keeps them
+SCENARIO_FIELDS = {
+    'machine_type': ('node_pool', 'machine_type'),
+    'cpu_vendor': ('node_pool', 'cpu_vendor'),
+    'node_count': ('node_pool', 'node_count'),
+    'users_count': ('load_profile', 'users_count'),
+    'rps': ('load_profile', 'rps'),
+    'duration_seconds': ('load_profile', 'duration_seconds'),
+}
+
+
+class RegressionGate:
+    """Compares runs with a pinned or rolling baseline and writes diff reports"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Dictionary with optional output_dir, catalog_path,
+                baseline_run, rolling_baseline_runs and regression_tolerances
+                (metric name to percent)
+        """
+        self.config = config
+        self.output_dir = Path(
+            config.get('output_dir') or Path(__file__).parent.parent.parent / 'benchmarks'
+        )
+        self.catalog = ResultsCatalog(config.get('catalog_path') or self.output_dir / 'results.db')
+        self.baseline_run = config.get('baseline_run')
+        self.rolling_runs = config.get('rolling_baseline_runs')
+        if self.rolling_runs is None:
+            self.rolling_runs = DEFAULT_ROLLING_RUNS
+        if self.rolling_runs < 1:
+            raise ValueError(f"A rolling baseline needs at least 1 run, got {self.rolling_runs}")
+
+        tolerances = config.get('regression_tolerances') or {}
+        unknown = set(tolerances) - set(GATED_METRICS)
+        if unknown:
+            raise ValueError(f"No tolerance for {sorted(unknown)}; gated metrics are {list(GATED_METRICS)}")
+        if any(tolerance < 0 for tolerance in tolerances.values()):
+            raise ValueError("Regression tolerances must not be negative")
+        self.tolerances = {
+            metric: tolerances.get(metric, tolerance) for metric, (tolerance, _) in GATED_METRICS.items()
+        }
+
+    def check(self, artifact_path):
+        """
+        Compare one artifact with the baseline and write its regression report.
+
+        The report is written next to the artifact as
+        <run_id>_regression.json (<run_id>.v<N>_regression.json for
+        reanalyzed versions).
+
+        Args:
+            artifact_path: Artifact in any supported format
+
+        Returns:
+            Report dictionary; its status is 'fail' if any metric regressed,
+            'no_baseline' if no baseline service could be compared, else 'pass'
+        """
+        artifact_path = Path(artifact_path)
+        header = ArtifactReader(artifact_path).header()
+        baseline = self.resolve_baseline(header)
+        current = _service_values(header)
+
+        services = {}
+        regressions = []
+        if baseline:
+            for service in sorted(current.keys() & baseline['services'].keys()):
+                services[service] = {}
+                for metric in GATED_METRICS:
+                    diff = self._compare_metric(
+                        metric, baseline['services'][service].get(metric), current[service].get(metric)
+                    )
+                    services[service][metric] = diff
+                    if diff['status'] == 'regression':
+                        regressions.append({'service': service, 'metric': metric, **diff})
+
+        # Without services in common there is nothing the gate could pass
+        status = 'no_baseline' if not services else 'fail' if regressions else 'pass'
+        report = {
+            'run_id': header.get('run_id'),
+            'artifact': artifact_path.name,
+            'status': status,
+            'baseline': {key: value for key, value in baseline.items() if key != 'services'} if baseline else None,
+            'tolerances': {
+                metric: {'tolerance_pct': self.tolerances[metric], 'absolute_floor': floor}
+                for metric, (_, floor) in GATED_METRICS.items()
+            },
+            'regressions': regressions,
+            'services': services,
+            'new_services': sorted(current.keys() - baseline['services'].keys()) if baseline else [],
+            'missing_services': sorted(baseline['services'].keys() - current.keys()) if baseline else [],
+        }
+
+        report_path = artifact_path.parent / f"{artifact_stem(artifact_path)}_regression.json"
+        with atomic_write(report_path) as f:
+            json.dump(report, f, indent=2)
+
+        if status == 'fail':
+            logger.error(f"{len(regressions)} regressions against the {baseline['mode']} baseline:")
+            for regression in regressions:
+                logger.error(f"  - {regression['service']} {regression['metric']}: "
+                             f"{regression['baseline']} -> {regression['current']} "
+                             f"({regression['delta']:+g}, tolerance {regression['tolerance_pct']}%)")
+        elif status == 'pass':
+            logger.info(f"No regressions against the {baseline['mode']} baseline ({len(services)} services)")
+        elif baseline:
+            logger.warning(f"The {baseline['mode']} baseline has no services in common with the run; "
+                           f"regression gate skipped")
+        else:
+            logger.warning("No baseline to compare with; regression gate skipped")
+        logger.info(f"Regression report saved to {report_path}")
+
+        return report
+
+    def resolve_baseline(self, header):
+        """
+        Baseline of a run: the pinned artifact if configured, else a rolling baseline.
+
+        Args:
+            header: Artifact sections other than pods and nodes
+
+        Returns:
+            Dictionary with mode, artifacts, scenario and per-service metric
+            values, or None if there is no rolling baseline yet
+        """
+        if self.baseline_run:
+            baseline = self.pinned_baseline()
+            scenario = _scenario(header)
+            differences = [
+                column for column, value in baseline['scenario'].items() if value != scenario[column]
+            ]
+            if differences:
+                logger.warning(f"Baseline {self.baseline_run} differs from the run in {differences}")
+            return baseline
+
+        return self.rolling_baseline(header)
+
+    def pinned_baseline(self):
+        """
+        Load the pinned baseline artifact.
+
+        Raises:
+            FileNotFoundError: If benchmarks/ has no artifact of that name
+        """
+        path = find_artifact(self.output_dir, self.baseline_run)
+        if path is None:
+            raise FileNotFoundError(f"Baseline artifact {self.baseline_run} not found in {self.output_dir}")
+
+        header = ArtifactReader(path).header()
+        return {
+            'mode': 'pinned',
+            'artifacts': [path.name],
+            'scenario': _scenario(header),
+            'services': _service_values(header),
+        }
+
+    def rolling_baseline(self, header):
+        """
+        Per-service medians of the latest comparable runs before this one.
+
+        Args:
+            header: Artifact sections other than pods and nodes
+
+        Returns:
+            Baseline dictionary, or None if the catalog has no comparable runs
+        """
+        scenario = _scenario(header)
+        filters = {column: value for column, value in scenario.items() if value is not None}
+        runs = self.catalog.find_runs(until=header.get('timestamp'), **filters)
+        runs = [run for run in runs if run['run_id'] != header.get('run_id') and run['artifact_path']]
+
+        values = {}
+        artifacts = []
+        for run in runs:
+            if len(artifacts) == self.rolling_runs:
+                break
+            try:
+                services = _service_values(ArtifactReader(self.output_dir / run['artifact_path']).header())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping {run['artifact_path']} in the rolling baseline: {e}")
+                continue
+
+            artifacts.append(run['artifact_path'])
+            for service, metrics in services.items():
+                for metric, value in metrics.items():
+                    if value is not None:
+                        values.setdefault(service, {}).setdefault(metric, []).append(value)
+
+        if not artifacts:
+            return None
+
+        return {
+            'mode': 'rolling',
+            'artifacts': artifacts,
+            'scenario': scenario,
+            'services': {
+                service: {metric: round(float(np.median(samples)), 4) for metric, samples in metrics.items()}
+                for service, metrics in values.items()
+            },
+        }
+
+    def _compare_metric(self, metric, baseline, current):
+        """Difference of one metric to its baseline with its verdict"""
+        tolerance = self.tolerances[metric]
+        floor = GATED_METRICS[metric][1]
+        diff = {
+            'baseline': baseline,
+            'current': current,
+            'delta': None,
+            'delta_pct': None,
+            'tolerance_pct': tolerance,
+            'status': 'unavailable',
+        }
+        if baseline is None or current is None:
+            return diff
+
+        delta = current - baseline
+        # Changes within the tolerance or below the noise floor are not verdicts
+        allowed = max(abs(baseline) * tolerance / 100, floor)
+        diff.update({
+            'delta': round(delta, 4),
+            'delta_pct': round(delta / baseline * 100, 2) if baseline else None,
+            'status': 'regression' if delta > allowed else 'improvement' if delta < -allowed else 'ok',
+        })
+        return diff
+
+
+def _service_values(header):
+    """Gated metric values of every service in an artifact header"""
+    return {
+        service: {metric: metrics.get(metric) for metric in GATED_METRICS}
+        for service, metrics in (header.get('services') or {}).items()
+    }
+
+
+def _scenario(header):
+    """Catalog column values that make runs comparable"""
+    return {
+        column: (header.get(section) or {}).get(key)
+        for column, (section, key) in SCENARIO_FIELDS.items()
+    }
@@ -0,0 +1,273 @@
+"""
+Response Parser Module
+
+Incremental decoder for Prometheus query API responses.
+
+Series are decoded one at a time as chunks of the body arrive and their
+samples are written straight into TimeSeries arrays, so peak memory follows
+the largest series instead of the whole response.
+"""
+
+import codecs
+import json
+import re
+
+import numpy as np
+
+from modules.time_series import TimeSeries
+
+# Bytes read per chunk from the network or the query cache
+CHUNK_SIZE = 64 * 1024
+
+RESULT_MARKER = '"result":'
+RESULT_TYPE_PATTERN = re.compile(r'"resultType"\s*:\s*"(\w+)"')
+
+# Result types whose 'result' is a list of series objects; scalar and string
+# results are tiny and decoded as a whole
+SERIES_RESULT_TYPES = {'matrix', 'vector'}
+
+# One [timestamp, "value"] pair inside a range series
+SAMPLE_PATTERN = re.compile(r'\[\s*([^,\]\s]+)\s*,\s*"([^"]*)"\s*\]')
+# Closing bracket of the last sample followed by the end of the values array
+VALUES_END_PATTERN = re.compile(r'\]\s*\]')
+
+WHITESPACE = ' \t\n\r'
+SEPARATORS = WHITESPACE + ','
+
+
+def parse_response(chunks):
+    """
+    Decode a Prometheus API response from an iterable of byte chunks.
+
+    Args:
+        chunks: Iterable of bytes, e.g. response.iter_content()
+
+    Returns:
+        Payload as json.loads() would return it, except that matrix and
+        vector results are lists of TimeSeries; instant series hold a single
+        sample
+
+    Raises:
+        json.JSONDecodeError: If the body is malformed or truncated
+    """
+    parser = ResponseParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    """Iterate over a binary file object in fixed-size chunks"""
+    return iter(lambda: f.read(chunk_size), b'')
+
+
+class ResponseParser:
+    """Push parser turning response body chunks into series with numeric samples"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'header'
+        self._header = None
+        self._series = []
+        self._current = None
+        self._parts = []
+
+        self._handlers = {
+            'header': self._parse_header,
+            'series': self._parse_series,
+            'field': self._parse_field,
+            'values': self._parse_values,
+        }
+
+    def feed(self, chunk):
+        """Consume the next chunk of the response body"""
+        self._append(self._decoder.decode(chunk))
+        self._advance(eof=False)
+
+    def close(self):
+        """
+        Finish decoding once the whole body has been fed.
+
+        Returns:
+            Decoded payload (see parse_response)
+        """
+        self._append(self._decoder.decode(b'', final=True))
+        self._advance(eof=True)
+
+        # Error responses and scalar results never reach the series list
+        if self._state in ('header', 'raw'):
+            return json.loads(self._buffer)
+        if self._state != 'trailer':
+            raise json.JSONDecodeError("Truncated response body", self._buffer, self._pos)
+
+        # Decode everything around the series list (status, warnings) as a
+        # skeleton and put the streamed series back in
+        payload = json.loads(self._header + '[]' + self._buffer[self._pos:])
+        payload['data']['result'] = self._series
+        return payload
+
+    def _append(self, text):
+        """Drop consumed input and append newly decoded text"""
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+
+    def _advance(self, eof):
+        """Run state handlers until one needs more input"""
+        while self._state in self._handlers:
+            if not self._handlers[self._state](eof):
+                return
+
+    def _skip(self, pos, characters=WHITESPACE):
+        """Index of the first character at or after pos not in characters"""
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in characters:
+            pos += 1
+        return pos
+
+    def _decode_value(self, pos, eof):
+        """Decode one JSON value at pos, or return None if it is still incomplete"""
+        try:
+            return self._json.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            return None
+
+    def _parse_header(self, eof):
+        """Find the start of the series list"""
+        index = self._buffer.find(RESULT_MARKER)
+        if index < 0:
+            return False
+
+        start = self._skip(index + len(RESULT_MARKER))
+        if start >= len(self._buffer):
+            return False
+
+        header = self._buffer[:index + len(RESULT_MARKER)]
+        result_type = RESULT_TYPE_PATTERN.search(header)
+        if (self._buffer[start] != '[' or result_type is None
+                or result_type.group(1) not in SERIES_RESULT_TYPES):
+            # Keep buffering and decode the whole body on close
+            self._state = 'raw'
+            return False
+
+        self._header = header
+        self._pos = start + 1
+        self._state = 'series'
+        return True
+
+    def _parse_series(self, eof):
+        """Start the next series object or finish the series list"""
+        pos = self._skip(self._pos, SEPARATORS)
+        if pos >= len(self._buffer):
+            return False
+
+        character = self._buffer[pos]
+        if character == ']':
+            self._pos = pos + 1
+            self._state = 'trailer'
+            return False
+        if character != '{':
+            raise json.JSONDecodeError("Expected series object", self._buffer, pos)
+
+        self._current = {}
+        self._pos = pos + 1
+        self._state = 'field'
+        return True
+
+    def _parse_field(self, eof):
+        """Decode the next field of the current series"""
+        pos = self._skip(self._pos, SEPARATORS)
+        if pos >= len(self._buffer):
+            return False
+
+        if self._buffer[pos] == '}':
+            self._finish_series()
+            self._pos = pos + 1
+            self._state = 'series'
+            return True
+
+        decoded = self._decode_value(pos, eof)
+        if decoded is None:
+            return False
+        name, end = decoded
+
+        colon = self._skip(end)
+        value_start = self._skip(colon + 1)
+        if value_start >= len(self._buffer):
+            if eof:
+                raise json.JSONDecodeError("Truncated series field", self._buffer, end)
+            return False
+        if self._buffer[colon] != ':':
+            raise json.JSONDecodeError("Expected ':'", self._buffer, colon)
+
+        # Range samples are streamed; everything else in a series is small
+        if name == 'values' and self._buffer[value_start] == '[':
+            self._parts = []
+            self._pos = value_start + 1
+            self._state = 'values'
+            return True
+
+        decoded = self._decode_value(value_start, eof)
+        if decoded is None:
+            return False
+        value, end = decoded
+
+        self._current[name] = value
+        self._pos = end
+        return True
+
+    def _parse_values(self, eof):
+        """Convert all complete samples in the buffer to arrays"""
+        pos = self._skip(self._pos, SEPARATORS)
+        if pos >= len(self._buffer):
+            return False
+
+        if self._buffer[pos] == ']':
+            self._finish_values(pos + 1)
+            return True
+
+        # Samples contain no brackets besides their own, so the first double
+        # bracket closes this series' values array
+        closing = VALUES_END_PATTERN.search(self._buffer, pos)
+        if closing:
+            end = closing.start() + 1
+        else:
+            end = self._buffer.rfind(']', pos) + 1
+            if end <= pos:
+                return False
+
+        samples = SAMPLE_PATTERN.findall(self._buffer, pos, end)
+        if samples:
+            self._parts.append(np.array(samples, dtype=np.float64))
+
+        if closing:
+            self._finish_values(closing.end())
+            return True
+
+        self._pos = end
+        return False
+
+    def _finish_series(self):
+        """Turn the decoded fields of the current series into a TimeSeries"""
+        fields = self._current
+        samples = fields.get('values', fields.get('value', ()))
+        self._series.append(TimeSeries.from_samples(fields.get('metric', {}), samples))
+        self._current = None
+
+    def _finish_values(self, end):
+        """Store the collected samples on the current series"""
+        if self._parts:
+            values = np.concatenate(self._parts) if len(self._parts) > 1 else self._parts[0]
+        else:
+            values = np.empty((0, 2), dtype=np.float64)
+
+        self._current['values'] = values
+        self._parts = []
+        self._pos = end
+        self._state = 'field'
@@ -0,0 +1,260 @@
+"""
+Results Catalog Module
+
+Indexed SQLite catalog of benchmark runs with their per-pod and per-node rows.
+
+Every artifact is upserted under (run_id, artifact_version), so saving a run
+again replaces its rows instead of duplicating them, and cross-run queries
+filter on indexed columns instead of scanning CSV files.
+"""
+
+import logging
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# One row per artifact version; the metric columns match cluster_summary.csv,
+# plus the cluster CPU-seconds totals. Metrics a run did not produce are NULL
+RUN_COLUMNS = {
+    'run_id': 'TEXT NOT NULL',
+    'artifact_version': 'INTEGER NOT NULL',
+    'artifact_path': 'TEXT',
+    'timestamp': 'TEXT',
+    'cloud': 'TEXT',
+    'region': 'TEXT',
+    'zone': 'TEXT',
+    'machine_type': 'TEXT',
+    'cpu_vendor': 'TEXT',
+    'cpu_generation': 'TEXT',
+    'node_count': 'INTEGER',
+    'vcpus': 'INTEGER',
+    'memory_gb': 'REAL',
+    'duration_seconds': 'REAL',
+    'users_count': 'INTEGER',
+    'rps': 'INTEGER',
+    'cpu_avg_util_pct': 'REAL',
+    'cpu_max_util_pct': 'REAL',
+    'cpu_p95_util_pct': 'REAL',
+    'cpu_p99_util_pct': 'REAL',
+    'cpu_throttled_seconds': 'REAL',
+    'cpu_throttled_pct': 'REAL',
+    'memory_avg_mb': 'REAL',
+    'memory_max_mb': 'REAL',
+    'memory_avg_util_pct': 'REAL',
+    'network_rx_mb_per_sec': 'REAL',
+    'network_tx_mb_per_sec': 'REAL',
+    'request_rate_rps': 'REAL',
+    'cpu_seconds_per_request': 'REAL',
+    'memory_mb_per_request': 'REAL',
+    'total_pods': 'INTEGER',
+    'total_nodes': 'INTEGER',
+    'total_services': 'INTEGER',
+    'cpu_seconds': 'REAL',
+    'cpu_throttled_seconds_total': 'REAL',
+}
+
+# One row per container of an artifact version; columns match <run_id>_pods.csv
+POD_COLUMNS = {
+    'run_id': 'TEXT NOT NULL',
+    'artifact_version': 'INTEGER NOT NULL',
+    'pod_name': 'TEXT NOT NULL',
+    'container_name': 'TEXT NOT NULL',
+    'cpu_avg_pct': 'REAL',
+    'cpu_max_pct': 'REAL',
+    'cpu_min_pct': 'REAL',
+    'cpu_p95_pct': 'REAL',
+    'cpu_p99_pct': 'REAL',
+    'cpu_std_dev': 'REAL',
+    'cpu_throttled_avg_sec': 'REAL',
+    'cpu_throttled_max_sec': 'REAL',
+    'cpu_throttled_total_sec': 'REAL',
+    'cpu_seconds': 'REAL',
+    'cpu_throttled_periods_ratio': 'REAL',
+    'memory_avg_mb': 'REAL',
+    'memory_max_mb': 'REAL',
+    'memory_min_mb': 'REAL',
+    'memory_p95_mb': 'REAL',
+    'cpu_limit_cores': 'REAL',
+}
+
+# One row per node of an artifact version; columns match <run_id>_nodes.csv
+NODE_COLUMNS = {
+    'run_id': 'TEXT NOT NULL',
+    'artifact_version': 'INTEGER NOT NULL',
+    'node_name': 'TEXT NOT NULL',
+    'cpu_avg_pct': 'REAL',
+    'cpu_max_pct': 'REAL',
+    'cpu_min_pct': 'REAL',
+    'memory_avg_util_pct': 'REAL',
+    'memory_max_util_pct': 'REAL',
+    'memory_min_util_pct': 'REAL',
+}
+
+PRIMARY_KEYS = {
+    'runs': ('run_id', 'artifact_version'),
+    'pods': ('run_id', 'artifact_version', 'pod_name', 'container_name'),
+    'nodes': ('run_id', 'artifact_version', 'node_name'),
+}
+
+# Columns cross-run comparisons select on
+INDEXES = {
+    'runs_machine_type': ('runs', ('machine_type',)),
+    'runs_cpu_vendor': ('runs', ('cpu_vendor',)),
+    'runs_node_count': ('runs', ('node_count',)),
+    'runs_load_profile': ('runs', ('users_count', 'rps', 'duration_seconds')),
+    'runs_timestamp': ('runs', ('timestamp',)),
+}
+
+# Columns find_runs() accepts as exact-match filters
+FILTER_COLUMNS = (
+    'cloud', 'region', 'zone', 'machine_type', 'cpu_vendor', 'cpu_generation',
+    'node_count', 'duration_seconds', 'users_count', 'rps',
+)
+
+
+class ResultsCatalog:
+    """SQLite catalog of benchmark runs, safe to share between processes"""
+
+    def __init__(self, path, timeout=30):
+        """
+        Args:
+            path: Database file, created on first use
+            timeout: Seconds to wait for another process' write lock
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._schema_ready = False
+
+    def upsert_run(self, run, pods=(), nodes=()):
+        """
+        Insert or replace one artifact version of a run with its pods and nodes.
+
+        The run row and its child rows are replaced in a single transaction,
+        so readers never see a partially written run.
+
+        Args:
+            run: Dictionary of RUN_COLUMNS values; artifact_version defaults to 1
+            pods: Dictionaries of POD_COLUMNS values
+            nodes: Dictionaries of NODE_COLUMNS values
+        """
+        run = {**run, 'artifact_version': run.get('artifact_version', 1)}
+        key = {'run_id': run['run_id'], 'artifact_version': run['artifact_version']}
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(self._upsert_sql('runs', RUN_COLUMNS), self._values(run, RUN_COLUMNS))
+            for table, columns, rows in (('pods', POD_COLUMNS, pods), ('nodes', NODE_COLUMNS, nodes)):
+                conn.execute(f"DELETE FROM {table} WHERE run_id = ? AND artifact_version = ?",
+                             (key['run_id'], key['artifact_version']))
+                conn.executemany(
+                    self._upsert_sql(table, columns),
+                    [self._values({**row, **key}, columns) for row in rows]
+                )
+
+    def find_runs(self, latest_only=True, since=None, until=None, **filters):
+        """
+        Find runs by exact column values, newest first.
+
+        Example:
+            catalog.find_runs(machine_type='n2-standard-4', node_count=3)
+
+        Args:
+            latest_only: Return only the newest artifact version of each run
+            since: Optional ISO timestamp of the earliest run to include
+            until: Optional ISO timestamp of the latest run to include
+            filters: Column values from FILTER_COLUMNS
+
+        Returns:
+            List of dictionaries with the RUN_COLUMNS of each matching run
+        """
+        unknown = set(filters) - set(FILTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot filter runs by {sorted(unknown)}")
+
+        conditions = [f"{column} = ?" for column in filters]
+        params = list(filters.values())
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp <= ?")
+            params.append(until)
+        if latest_only:
+            conditions.append(
+                "artifact_version = (SELECT MAX(artifact_version) FROM runs AS newer "
+                "WHERE newer.run_id = runs.run_id)"
+            )
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._select(f"SELECT * FROM runs {where} ORDER BY timestamp DESC", params)
+
+    def pods(self, run_id, artifact_version=1):
+        """Per-container rows of one artifact version"""
+        return self._select(
+            "SELECT * FROM pods WHERE run_id = ? AND artifact_version = ? ORDER BY pod_name, container_name",
+            (run_id, artifact_version)
+        )
+
+    def nodes(self, run_id, artifact_version=1):
+        """Per-node rows of one artifact version"""
+        return self._select(
+            "SELECT * FROM nodes WHERE run_id = ? AND artifact_version = ? ORDER BY node_name",
+            (run_id, artifact_version)
+        )
+
+    def _select(self, sql, params):
+        """Run a query and return its rows as dictionaries"""
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def _connect(self):
+        """Open a connection, creating the schema on first use"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+
+        if not self._schema_ready:
+            try:
+                self._create_schema(conn)
+            except Exception:
+                conn.close()
+                raise
+            self._schema_ready = True
+
+        return conn
+
+    def _create_schema(self, conn):
+        """Create tables and indexes that do not exist yet"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(
+                f"{self.path} has catalog schema {version}, newer than supported {SCHEMA_VERSION}"
+            )
+
+        # WAL lets readers run while another process writes a run
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            for table, columns in (('runs', RUN_COLUMNS), ('pods', POD_COLUMNS), ('nodes', NODE_COLUMNS)):
+                definitions = [f"{name} {kind}" for name, kind in columns.items()]
+                definitions.append(f"PRIMARY KEY ({', '.join(PRIMARY_KEYS[table])})")
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(definitions)})")
+            for name, (table, columns) in INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _upsert_sql(self, table, columns):
+        """INSERT statement that updates the existing row on a primary key conflict"""
+        names = ', '.join(columns)
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(
+            f"{name} = excluded.{name}" for name in columns if name not in PRIMARY_KEYS[table]
+        )
+        return (f"INSERT INTO {table} ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({', '.join(PRIMARY_KEYS[table])}) DO UPDATE SET {updates}")
+
+    def _values(self, row, columns):
+        """Column values of a row in schema order, None where missing"""
+        return tuple(row.get(name) for name in columns)
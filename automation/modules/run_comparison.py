@@ -0,0 +1,356 @@
+"""
+Run Comparison Module
+
+Statistical comparison of benchmark runs across machine types and CPU vendors.
+
+Runs from the results catalog are grouped into scenarios with the same load
+profile and node count, and within each scenario into configurations of
+machine type and CPU vendor. For every metric the configurations are ranked by
+their mean, and each one is compared against the leader with a bootstrap
+confidence interval of the relative difference and a two-sided Mann-Whitney U
+test. Runs that did not produce a metric are left out of its samples, so a
+legacy run without CPU accounting is never ranked by a stored zero.
+"""
+
+import csv
+import logging
+from functools import lru_cache
+from math import erfc, sqrt
+from pathlib import Path
+
+import numpy as np
+
+from modules.artifact_writer import atomic_write
+from modules.results_catalog import ResultsCatalog
+
+logger = logging.getLogger(__name__)
+
+# Catalog run columns compared between configurations, and whether higher is better
+COMPARISON_METRICS = {
+    'cpu_seconds': False,
+    'cpu_seconds_per_request': False,
+    'cpu_throttled_seconds_total': False,
+    'cpu_throttled_pct': False,
+    'memory_avg_mb': False,
+    'memory_mb_per_request': False,
+    'request_rate_rps': True,
+}
+
+# Runs are only compared with runs of the same scenario
+SCENARIO_COLUMNS = ('users_count', 'rps', 'duration_seconds', 'node_count')
+CONFIGURATION_COLUMNS = ('machine_type', 'cpu_vendor')
+
+TABLE_FIELDS = [
+    'scenario', 'metric', 'rank', 'machine_type', 'cpu_vendor', 'runs',
+    'mean', 'std_dev', 'delta_pct', 'ci_low_pct', 'ci_high_pct', 'p_value', 'significant',
+]
+
+# Largest sample size with exact Mann-Whitney p-values; larger samples use the
+# tie-corrected normal approximation
+EXACT_MANN_WHITNEY_LIMIT = 25
+
+
+class RunComparator:
+    """Ranks machine configurations by catalog metrics with significance tests"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Dictionary with optional catalog_path, metrics,
+                bootstrap_samples, confidence, alpha and seed
+        """
+        self.config = config
+        output_dir = Path(config.get('output_dir') or Path(__file__).parent.parent.parent / 'benchmarks')
+        self.catalog = ResultsCatalog(config.get('catalog_path') or output_dir / 'results.db')
+        self.metrics = list(config.get('metrics') or COMPARISON_METRICS)
+        self.bootstrap_samples = config.get('bootstrap_samples', 10000)
+        self.confidence = config.get('confidence', 0.95)
+        self.alpha = config.get('alpha', 0.05)
+        self.seed = config.get('seed', 0)
+
+        unknown = set(self.metrics) - set(COMPARISON_METRICS)
+        if unknown:
+            raise ValueError(f"Cannot compare runs by {sorted(unknown)}; choose from {list(COMPARISON_METRICS)}")
+        if not 0 < self.confidence < 1:
+            raise ValueError(f"confidence must be between 0 and 1, got {self.confidence}")
+
+    def compare(self, machine_types=None, cpu_vendors=None, since=None, until=None, **filters):
+        """
+        Compare the latest version of every matching run in the catalog.
+
+        Example:
+            comparator.compare(machine_types=['n2-standard-4', 'n2d-standard-4'], users_count=300)
+
+        Args:
+            machine_types: Optional machine types to include
+            cpu_vendors: Optional CPU vendors to include
+            since: Optional ISO timestamp of the earliest run to include
+            until: Optional ISO timestamp of the latest run to include
+            filters: Exact column values passed to ResultsCatalog.find_runs()
+
+        Returns:
+            Ranked table rows, see compare_runs()
+        """
+        runs = self.catalog.find_runs(since=since, until=until, **filters)
+        runs = [
+            run for run in runs
+            if (not machine_types or run['machine_type'] in machine_types)
+            and (not cpu_vendors or run['cpu_vendor'] in cpu_vendors)
+        ]
+        logger.info(f"Comparing {len(runs)} runs from {self.catalog.path}")
+        return self.compare_runs(runs)
+
+    def compare_runs(self, runs):
+        """
+        Rank the configurations of each scenario by every metric.
+
+        The leader of a metric is the configuration with the best mean; every
+        other configuration gets its difference to the leader in percent, a
+        bootstrap confidence interval of that difference and the Mann-Whitney
+        p-value of its runs against the leader's.
+
+        Args:
+            runs: Run rows with the catalog's RUN_COLUMNS
+
+        Returns:
+            List of dictionaries with TABLE_FIELDS, ordered by scenario,
+            metric and rank
+        """
+        rng = np.random.default_rng(self.seed)
+        rows = []
+
+        for scenario, configurations in sorted(_group_runs(runs).items(), key=lambda item: _sort_key(item[0])):
+            # One (runs x metrics) matrix per configuration
+            values = {
+                configuration: np.array(
+                    [[_as_float(run.get(metric)) for metric in self.metrics] for run in group],
+                    dtype=np.float64
+                )
+                for configuration, group in configurations.items()
+            }
+
+            for column, metric in enumerate(self.metrics):
+                rows.extend(self._rank_metric(scenario, metric, column, values, rng))
+
+        return rows
+
+    def _rank_metric(self, scenario, metric, column, values, rng):
+        """Table rows of one metric in one scenario, best configuration first"""
+        # Runs that did not produce the metric are no samples of it
+        samples = {
+            configuration: matrix[:, column][~np.isnan(matrix[:, column])]
+            for configuration, matrix in values.items()
+        }
+        samples = {configuration: sample for configuration, sample in samples.items() if sample.size}
+        if not samples:
+            return []
+
+        sign = -1 if COMPARISON_METRICS[metric] else 1
+        ranked = sorted(samples, key=lambda configuration: (sign * samples[configuration].mean(),
+                                                            _sort_key(configuration)))
+        leader = ranked[0]
+        leader_mean = samples[leader].mean()
+        leader_boot = _bootstrap_means(samples[leader], self.bootstrap_samples, rng) if len(ranked) > 1 else None
+        tail = (1 - self.confidence) / 2 * 100
+
+        rows = []
+        for rank, configuration in enumerate(ranked, start=1):
+            sample = samples[configuration]
+            row = {
+                'scenario': _scenario_label(scenario),
+                'metric': metric,
+                'rank': rank,
+                'machine_type': configuration[0],
+                'cpu_vendor': configuration[1],
+                'runs': int(sample.size),
+                'mean': round(float(sample.mean()), 4),
+                'std_dev': round(float(sample.std(ddof=1)), 4) if sample.size > 1 else 0.0,
+                'delta_pct': None,
+                'ci_low_pct': None,
+                'ci_high_pct': None,
+                'p_value': None,
+                'significant': None,
+            }
+
+            if configuration != leader and leader_mean != 0:
+                boot = _bootstrap_means(sample, self.bootstrap_samples, rng)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    relative = (boot / leader_boot - 1) * 100
+                relative = relative[np.isfinite(relative)]
+                p_value = mann_whitney_p(sample, samples[leader])
+                row.update({
+                    'delta_pct': round(float((sample.mean() / leader_mean - 1) * 100), 2),
+                    'p_value': float(f"{p_value:.4g}"),
+                    'significant': p_value < self.alpha,
+                })
+                if relative.size:
+                    low, high = np.percentile(relative, [tail, 100 - tail])
+                    row.update({'ci_low_pct': round(float(low), 2), 'ci_high_pct': round(float(high), 2)})
+
+            rows.append(row)
+
+        return rows
+
+    def format_table(self, rows):
+        """
+        Render table rows as aligned text, one block per scenario and metric.
+
+        Args:
+            rows: Rows returned by compare_runs()
+
+        Returns:
+            Table as a string
+        """
+        if not rows:
+            return 'No runs to compare'
+
+        confidence = f"{self.confidence * 100:g}%"
+        headers = ['rank', 'machine_type', 'cpu_vendor', 'runs', 'mean', 'std_dev',
+                   'delta_pct', f'{confidence} CI', 'p_value', '']
+        blocks = []
+
+        for scenario, metric in dict.fromkeys((row['scenario'], row['metric']) for row in rows):
+            better = 'higher' if COMPARISON_METRICS[metric] else 'lower'
+            cells = [headers]
+            for row in rows:
+                if row['scenario'] != scenario or row['metric'] != metric:
+                    continue
+                ci = '' if row['ci_low_pct'] is None else f"[{row['ci_low_pct']:+.2f}, {row['ci_high_pct']:+.2f}]"
+                cells.append([
+                    str(row['rank']), row['machine_type'], row['cpu_vendor'], str(row['runs']),
+                    f"{row['mean']:.4f}", f"{row['std_dev']:.4f}",
+                    '' if row['delta_pct'] is None else f"{row['delta_pct']:+.2f}%",
+                    ci,
+                    _format_p_value(row['p_value']),
+                    '*' if row['significant'] else '',
+                ])
+
+            widths = [max(len(line[position]) for line in cells) for position in range(len(headers))]
+            lines = [f"{scenario} | {metric} ({better} is better)"]
+            lines.extend('  '.join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in cells)
+            blocks.append('\n'.join(lines))
+
+        blocks.append(f"* p < {self.alpha} (two-sided Mann-Whitney U against rank 1)")
+        return '\n\n'.join(blocks)
+
+    def save_csv(self, rows, path):
+        """Write table rows to a CSV file"""
+        with atomic_write(path, newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=TABLE_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        logger.info(f"Comparison saved to {path}")
+
+
+def mann_whitney_p(x, y):
+    """
+    Two-sided p-value of the Mann-Whitney U test of two samples.
+
+    Exact for samples without ties of up to EXACT_MANN_WHITNEY_LIMIT runs,
+    otherwise from the tie-corrected normal approximation with continuity
+    correction.
+
+    Args:
+        x: First sample
+        y: Second sample
+
+    Returns:
+        p-value, 1.0 if a sample is empty
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n1, n2 = x.size, y.size
+    if not n1 or not n2:
+        return 1.0
+
+    # Average ranks of the pooled sample, ties sharing the mean of their ranks
+    unique, inverse, counts = np.unique(np.concatenate([x, y]), return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2
+    u = float(average_ranks[inverse[:n1]].sum()) - n1 * (n1 + 1) / 2
+    ties = counts[counts > 1]
+
+    if not ties.size and max(n1, n2) <= EXACT_MANN_WHITNEY_LIMIT:
+        distribution = _u_distribution(n1, n2)
+        lower = distribution[:int(u) + 1].sum()
+        upper = distribution[int(u):].sum()
+        return float(min(1.0, 2 * min(lower, upper)))
+
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - float((ties ** 3 - ties).sum()) / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = max(abs(u - n1 * n2 / 2) - 0.5, 0) / sqrt(variance)
+    return float(min(1.0, erfc(z / sqrt(2))))
+
+
+def _bootstrap_means(sample, samples, rng):
+    """
+    Means of bootstrap resamples of a sample.
+
+    Resamples are drawn as multinomial weights, so all of them come from one
+    matrix product.
+
+    Returns:
+        Array with one mean per resample
+    """
+    size = sample.size
+    weights = rng.multinomial(size, np.full(size, 1 / size), size=samples).astype(np.float64)
+    return weights @ sample / size
+
+
+@lru_cache(maxsize=None)
+def _u_distribution(n1, n2):
+    """Probabilities of every Mann-Whitney U value of two samples without ties"""
+    # counts[i][j][u]: orderings of i and j values whose U statistic is u
+    counts = [[np.ones(1)] * (n2 + 1)]
+    for i in range(1, n1 + 1):
+        row = [np.ones(1)]
+        for j in range(1, n2 + 1):
+            # The largest value belongs to the first sample, adding j to U, or to the second
+            total = np.zeros(i * j + 1)
+            total[j:j + counts[i - 1][j].size] += counts[i - 1][j]
+            total[:row[j - 1].size] += row[j - 1]
+            row.append(total)
+        counts.append(row)
+    distribution = counts[n1][n2]
+    return distribution / distribution.sum()
+
+
+def _group_runs(runs):
+    """Runs grouped by scenario, then by configuration"""
+    groups = {}
+    for run in runs:
+        scenario = tuple(run.get(column) for column in SCENARIO_COLUMNS)
+        configuration = tuple(str(run.get(column)) for column in CONFIGURATION_COLUMNS)
+        groups.setdefault(scenario, {}).setdefault(configuration, []).append(run)
+    return groups
+
+
+def _scenario_label(scenario):
+    """Readable label of a scenario key"""
+    users, rps, duration, nodes = scenario
+    duration = f"{duration:g}s" if isinstance(duration, (int, float)) else duration
+    return f"users={users} rps={rps} duration={duration} nodes={nodes}"
+
+
+def _sort_key(key):
+    """Sort key for tuples that may mix None, numbers and strings"""
+    return tuple(
+        (value is None, isinstance(value, str), value if isinstance(value, (int, float)) else 0, str(value))
+        for value in key
+    )
+
+
+def _format_p_value(p_value):
+    """p-value for the text table"""
+    if p_value is None:
+        return ''
+    return '<0.0001' if p_value < 0.0001 else f"{p_value:.4f}"
+
+
+def _as_float(value):
+    """Catalog value as a float, NaN where missing"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
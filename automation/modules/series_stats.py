@@ -0,0 +1,163 @@
+"""
+Series Statistics Module
+
+Vectorized summary statistics for Prometheus query results using NumPy.
+"""
+
+import numpy as np
+
+# Number of series reduced together when summarizing a grouped query; bounds
+# the size of the padded matrix for very long runs
+BATCH_ROWS = 256
+
+# Estimation methods accepted by np.percentile (Hyndman & Fan definitions)
+PERCENTILE_METHODS = (
+    'linear', 'lower', 'higher', 'midpoint', 'nearest',
+    'inverted_cdf', 'averaged_inverted_cdf', 'closest_observation',
+    'interpolated_inverted_cdf', 'hazen', 'weibull', 'median_unbiased', 'normal_unbiased',
+)
+
+
+def values_array(result):
+    """
+    Concatenate the samples of all series in a query result into one array.
+
+    NaN samples (e.g. from division by zero in PromQL) are dropped.
+    """
+    if not result:
+        return np.empty(0, dtype=np.float64)
+
+    return np.concatenate([series.valid_values() for series in result])
+
+
+def align_series(result):
+    """
+    Align the samples of several TimeSeries on a common timestamp axis.
+
+    Returns:
+        Tuple (timestamps, matrix) where matrix has one row per series and
+        NaN wherever a series has no sample at a timestamp
+    """
+    parsed = []
+    for series in result or []:
+        if len(series):
+            parsed.append((series.timestamps, series.values))
+
+    if not parsed:
+        return np.empty(0, dtype=np.float64), np.empty((0, 0), dtype=np.float64)
+
+    axis = np.unique(np.concatenate([timestamps for timestamps, _ in parsed]))
+    matrix = np.full((len(parsed), axis.size), np.nan)
+    for row, (timestamps, values) in enumerate(parsed):
+        matrix[row, np.searchsorted(axis, timestamps)] = values
+
+    return axis, matrix
+
+
+def cross_series_mean(matrix, reducer):
+    """
+    Reduce across series at each timestamp, then average over time.
+
+    Mirrors evaluating e.g. avg(...) or max(...) in a PromQL range query and
+    averaging the resulting samples. Timestamps with no samples are skipped.
+
+    Args:
+        matrix: Aligned matrix from align_series
+        reducer: One of 'mean', 'max', 'sum'
+
+    Returns:
+        Time-averaged value, or None if the matrix has no samples
+    """
+    present = ~np.isnan(matrix).all(axis=0) if matrix.size else np.zeros(0, dtype=bool)
+    if not present.any():
+        return None
+
+    columns = matrix[:, present]
+    reduce = {'mean': np.nanmean, 'max': np.nanmax, 'sum': np.nansum}[reducer]
+    return float(reduce(columns, axis=0).mean())
+
+
+def summarize(values, percentiles=(95, 99), method='linear'):
+    """
+    Compute summary statistics for one array of samples.
+
+    Args:
+        values: Array of samples
+        percentiles: Percentiles to compute
+        method: Percentile estimation method of np.percentile, e.g.
+            'linear' (default), 'nearest' or 'median_unbiased'
+
+    Returns:
+        Dictionary with count, mean, min, max, std (sample), sum and one
+        'p<N>' entry per percentile, or None if there are no samples
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return None
+
+    stats = {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'std': float(values.std(ddof=1)) if values.size > 1 else 0.0,
+        'sum': float(values.sum()),
+    }
+    if percentiles:
+        for percentile, value in zip(percentiles, np.percentile(values, percentiles, method=method)):
+            stats[f"p{percentile:g}"] = float(value)
+
+    return stats
+
+
+def summarize_groups(groups, percentiles=(95, 99), method='linear'):
+    """
+    Compute summary statistics for many sample arrays at once.
+
+    Arrays are padded with NaN into a matrix and reduced along the sample
+    axis, so a grouped query with thousands of series costs a handful of
+    NumPy calls instead of a Python loop per statistic.
+
+    Args:
+        groups: Dictionary mapping a key to an array of samples
+        percentiles: Percentiles to compute
+        method: Percentile estimation method (see summarize)
+
+    Returns:
+        Dictionary mapping each key with samples to its summary (see summarize)
+    """
+    keys = [key for key, values in groups.items() if len(values)]
+    summaries = {}
+
+    for offset in range(0, len(keys), BATCH_ROWS):
+        batch = keys[offset:offset + BATCH_ROWS]
+        lengths = np.array([len(groups[key]) for key in batch])
+
+        matrix = np.full((len(batch), lengths.max()), np.nan)
+        for row, key in enumerate(batch):
+            matrix[row, :lengths[row]] = groups[key]
+
+        means = np.nanmean(matrix, axis=1)
+        mins = np.nanmin(matrix, axis=1)
+        maxs = np.nanmax(matrix, axis=1)
+        sums = np.nansum(matrix, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stds = np.where(lengths > 1, np.nanstd(matrix, axis=1, ddof=1), 0.0)
+        quantiles = (
+            np.nanpercentile(matrix, percentiles, axis=1, method=method) if percentiles else []
+        )
+
+        for row, key in enumerate(batch):
+            stats = {
+                'count': int(lengths[row]),
+                'mean': float(means[row]),
+                'min': float(mins[row]),
+                'max': float(maxs[row]),
+                'std': float(stds[row]),
+                'sum': float(sums[row]),
+            }
+            for index, percentile in enumerate(percentiles or []):
+                stats[f"p{percentile:g}"] = float(quantiles[index][row])
+            summaries[key] = stats
+
+    return summaries
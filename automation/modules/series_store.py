@@ -0,0 +1,180 @@
+"""
+Series Store Module
+
+Columnar on-disk store for the raw time series of a benchmark run.
+
+A store is a directory holding one NumPy file per column plus a small JSON
+index of label sets:
+
+    <run_id>_series/
+    ├── index.json              # format version, run metadata, labels per series
+    ├── offsets.npy             # int64, series i spans [offsets[i], offsets[i + 1])
+    ├── base_timestamps.npy     # int64, first timestamp of each series (ms)
+    ├── timestamp_deltas.npy    # int32, ms since the previous sample (0 for the first)
+    └── values.npy              # float64 or float32 sample values
+
+The columns are memory-mapped on open, so reading one series only pages in
+its own slice of the files.
+"""
+
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from modules.time_series import TimeSeries
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = 'benchmark-series'
+STORE_VERSION = 1
+
+VALUE_DTYPES = ('float64', 'float32')
+
+
+class SeriesStore:
+    """Reads and writes the columnar series store of one run"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._index = None
+        self._columns = None
+
+    @classmethod
+    def write(cls, path, series_by_family, metadata=None, value_dtype='float64'):
+        """
+        Write series grouped by family into a new store, replacing any old one.
+
+        Args:
+            path: Store directory
+            series_by_family: Dictionary mapping a family name, e.g.
+                'container_cpu', to a list of TimeSeries
+            metadata: JSON-compatible run metadata kept in the index
+            value_dtype: 'float64', or 'float32' to halve the value column
+
+        Returns:
+            SeriesStore opened on the written directory
+        """
+        if value_dtype not in VALUE_DTYPES:
+            raise ValueError(f"value_dtype must be one of {VALUE_DTYPES}, got {value_dtype}")
+
+        path = Path(path)
+        entries = []
+        timestamps = []
+        values = []
+        for family, result in series_by_family.items():
+            for series in result or []:
+                entries.append({'family': family, 'labels': series.labels})
+                timestamps.append(np.round(series.timestamps * 1000).astype(np.int64))
+                values.append(series.values)
+
+        lengths = np.array([len(column) for column in values], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        bases = np.array([column[0] if len(column) else 0 for column in timestamps], dtype=np.int64)
+        deltas = [np.diff(column, prepend=column[:1]) for column in timestamps]
+
+        index = {
+            'format': STORE_FORMAT,
+            'version': STORE_VERSION,
+            'value_dtype': value_dtype,
+            'metadata': metadata or {},
+            'series': entries,
+        }
+
+        # Build the store next to its final location and swap it in at once
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}."))
+        try:
+            # mkdtemp creates the directory private to the current user
+            tmp_dir.chmod(0o755)
+            np.save(tmp_dir / 'offsets.npy', offsets)
+            np.save(tmp_dir / 'base_timestamps.npy', bases)
+            np.save(tmp_dir / 'timestamp_deltas.npy', _concat(deltas, np.int32))
+            np.save(tmp_dir / 'values.npy', _concat(values, value_dtype))
+            with open(tmp_dir / 'index.json', 'w') as f:
+                json.dump(index, f)
+
+            if path.exists():
+                shutil.rmtree(path)
+            tmp_dir.rename(path)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Stored {len(entries)} series ({int(offsets[-1])} samples) in {path}")
+        return cls(path)
+
+    @property
+    def index(self):
+        """Decoded index.json"""
+        if self._index is None:
+            with open(self.path / 'index.json') as f:
+                index = json.load(f)
+            if index.get('format') != STORE_FORMAT or index.get('version') != STORE_VERSION:
+                raise ValueError(f"Unsupported series store in {self.path}: "
+                                 f"{index.get('format')} v{index.get('version')}")
+            self._index = index
+        return self._index
+
+    @property
+    def metadata(self):
+        """Run metadata stored with the series"""
+        return self.index['metadata']
+
+    def families(self):
+        """Names of the stored series families"""
+        return list(dict.fromkeys(entry['family'] for entry in self.index['series']))
+
+    def read(self, family, **matchers):
+        """
+        Read the series of one family, optionally filtered by exact label values.
+
+        Example:
+            store.read('container_cpu', pod='frontend-7d9c8b6f5-x2x4q')
+
+        Returns:
+            List of TimeSeries backed by the memory-mapped columns
+        """
+        return [
+            self._series(position)
+            for position, entry in enumerate(self.index['series'])
+            if entry['family'] == family
+            and all(entry['labels'].get(name) == value for name, value in matchers.items())
+        ]
+
+    def read_all(self):
+        """Read every family into a dictionary of TimeSeries lists"""
+        result = {family: [] for family in self.families()}
+        for position, entry in enumerate(self.index['series']):
+            result[entry['family']].append(self._series(position))
+        return result
+
+    def _series(self, position):
+        """Rebuild one series from its slice of the columns"""
+        columns = self._load_columns()
+        start, end = columns['offsets'][position], columns['offsets'][position + 1]
+
+        deltas = columns['timestamp_deltas'][start:end]
+        timestamps = (columns['base_timestamps'][position] + np.cumsum(deltas, dtype=np.int64)) / 1000
+        values = np.asarray(columns['values'][start:end], dtype=np.float64)
+
+        return TimeSeries(self.index['series'][position]['labels'], timestamps, values)
+
+    def _load_columns(self):
+        """Memory-map the column files on first access"""
+        if self._columns is None:
+            self._columns = {
+                name: np.load(self.path / f"{name}.npy", mmap_mode='r')
+                for name in ('offsets', 'base_timestamps', 'timestamp_deltas', 'values')
+            }
+        return self._columns
+
+
+def _concat(columns, dtype):
+    """Concatenate column chunks into one array of the given dtype"""
+    if not columns:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(columns).astype(dtype, copy=False)
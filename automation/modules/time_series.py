@@ -0,0 +1,86 @@
+"""
+Time Series Module
+
+Compact array-backed representation of Prometheus query results.
+"""
+
+import numpy as np
+
+
+class TimeSeries:
+    """One Prometheus series: its label set plus parallel timestamp and value arrays"""
+
+    __slots__ = ('labels', 'timestamps', 'values')
+
+    def __init__(self, labels, timestamps, values):
+        self.labels = labels
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @classmethod
+    def from_samples(cls, labels, samples):
+        """
+        Build a series from (timestamp, value) pairs.
+
+        Args:
+            labels: Label dictionary ('metric' in the Prometheus API)
+            samples: Array or list of pairs, e.g. a range series' 'values' or
+                an instant series' 'value'
+        """
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, 2)
+        # Copy the columns so each array is contiguous and the pairs can be freed
+        return cls(labels, samples[:, 0].copy(), samples[:, 1].copy())
+
+    @classmethod
+    def concat(cls, parts):
+        """Join consecutive time ranges of the same series into one"""
+        if len(parts) == 1:
+            return parts[0]
+
+        return cls(
+            parts[0].labels,
+            np.concatenate([part.timestamps for part in parts]),
+            np.concatenate([part.values for part in parts])
+        )
+
+    def between(self, start, end):
+        """
+        Samples with start <= timestamp <= end as a new series.
+
+        Args:
+            start: First Unix timestamp to keep, in seconds
+            end: Last Unix timestamp to keep, in seconds
+        """
+        first = np.searchsorted(self.timestamps, start, side='left')
+        last = np.searchsorted(self.timestamps, end, side='right')
+        return TimeSeries(self.labels, self.timestamps[first:last], self.values[first:last])
+
+    @property
+    def key(self):
+        """Hashable identity of the series' label set"""
+        return tuple(sorted(self.labels.items()))
+
+    def valid_values(self):
+        """Sample values without NaN (e.g. from division by zero in PromQL)"""
+        return self.values[~np.isnan(self.values)]
+
+    def integrate(self):
+        """
+        Trapezoidal integral of the values over time, e.g. a per-second rate
+        into the total over the series' time span.
+        """
+        valid = ~np.isnan(self.values)
+        timestamps, values = self.timestamps[valid], self.values[valid]
+        if values.size < 2:
+            return 0.0
+        return float(np.sum(np.diff(timestamps) * (values[1:] + values[:-1])) / 2)
+
+    def last_value(self):
+        """Most recent sample value, or None for an empty series"""
+        return float(self.values[-1]) if self.values.size else None
+
+    def __len__(self):
+        return self.values.size
+
+    def __repr__(self):
+        return f"TimeSeries({self.labels!r}, {self.values.size} samples)"
@@ -0,0 +1,127 @@
+"""Shared fixtures: artifact documents in the JSON layout of <run_id>.json"""
+
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).parent.parent.parent / 'benchmarks'
+
+# Committed artifact collected before CPU accounting and request counting
+LEGACY_ARTIFACT = BENCHMARKS_DIR / 'gcp-intel-20260212-194607.json'
+
+ARTIFACT_DOCUMENT = {
+    'schema_version': 1,
+    'run_id': 'gcp-intel-20260301-120000',
+    'artifact_version': 1,
+    'timestamp': '2026-03-01T12:15:00',
+    'cloud': 'gcp',
+    'region': 'us-central1',
+    'zone': 'us-central1-a',
+    'node_pool': {
+        'machine_type': 'n2-standard-4',
+        'cpu_vendor': 'intel',
+        'cpu_generation': 'Ice Lake',
+        'node_count': 3,
+        'source': 'configuration',
+        'machine_specs': {'vcpus': 4, 'memory_gb': 16, 'cpu_platform': 'Intel Ice Lake'},
+    },
+    'load_profile': {
+        'duration_seconds': 600,
+        'start_time': '2026-03-01T12:05:00',
+        'end_time': '2026-03-01T12:15:00',
+        'users_count': 300,
+        'rps': 50,
+    },
+    'metrics': {
+        'cpu': {
+            'avg_utilization_pct': 12.5, 'max_utilization_pct': 40.25,
+            'p95_utilization_pct': 31.0, 'p99_utilization_pct': 38.5,
+            'throttled_seconds': 1.5, 'throttled_percentage': 0.75,
+            'cpu_seconds': 912.4, 'throttled_seconds_total': 3.25, 'throttled_periods_ratio': 0.02,
+        },
+        'memory': {'avg_usage_mb': 96.5, 'max_usage_mb': 130.0, 'avg_utilization_pct': 4.1},
+        'network': {'received_mb_per_sec': 1.2, 'transmitted_mb_per_sec': 0.9},
+        'request_rate_rps': 49.8,
+    },
+    'normalized_metrics': {'cpu_seconds_per_request': 0.030535, 'memory_mb_per_request': 1.937751},
+    'pods': [
+        {
+            'pod_name': 'frontend-5d8f7c9b4-ax0z9',
+            'container_name': 'server',
+            'metrics': {
+                'cpu': {
+                    'avg_utilization_pct': 20.5, 'max_utilization_pct': 40.25, 'min_utilization_pct': 3.0,
+                    'p95_utilization_pct': 35.0, 'p99_utilization_pct': 39.0, 'std_dev': 6.2,
+                },
+                'cpu_throttling': {
+                    'avg_throttled_seconds': 0.01, 'max_throttled_seconds': 0.2, 'total_throttled_seconds': 3.25,
+                },
+                'cpu_accounting': {
+                    'cpu_seconds': 410.2, 'throttled_seconds': 3.25, 'throttled_periods_ratio': 0.02,
+                    'source': 'increase',
+                },
+                'memory': {'avg_usage_mb': 48.0, 'max_usage_mb': 60.5, 'min_usage_mb': 40.0, 'p95_usage_mb': 58.0},
+            },
+            'resource_limits': {'cpu_limit_cores': 0.5},
+        },
+        {
+            # No CPU limit: no throttled-period ratio, and no memory samples
+            'pod_name': 'cartservice-7c9d8f6b5-k2m4p',
+            'container_name': 'server',
+            'metrics': {
+                'cpu': {
+                    'avg_utilization_pct': 4.5, 'max_utilization_pct': 9.0, 'min_utilization_pct': 1.0,
+                    'p95_utilization_pct': 8.0, 'p99_utilization_pct': 8.9, 'std_dev': 1.1,
+                },
+                'cpu_accounting': {
+                    'cpu_seconds': 502.2, 'throttled_seconds': None, 'throttled_periods_ratio': None,
+                    'source': 'rate_integral',
+                },
+            },
+        },
+    ],
+    'other_containers': {},
+    'nodes': [
+        {
+            'node_name': 'gke-bench-pool-1',
+            'metrics': {
+                'cpu': {'avg_utilization_pct': 14.0, 'max_utilization_pct': 42.0, 'min_utilization_pct': 2.0},
+                'memory': {'avg_utilization_pct': 30.0, 'max_utilization_pct': 31.5, 'min_utilization_pct': 29.0},
+            },
+        },
+        {'node_name': 'gke-bench-pool-2', 'metrics': {}},
+    ],
+    'services': {
+        'frontend': {
+            'cpu_avg_pct': 20.5, 'cpu_max_pct': 40.25, 'cpu_p95_pct': 35.0, 'cpu_p99_pct': 39.0,
+            'memory_avg_mb': 48.0, 'memory_max_mb': 60.5, 'memory_p95_mb': 58.0,
+            'cpu_seconds': 410.2, 'cpu_throttled_seconds': 3.25, 'cpu_throttled_periods_ratio': 0.02,
+        },
+        'cartservice': {
+            'cpu_avg_pct': 4.5, 'cpu_max_pct': 9.0, 'cpu_p95_pct': None, 'cpu_p99_pct': None,
+            'memory_avg_mb': None, 'memory_max_mb': None, 'memory_p95_mb': None,
+            'cpu_seconds': 502.2, 'cpu_throttled_seconds': None, 'cpu_throttled_periods_ratio': None,
+        },
+    },
+    'summary': {'total_pods': 2, 'total_nodes': 2, 'total_services': 2},
+    'sketches': {},
+    'collection_metadata': {
+        'start_time': '2026-03-01T12:05:00',
+        'end_time': '2026-03-01T12:15:00',
+        'namespace': 'default',
+    },
+}
+
+
+@pytest.fixture
+def artifact_document():
+    """An artifact with every section, and with statistics some pods did not produce"""
+    return copy.deepcopy(ARTIFACT_DOCUMENT)
+
+
+@pytest.fixture
+def legacy_document():
+    """A committed artifact written before the schema was versioned"""
+    return json.loads(LEGACY_ARTIFACT.read_text())
@@ -0,0 +1,164 @@
+"""Tests for building, validating and serializing BenchmarkArtifact"""
+
+import json
+from decimal import Decimal
+
+import pytest
+
+from modules.artifact_model import SCHEMA_VERSION, BenchmarkArtifact, LoadProfile, NodePool, SchemaError
+
+
+def test_from_dict_round_trips_the_json_layout(artifact_document):
+    artifact = BenchmarkArtifact.from_dict(artifact_document)
+
+    assert artifact.to_dict() == artifact_document
+    assert json.loads(artifact.to_json()) == artifact_document
+
+
+def test_unmeasured_statistics_stay_none(artifact_document):
+    artifact = BenchmarkArtifact.from_dict(artifact_document)
+    cartservice = artifact.pods[1]
+
+    assert cartservice.memory is None
+    assert cartservice.cpu_throttling is None
+    assert cartservice.cpu_accounting.throttled_periods_ratio is None
+    assert artifact.nodes[1].cpu is None
+    assert artifact.services['cartservice'].memory_avg_mb is None
+    row = artifact.pod_rows()[1]
+    assert row['cpu_throttled_periods_ratio'] is None
+    assert 'memory_avg_mb' not in row
+
+
+def test_to_bytes_round_trips(artifact_document):
+    artifact = BenchmarkArtifact.from_dict(artifact_document)
+
+    data = artifact.to_bytes()
+    restored = BenchmarkArtifact.from_bytes(data)
+
+    assert restored == artifact
+    assert restored.to_dict() == artifact_document
+    assert restored.to_bytes() == data
+
+
+def test_to_bytes_keeps_accounting_source_without_numbers(artifact_document):
+    artifact_document['pods'][1]['metrics']['cpu_accounting'] = {
+        'cpu_seconds': None, 'throttled_seconds': None, 'throttled_periods_ratio': None, 'source': 'unavailable',
+    }
+    artifact = BenchmarkArtifact.from_dict(artifact_document)
+
+    restored = BenchmarkArtifact.from_bytes(artifact.to_bytes())
+
+    assert restored.pods[1].cpu_accounting.source == 'unavailable'
+    assert restored.to_dict() == artifact_document
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(SchemaError):
+        BenchmarkArtifact.from_bytes(b'{"run_id": "x"}')
+
+
+def test_numbers_are_coerced_and_rounded(artifact_document):
+    artifact_document['metrics']['cpu']['avg_utilization_pct'] = '12.345678'
+    artifact_document['pods'][0]['metrics']['memory']['avg_usage_mb'] = 48.123456
+    artifact_document['normalized_metrics']['cpu_seconds_per_request'] = 0.0305351234
+
+    artifact = BenchmarkArtifact.from_dict(artifact_document)
+
+    assert artifact.metrics.cpu.avg_utilization_pct == 12.3457
+    assert artifact.pods[0].memory.avg_usage_mb == 48.1235
+    assert artifact.normalized_metrics.cpu_seconds_per_request == 0.030535
+
+
+@pytest.mark.parametrize('change', [
+    lambda document: document['metrics']['cpu'].update(unknown_metric=1.0),
+    lambda document: document['pods'][0]['metrics']['memory'].update(avg_usage_mb='n/a'),
+    lambda document: document['pods'][0]['metrics']['memory'].update(avg_usage_mb=None),
+    lambda document: document.update(schema_version=SCHEMA_VERSION + 1),
+    lambda document: document.pop('node_pool'),
+])
+def test_invalid_documents_raise_schema_error(artifact_document, change):
+    change(artifact_document)
+
+    with pytest.raises(SchemaError):
+        BenchmarkArtifact.from_dict(artifact_document)
+
+
+def test_legacy_artifact_loads_unmeasured_values_as_none(legacy_document):
+    artifact = BenchmarkArtifact.from_dict(legacy_document)
+
+    assert artifact.schema_version == 1
+    assert artifact.artifact_version == 1
+    assert artifact.metrics.request_rate_rps == 0.0
+    # Written as 0.0 before per-request costs could be missing
+    assert artifact.normalized_metrics.cpu_seconds_per_request is None
+    assert artifact.normalized_metrics.memory_mb_per_request is None
+    assert artifact.metrics.cpu.cpu_seconds is None
+    assert BenchmarkArtifact.from_bytes(artifact.to_bytes()) == artifact
+
+
+def test_catalog_row_has_the_cluster_cpu_seconds(artifact_document):
+    row = BenchmarkArtifact.from_dict(artifact_document).catalog_row()
+
+    assert row['artifact_version'] == 1
+    assert row['cpu_seconds'] == 912.4
+    assert row['cpu_throttled_seconds_total'] == 3.25
+    assert row['cpu_seconds_per_request'] == 0.030535
+
+
+def collected_metrics(**cluster):
+    """PrometheusClient.collect_metrics() results with only cluster metrics"""
+    return {
+        'cluster': {
+            'avg_cpu_utilization': 12.5, 'max_cpu_utilization': 40.25,
+            'cpu_throttled_seconds': 1.5, 'cpu_throttled_percentage': 0.75,
+            'avg_memory_mb': 96.5, 'max_memory_mb': 130.0, 'avg_memory_utilization_pct': 4.1,
+            'total_network_received_mb': 1.2, 'total_network_transmitted_mb': 0.9,
+            'request_rate_rps': 50.0,
+            **cluster,
+        },
+    }
+
+
+def from_collected(metrics, duration_seconds=600):
+    return BenchmarkArtifact.from_collected(
+        metrics,
+        run_id='run-a', timestamp='2026-03-01T12:15:00', cloud='gcp', region='us-central1', zone='us-central1-a',
+        node_pool=NodePool(machine_type='n2-standard-4'),
+        load_profile=LoadProfile(duration_seconds=duration_seconds, start_time='2026-03-01T12:05:00',
+                                 end_time='2026-03-01T12:15:00'),
+    )
+
+
+def test_from_collected_derives_per_request_costs_from_coerced_values():
+    artifact = from_collected(collected_metrics(
+        cpu_seconds_total=Decimal('912.40004'), total_requests='30000', avg_memory_mb='96.50001'
+    ))
+
+    assert artifact.metrics.cpu.cpu_seconds == 912.4
+    assert artifact.normalized_metrics.cpu_seconds_per_request == round(912.4 / 30000, 6)
+    assert artifact.normalized_metrics.memory_mb_per_request == round(96.5 / 50.0, 6)
+
+
+def test_from_collected_estimates_the_request_count_without_a_counter():
+    artifact = from_collected(collected_metrics(cpu_seconds_total=900.0), duration_seconds=300)
+
+    assert artifact.normalized_metrics.cpu_seconds_per_request == 0.06
+
+
+@pytest.mark.parametrize('cluster', [
+    {'request_rate_rps': 0.0, 'cpu_seconds_total': 900.0},
+    {'request_rate_rps': 0.0, 'cpu_seconds_total': 900.0, 'total_requests': 30000},
+])
+def test_from_collected_has_no_per_request_costs_without_requests(cluster):
+    artifact = from_collected(collected_metrics(**cluster))
+
+    assert artifact.normalized_metrics.cpu_seconds_per_request is None
+    assert artifact.normalized_metrics.memory_mb_per_request is None
+
+
+def test_from_collected_has_no_cpu_cost_without_cpu_accounting():
+    artifact = from_collected(collected_metrics(total_requests=30000))
+
+    assert artifact.metrics.cpu.cpu_seconds is None
+    assert artifact.normalized_metrics.cpu_seconds_per_request is None
+    assert artifact.normalized_metrics.memory_mb_per_request == 1.93
@@ -0,0 +1,138 @@
+"""Tests for checking runs against pinned and rolling baselines"""
+
+import argparse
+import json
+
+import pytest
+
+from main import add_regression_gate_args
+from modules.artifact_generator import ArtifactGenerator
+from modules.regression_gate import DEFAULT_ROLLING_RUNS, RegressionGate
+
+
+@pytest.fixture
+def save_run(tmp_path, artifact_document):
+    """Save a variant of the artifact document as a run in tmp_path"""
+    generator = ArtifactGenerator({'output_dir': tmp_path})
+
+    def save(run_id, timestamp, users_count=300, **frontend):
+        document = json.loads(json.dumps(artifact_document))
+        document.update(run_id=run_id, timestamp=timestamp)
+        document['load_profile']['users_count'] = users_count
+        document['services']['frontend'].update(frontend)
+        return generator.save_artifact(document)
+
+    return save
+
+
+def test_pinned_baseline_fails_on_a_regression(tmp_path, save_run):
+    save_run('run-a', '2026-03-01T12:00:00')
+    path = save_run('run-b', '2026-03-02T12:00:00', cpu_seconds=492.24, memory_avg_mb=49.0)
+
+    report = RegressionGate({'output_dir': tmp_path, 'baseline_run': 'run-a'}).check(path)
+
+    assert report['status'] == 'fail'
+    assert report['baseline']['mode'] == 'pinned'
+    assert [(entry['service'], entry['metric']) for entry in report['regressions']] == [('frontend', 'cpu_seconds')]
+    assert report['regressions'][0]['delta_pct'] == 20.0
+    assert report['services']['frontend']['memory_avg_mb']['status'] == 'ok'
+    assert report['services']['cartservice']['memory_avg_mb']['status'] == 'unavailable'
+    assert json.loads((tmp_path / 'run-b_regression.json').read_text()) == report
+
+
+def test_changes_within_tolerance_or_floor_pass(tmp_path, save_run):
+    save_run('run-a', '2026-03-01T12:00:00', cpu_throttled_seconds=0.2)
+    path = save_run('run-b', '2026-03-02T12:00:00', cpu_seconds=430.0, cpu_throttled_seconds=0.6)
+
+    report = RegressionGate({'output_dir': tmp_path, 'baseline_run': 'run-a'}).check(path)
+
+    assert report['status'] == 'pass'
+    # +200%, but below the absolute noise floor of throttled seconds
+    assert report['services']['frontend']['cpu_throttled_seconds']['status'] == 'ok'
+
+
+def test_custom_tolerance(tmp_path, save_run):
+    save_run('run-a', '2026-03-01T12:00:00')
+    path = save_run('run-b', '2026-03-02T12:00:00', cpu_seconds=430.0)
+
+    gate = RegressionGate({'output_dir': tmp_path, 'baseline_run': 'run-a',
+                           'regression_tolerances': {'cpu_seconds': 2.0}})
+
+    assert gate.check(path)['status'] == 'fail'
+
+
+def test_missing_pinned_baseline_raises(tmp_path, save_run):
+    path = save_run('run-b', '2026-03-02T12:00:00')
+
+    with pytest.raises(FileNotFoundError):
+        RegressionGate({'output_dir': tmp_path, 'baseline_run': 'run-a'}).check(path)
+
+
+def test_rolling_baseline_is_the_median_of_earlier_comparable_runs(tmp_path, save_run):
+    save_run('run-a', '2026-03-01T12:00:00', cpu_seconds=400.0)
+    save_run('run-b', '2026-03-02T12:00:00', cpu_seconds=410.0)
+    save_run('run-c', '2026-03-03T12:00:00', cpu_seconds=600.0)
+    # Another load profile, and a later run, are not part of the baseline
+    save_run('run-d', '2026-03-04T12:00:00', users_count=100, cpu_seconds=100.0)
+    save_run('run-f', '2026-03-06T12:00:00', cpu_seconds=100.0)
+    path = save_run('run-e', '2026-03-05T12:00:00', cpu_seconds=415.0)
+
+    report = RegressionGate({'output_dir': tmp_path, 'rolling_baseline_runs': 5}).check(path)
+
+    assert report['status'] == 'pass'
+    assert report['baseline']['mode'] == 'rolling'
+    assert sorted(report['baseline']['artifacts']) == ['run-a.json', 'run-b.json', 'run-c.json']
+    assert report['services']['frontend']['cpu_seconds']['baseline'] == 410.0
+
+
+def test_rolling_baseline_uses_the_latest_runs(tmp_path, save_run):
+    save_run('run-a', '2026-03-01T12:00:00', cpu_seconds=400.0)
+    save_run('run-b', '2026-03-02T12:00:00', cpu_seconds=500.0)
+    path = save_run('run-c', '2026-03-03T12:00:00', cpu_seconds=520.0)
+
+    report = RegressionGate({'output_dir': tmp_path, 'rolling_baseline_runs': 1}).check(path)
+
+    assert report['baseline']['artifacts'] == ['run-b.json']
+    assert report['status'] == 'pass'
+
+
+def test_first_run_has_no_baseline(tmp_path, save_run):
+    path = save_run('run-a', '2026-03-01T12:00:00')
+
+    report = RegressionGate({'output_dir': tmp_path}).check(path)
+
+    assert report['status'] == 'no_baseline'
+    assert report['baseline'] is None
+
+
+@pytest.mark.parametrize('tolerances', [{'latency_ms': 5.0}, {'cpu_seconds': -1.0}])
+def test_invalid_tolerances_are_rejected(tmp_path, tolerances):
+    with pytest.raises(ValueError):
+        RegressionGate({'output_dir': tmp_path, 'regression_tolerances': tolerances})
+
+
+@pytest.mark.parametrize('runs', [0, -1])
+def test_rolling_baseline_needs_a_run(tmp_path, runs):
+    with pytest.raises(ValueError):
+        RegressionGate({'output_dir': tmp_path, 'rolling_baseline_runs': runs})
+
+
+@pytest.mark.parametrize('argv, runs', [
+    ([], None),
+    (['--rolling-baseline'], DEFAULT_ROLLING_RUNS),
+    (['--rolling-baseline', '3'], 3),
+])
+def test_rolling_baseline_argument(argv, runs):
+    parser = argparse.ArgumentParser()
+    add_regression_gate_args(parser)
+
+    assert parser.parse_args(argv).rolling_baseline == runs
+
+
+@pytest.mark.parametrize('value', ['0', '-2', 'five'])
+def test_rolling_baseline_argument_rejects_invalid_counts(value):
+    parser = argparse.ArgumentParser()
+    add_regression_gate_args(parser)
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--rolling-baseline', value])
@@ -0,0 +1,113 @@
+"""Tests for upserting runs into the results catalog and finding them again"""
+
+import sqlite3
+
+import pytest
+
+from modules.artifact_model import BenchmarkArtifact
+from modules.results_catalog import SCHEMA_VERSION, ResultsCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ResultsCatalog(tmp_path / 'results.db')
+
+
+@pytest.fixture
+def artifact(artifact_document):
+    return BenchmarkArtifact.from_dict(artifact_document)
+
+
+def run_row(run_id, timestamp, artifact_version=1, **values):
+    return {
+        'run_id': run_id,
+        'artifact_version': artifact_version,
+        'timestamp': timestamp,
+        'machine_type': 'n2-standard-4',
+        'node_count': 3,
+        **values,
+    }
+
+
+def test_upsert_stores_the_artifact_rows(catalog, artifact):
+    catalog.upsert_run({**artifact.catalog_row(), 'artifact_path': 'run.json'},
+                       pods=artifact.pod_rows(), nodes=artifact.node_rows())
+
+    (run,) = catalog.find_runs()
+    assert run['run_id'] == artifact.run_id
+    assert run['artifact_path'] == 'run.json'
+    assert run['cpu_seconds'] == 912.4
+    assert run['users_count'] == 300
+    pods = catalog.pods(artifact.run_id)
+    assert [pod['pod_name'] for pod in pods] == sorted(pod.pod_name for pod in artifact.pods)
+    # Statistics a container did not produce are NULL
+    cartservice = next(pod for pod in pods if pod['pod_name'].startswith('cartservice'))
+    assert cartservice['memory_avg_mb'] is None
+    assert cartservice['cpu_seconds'] == 502.2
+    assert len(catalog.nodes(artifact.run_id)) == 2
+
+
+def test_upsert_replaces_a_run_instead_of_duplicating_it(catalog, artifact):
+    catalog.upsert_run(artifact.catalog_row(), pods=artifact.pod_rows(), nodes=artifact.node_rows())
+    catalog.upsert_run({**artifact.catalog_row(), 'cpu_seconds': 900.0},
+                       pods=artifact.pod_rows()[:1], nodes=[])
+
+    (run,) = catalog.find_runs()
+    assert run['cpu_seconds'] == 900.0
+    assert len(catalog.pods(artifact.run_id)) == 1
+    assert catalog.nodes(artifact.run_id) == []
+
+
+def test_artifact_version_defaults_to_one(catalog):
+    catalog.upsert_run({'run_id': 'run-a', 'timestamp': '2026-03-01T12:00:00'})
+
+    (run,) = catalog.find_runs()
+    assert run['artifact_version'] == 1
+    assert run['cpu_seconds'] is None
+
+
+def test_find_runs_returns_the_latest_version_of_each_run(catalog):
+    catalog.upsert_run(run_row('run-a', '2026-03-01T12:00:00', cpu_seconds=100.0))
+    catalog.upsert_run(run_row('run-a', '2026-03-01T12:00:00', artifact_version=2, cpu_seconds=90.0))
+    catalog.upsert_run(run_row('run-b', '2026-03-02T12:00:00', cpu_seconds=110.0))
+
+    latest = catalog.find_runs()
+    assert [(run['run_id'], run['artifact_version']) for run in latest] == [('run-b', 1), ('run-a', 2)]
+    assert latest[1]['cpu_seconds'] == 90.0
+
+    every_version = catalog.find_runs(latest_only=False)
+    assert sorted((run['run_id'], run['artifact_version']) for run in every_version) == [
+        ('run-a', 1), ('run-a', 2), ('run-b', 1)
+    ]
+
+
+def test_find_runs_filters_by_column_and_time(catalog):
+    catalog.upsert_run(run_row('run-a', '2026-03-01T12:00:00'))
+    catalog.upsert_run(run_row('run-b', '2026-03-02T12:00:00', machine_type='n2d-standard-4'))
+    catalog.upsert_run(run_row('run-c', '2026-03-03T12:00:00'))
+
+    assert [run['run_id'] for run in catalog.find_runs(machine_type='n2-standard-4')] == ['run-c', 'run-a']
+    assert [run['run_id'] for run in catalog.find_runs(since='2026-03-02T00:00:00')] == ['run-c', 'run-b']
+    assert [run['run_id'] for run in catalog.find_runs(until='2026-03-02T12:00:00')] == ['run-b', 'run-a']
+    assert catalog.find_runs(machine_type='n2-standard-4', node_count=5) == []
+
+
+def test_find_runs_rejects_unknown_filters(catalog):
+    with pytest.raises(ValueError):
+        catalog.find_runs(artifact_path='run.json')
+
+
+def test_catalogs_of_a_newer_schema_are_not_opened(tmp_path):
+    path = tmp_path / 'results.db'
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+    with pytest.raises(sqlite3.DatabaseError):
+        ResultsCatalog(path).find_runs()
+
+
+def test_catalog_is_shared_between_instances(tmp_path):
+    path = tmp_path / 'results.db'
+    ResultsCatalog(path).upsert_run(run_row('run-a', '2026-03-01T12:00:00'))
+
+    assert [run['run_id'] for run in ResultsCatalog(path).find_runs()] == ['run-a']
@@ -0,0 +1,121 @@
+"""Tests for ranking catalog runs and the statistics behind the ranking"""
+
+import numpy as np
+import pytest
+
+from modules.artifact_model import BenchmarkArtifact
+from modules.results_catalog import ResultsCatalog
+from modules.run_comparison import RunComparator, mann_whitney_p
+
+# Lower is better for all of them, so a stored 0.0 would rank first
+ACCOUNTING_METRICS = ('cpu_seconds', 'cpu_seconds_per_request', 'cpu_throttled_seconds_total')
+
+
+@pytest.fixture
+def legacy_row(legacy_document):
+    """Catalog row of a committed artifact collected before CPU accounting"""
+    artifact = BenchmarkArtifact.from_dict(legacy_document)
+    return {**artifact.catalog_row(), 'artifact_path': f"{artifact.run_id}.json"}
+
+
+def measured_rows(legacy_row, machine_type, cpu_vendor, cpu_seconds):
+    """Runs of the legacy run's scenario on another configuration, with CPU accounting"""
+    return [
+        {
+            **legacy_row,
+            'run_id': f"{machine_type}-{index}",
+            'machine_type': machine_type,
+            'cpu_vendor': cpu_vendor,
+            'request_rate_rps': 50.0,
+            'cpu_seconds': seconds,
+            'cpu_seconds_per_request': round(seconds / 30000, 6),
+            'cpu_throttled_seconds_total': seconds / 100,
+        }
+        for index, seconds in enumerate(cpu_seconds)
+    ]
+
+
+def compare(catalog_path, runs):
+    catalog = ResultsCatalog(catalog_path)
+    for run in runs:
+        catalog.upsert_run(run)
+    comparator = RunComparator({'catalog_path': catalog_path, 'bootstrap_samples': 200})
+    return [row for row in comparator.compare() if row['metric'] in ACCOUNTING_METRICS]
+
+
+def test_legacy_catalog_row_stores_null(tmp_path, legacy_row):
+    catalog = ResultsCatalog(tmp_path / 'results.db')
+    catalog.upsert_run(legacy_row)
+
+    run = catalog.find_runs()[0]
+    for metric in ACCOUNTING_METRICS:
+        assert legacy_row[metric] is None
+        assert run[metric] is None
+
+
+def test_legacy_run_does_not_win(tmp_path, legacy_row):
+    runs = [legacy_row, *measured_rows(legacy_row, 'n2d-standard-4', 'amd', [310.0, 320.0, 330.0])]
+
+    rows = compare(tmp_path / 'results.db', runs)
+
+    assert {row['metric'] for row in rows} == set(ACCOUNTING_METRICS)
+    for row in rows:
+        assert (row['rank'], row['machine_type'], row['runs']) == (1, 'n2d-standard-4', 3)
+
+
+def test_legacy_run_is_left_out_of_its_configuration(tmp_path, legacy_row):
+    runs = [
+        legacy_row,
+        *measured_rows(legacy_row, legacy_row['machine_type'], legacy_row['cpu_vendor'], [400.0, 410.0]),
+        *measured_rows(legacy_row, 'n2d-standard-4', 'amd', [310.0, 320.0, 330.0]),
+    ]
+
+    rows = compare(tmp_path / 'results.db', runs)
+
+    legacy = [row for row in rows if row['machine_type'] == legacy_row['machine_type']]
+    assert len(legacy) == len(ACCOUNTING_METRICS)
+    for row in legacy:
+        assert (row['rank'], row['runs']) == (2, 2)
+        assert row['delta_pct'] > 0
+    cpu_seconds = next(row for row in legacy if row['metric'] == 'cpu_seconds')
+    assert cpu_seconds['mean'] == 405.0
+
+
+@pytest.mark.parametrize('x, y, expected', [
+    # Exact distribution, without ties
+    ([1, 2, 3], [4, 5, 6], 0.1),
+    ([1.5, 2.5, 3.5, 8.0], [4, 5, 6, 7, 0.5], 0.7301587301587302),
+    # Tie-corrected normal approximation
+    ([1, 2, 2, 3, 3, 3], [3, 4, 4, 5, 6, 6], 0.008732768512539242),
+    # Normal approximation beyond the exact limit
+    (list(range(30)), [value + 10.5 for value in range(30)], 0.00012477053789099933),
+])
+def test_mann_whitney_p_matches_reference_values(x, y, expected):
+    assert mann_whitney_p(x, y) == pytest.approx(expected, rel=1e-9)
+    assert mann_whitney_p(y, x) == pytest.approx(expected, rel=1e-9)
+
+
+def test_mann_whitney_p_of_identical_or_empty_samples():
+    assert mann_whitney_p([5.0, 5.0, 5.0], [5.0, 5.0]) == 1.0
+    assert mann_whitney_p([], [1.0, 2.0]) == 1.0
+
+
+def test_compare_runs_interval_contains_the_difference(tmp_path):
+    rng = np.random.default_rng(7)
+    runs = [
+        {'machine_type': machine_type, 'cpu_vendor': vendor, 'users_count': 100, 'rps': 50,
+         'duration_seconds': 600, 'node_count': 3, 'cpu_seconds': value}
+        for machine_type, vendor, mean in (('n2d-standard-4', 'amd', 900.0), ('n2-standard-4', 'intel', 1000.0))
+        for value in rng.normal(mean, 30.0, size=20)
+    ]
+    comparator = RunComparator({'catalog_path': tmp_path / 'results.db', 'metrics': ['cpu_seconds'], 'bootstrap_samples': 2000})
+
+    leader, other = comparator.compare_runs(runs)
+
+    assert (leader['rank'], leader['machine_type'], leader['delta_pct']) == (1, 'n2d-standard-4', None)
+    assert other['machine_type'] == 'n2-standard-4'
+    assert other['ci_low_pct'] < other['delta_pct'] < other['ci_high_pct']
+    assert 5 < other['ci_low_pct'] and other['ci_high_pct'] < 20
+    assert other['significant']
+    # Seeded, so the same runs give the same intervals
+    assert comparator.compare_runs(runs)[1] == other